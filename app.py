@@ -1,8 +1,24 @@
 import streamlit as st
-import pandas as pd
 import json
 from datetime import datetime
 import io
+import os
+import sys
+import sqlite3
+import threading
+import hashlib
+import functools
+import heapq
+import itertools
+import operator
+import time
+import uuid
+import atexit
+import types
+from typing import Mapping, NamedTuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import MutableMapping
 
 # Configuration de la page
 st.set_page_config(
@@ -12,278 +28,514 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Définition de la checklist d'audit basée sur le cahier des charges
-CHECKLIST_AUDIT = {
-    "1. SÉCURITÉ DES ALIMENTS": {
-        "criticite": "CRITIQUE",
-        "coefficient": 2.0,
-        "items": [
-            {
-                "id": "SEC-001",
-                "question": "Pertinence et vérification des points critiques (étude HACCP) si applicable",
-                "details": "Vérifier l'existence et la mise à jour du plan HACCP, identification des CCP"
-            },
-            {
-                "id": "SEC-002",
-                "question": "Maîtrise du risque allergènes",
-                "details": "Procédures de gestion des allergènes, étiquetage, formation du personnel"
-            },
-            {
-                "id": "SEC-003",
-                "question": "Maîtrise du risque corps étrangers",
-                "details": "Procédures de prévention, détection (tamis, aimants, détecteur de métaux)"
-            },
-            {
-                "id": "SEC-004",
-                "question": "Maîtrise du risque chimique",
-                "details": "Stockage et utilisation des produits chimiques, traçabilité"
-            },
-            {
-                "id": "SEC-005",
-                "question": "Définition d'un plan d'analyses et d'un plan de contrôles",
-                "details": "Plan d'analyses microbiologiques, physico-chimiques, fréquence, laboratoire"
-            },
-            {
-                "id": "SEC-006",
-                "question": "Système de blocage/libération produits si concerné",
-                "details": "Procédure de quarantaine et de libération des produits"
-            },
-            {
-                "id": "SEC-007",
-                "question": "Gestion des retraits rappels produits (traçabilité des lots livrés aux magasins)",
-                "details": "Procédure de retrait/rappel, traçabilité amont/aval, tests de traçabilité"
-            }
-        ]
-    },
-    "2. HYGIÈNE DU PERSONNEL ET DES LOCAUX": {
-        "criticite": "CRITIQUE",
-        "coefficient": 2.0,
-        "items": [
-            {
-                "id": "HYG-001",
-                "question": "Définition/affichage des règles d'hygiène",
-                "details": "Règles affichées, accessibles et compréhensibles par le personnel"
-            },
-            {
-                "id": "HYG-002",
-                "question": "Respect application des règles d'hygiène par le personnel",
-                "details": "Port de la tenue, lavage des mains, comportement en production"
-            },
-            {
-                "id": "HYG-003",
-                "question": "Conformité infrastructure (locaux de production, sanitaires, vestiaires, équipements)",
-                "details": "État des locaux, séparation des zones, équipements pour l'hygiène"
-            },
-            {
-                "id": "HYG-004",
-                "question": "Maîtrise des opérations de nettoyage",
-                "details": "Plan de nettoyage, produits utilisés, fréquence, enregistrements"
-            },
-            {
-                "id": "HYG-005",
-                "question": "Maîtrise des températures (process et installation)",
-                "details": "Contrôle des températures, enregistrements, actions correctives"
-            },
-            {
-                "id": "HYG-006",
-                "question": "Surveillance des nuisibles",
-                "details": "Plan de lutte contre les nuisibles, prestataire, fréquence, résultats"
-            }
-        ]
-    },
-    "3. RÉGLEMENTATION": {
-        "criticite": "MAJEUR",
-        "coefficient": 1.5,
-        "items": [
-            {
-                "id": "REG-001",
-                "question": "Certificat bio couvrant l'ensemble des produits en cours de validité",
-                "details": "Vérifier la validité du certificat bio et la couverture de tous les produits"
-            },
-            {
-                "id": "REG-002",
-                "question": "Maîtrise des contrôles quantitatifs (poids/volume)",
-                "details": "Procédure de contrôle des poids/volumes, balance étalonnée"
-            },
-            {
-                "id": "REG-003",
-                "question": "Conformité globale des étiquettes produits + marquage lot/DLC",
-                "details": "Étiquetage réglementaire, liste d'ingrédients, allergènes, lot, DLC/DLUO"
-            },
-            {
-                "id": "REG-004",
-                "question": "Conformité système de traçabilité produits",
-                "details": "Traçabilité amont/aval, test de traçabilité réalisé"
-            }
-        ]
-    },
-    "4. EXIGENCES BIOCOOP - PRODUITS AUTORISÉS": {
-        "criticite": "MAJEUR",
-        "coefficient": 1.5,
-        "items": [
-            {
-                "id": "BIO-001",
-                "question": "Produits certifiés bio portant le label européen OU en conversion OU SPG autorisé",
-                "details": "Vérifier Nature et Progrès ou Simples, attestation en cours de validité"
-            },
-            {
-                "id": "BIO-002",
-                "question": "Produits de la mer : ingrédient principal non certifiable + ingrédients bio",
-                "details": "Si applicable, vérifier conformité avec annexe produits de la pêche"
-            },
-            {
-                "id": "BIO-003",
-                "question": "Absence de dioxyde de silicium (E551) et dioxyde de titane (E171)",
-                "details": "Vérifier les recettes et étiquettes"
-            }
-        ]
-    },
-    "5. EXIGENCES BIOCOOP - INGRÉDIENTS SPÉCIFIQUES": {
-        "criticite": "MAJEUR",
-        "coefficient": 1.5,
-        "items": [
-            {
-                "id": "ING-001",
-                "question": "Sel : de mer, récolté manuellement, origine France",
-                "details": "Pour le sel vendu en l'état (aromatisé ou non)"
-            },
-            {
-                "id": "ING-002",
-                "question": "Arômes : certifiés biologiques",
-                "details": "Si goût annoncé dans le nom, tous les ingrédients aromatisants doivent être bio"
-            },
-            {
-                "id": "ING-003",
-                "question": "Absence de labels interdits sur les étiquettes",
-                "details": "HVE, Zéro résidu, Produit responsable, Bleu Blanc Cœur, Bee Friendly, etc."
-            }
-        ]
-    },
-    "6. EXIGENCES BIOCOOP - COMMERCE ÉQUITABLE": {
-        "criticite": "MAJEUR",
-        "coefficient": 1.5,
-        "items": [
-            {
-                "id": "CEQ-001",
-                "question": "Produits bruts obligatoirement commerce équitable : Café, Sucre de canne/coco, Chocolat",
-                "details": "Vérifier label présent sur l'étiquette (liste des labels autorisés disponible)"
-            },
-            {
-                "id": "CEQ-002",
-                "question": "Thé (hors Japon/Corée du Sud), Beurre de cacao certifiés commerce équitable",
-                "details": "Label présent sur l'étiquette"
-            },
-            {
-                "id": "CEQ-003",
-                "question": "Fruits secs mono-ingrédient : cajou, macadamia, coco, Brésil, ananas, papaye, banane, mangue",
-                "details": "Commerce équitable obligatoire (vrac et conditionné)"
-            },
-            {
-                "id": "CEQ-004",
-                "question": "Gingembre confit (Hors UE), Beurre de karité, Huile d'argan, Riz hors UE",
-                "details": "Commerce équitable obligatoire"
-            },
-            {
-                "id": "CEQ-005",
-                "question": "Pâtes à tartiner : sucre de canne commerce équitable avec mention",
-                "details": "Mention '*issu du commerce équitable' en fin de liste d'ingrédients"
-            }
-        ]
-    },
-    "7. EXIGENCES BIOCOOP - TRANSPORT ET PRODUCTION": {
-        "criticite": "MAJEUR",
-        "coefficient": 1.5,
-        "items": [
-            {
-                "id": "TRA-001",
-                "question": "Interdiction transport aérien pour produits finis",
-                "details": "Vérifier les modes de transport utilisés"
-            },
-            {
-                "id": "TRA-002",
-                "question": "Pas de serres chauffées (hors production de plants)",
-                "details": "Pour fruits et légumes uniquement"
-            },
-            {
-                "id": "TRA-003",
-                "question": "Interdiction déverdissage des agrumes vendus en l'état",
-                "details": "Vérifier les pratiques"
-            },
-            {
-                "id": "TRA-004",
-                "question": "Tomates 'anciennes' : variétés de population non hybride",
-                "details": "Si applicable, vérifier les variétés"
-            },
-            {
-                "id": "TRA-005",
-                "question": "Produits de la pêche : conformité avec annexe zones autorisées",
-                "details": "Cf. Liste des produits de la pêche et zones BIOCOOP"
-            }
-        ]
-    },
-    "8. MAÎTRISE ORIGINES MATIÈRES PREMIÈRES": {
-        "criticite": "STANDARD",
-        "coefficient": 1.0,
-        "items": [
-            {
-                "id": "ORI-001",
-                "question": "Connaissance des origines des ingrédients",
-                "details": "Cohérence avec le tableau des origines BIOCOOP (par sondage)"
-            },
-            {
-                "id": "ORI-002",
-                "question": "Respect des couples produits/origines interdits",
-                "details": "Ex: Ail de Chine, Sucre de canne d'Inde, Cacao RDC, Muscade Indonésie"
-            },
-            {
-                "id": "ORI-003",
-                "question": "Respect des zones obligatoires pour produits spécifiques",
-                "details": "Ex: Agrumes bassin méditerranéen, Produits animaux UE, etc."
-            }
-        ]
-    },
-    "9. MAÎTRISE OGM": {
-        "criticite": "STANDARD",
-        "coefficient": 1.0,
-        "items": [
-            {
-                "id": "OGM-001",
-                "question": "Maîtrise de l'absence d'OGM dans les produits",
-                "details": "Seuil analytique: 0,01% produits bruts, 0,1% ingrédients élaborés"
-            },
-            {
-                "id": "OGM-002",
-                "question": "Contrôle des ingrédients à risque OGM",
-                "details": "Ananas rose, betterave, maïs, colza, papaye, sirop/riz basmati, soja, sucre de canne"
-            }
-        ]
+# Définitions versionnées de la checklist d'audit (une par fichier JSON ou YAML)
+DOSSIER_CHECKLISTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklists")
+
+# Version de la checklist utilisée pour les nouveaux audits
+VERSION_CHECKLIST = "2025.10"
+
+class IndexChecklist(NamedTuple):
+    """Checklist compilée, immuable, avec ses tables de correspondance précalculées"""
+    version: str
+    checklist: Mapping          # catégorie → {"criticite", "coefficient", "items"}
+    notation_options: Mapping   # notation → {"label", "points", "color"}
+    categories: tuple
+    items: Mapping              # item_id → item
+    categorie_item: Mapping     # item_id → catégorie
+    coefficient: Mapping        # catégorie → coefficient
+    nom_categorie: Mapping      # catégorie → nom affiché (sans numéro)
+    position_option: Mapping    # notation → position dans les options
+    position_item: Mapping      # item_id → position dans la checklist
+    options: tuple
+    points_max: float
+
+    def __hash__(self):
+        return hash(self.version)
+
+def compiler_checklist(definition):
+    """Compile une définition de checklist (dict) en IndexChecklist"""
+    checklist = {}
+    items = {}
+    categorie_item = {}
+    for categorie, data in definition["categories"].items():
+        items_categorie = tuple(types.MappingProxyType(dict(item)) for item in data["items"])
+        checklist[categorie] = types.MappingProxyType({
+            "criticite": data["criticite"],
+            "coefficient": data["coefficient"],
+            "items": items_categorie
+        })
+        for item in items_categorie:
+            if item["id"] in items:
+                raise ValueError(f"Item en double dans la checklist {definition['version']} : {item['id']}")
+            items[item["id"]] = item
+            categorie_item[item["id"]] = categorie
+
+    notation_options = {
+        note: types.MappingProxyType(dict(option)) for note, option in definition["notations"].items()
     }
-}
 
-# Options de notation
-NOTATION_OPTIONS = {
-    "A": {"label": "A - Conforme", "points": 20, "color": "#28a745"},
-    "B": {"label": "B - Non-conformité mineure", "points": 10, "color": "#ffc107"},
-    "C": {"label": "C - Non-conformité majeure", "points": 0, "color": "#dc3545"},
-    "N/A": {"label": "N/A - Non applicable", "points": None, "color": "#6c757d"}
-}
+    return IndexChecklist(
+        version=str(definition["version"]),
+        checklist=types.MappingProxyType(checklist),
+        notation_options=types.MappingProxyType(notation_options),
+        categories=tuple(checklist),
+        items=types.MappingProxyType(items),
+        categorie_item=types.MappingProxyType(categorie_item),
+        coefficient=types.MappingProxyType({cat: data["coefficient"] for cat, data in checklist.items()}),
+        nom_categorie=types.MappingProxyType({
+            cat: cat.split(".", 1)[1].strip() if "." in cat else cat for cat in checklist
+        }),
+        position_option=types.MappingProxyType({note: i for i, note in enumerate(notation_options)}),
+        position_item=types.MappingProxyType({item_id: i for i, item_id in enumerate(items)}),
+        options=tuple(notation_options),
+        points_max=max(opt["points"] for opt in notation_options.values() if opt["points"] is not None)
+    )
+
+def versions_checklist_disponibles():
+    """Versions de checklist présentes dans DOSSIER_CHECKLISTS"""
+    return sorted(
+        os.path.splitext(nom)[0]
+        for nom in os.listdir(DOSSIER_CHECKLISTS)
+        if nom.endswith((".json", ".yaml", ".yml"))
+    )
+
+# Les caches de niveau module doivent passer par st.cache_resource : Streamlit réexécute
+# app.py à chaque interaction, ce qui recréerait un functools.lru_cache à chaque fois
+@st.cache_resource(show_spinner=False)
+def charger_checklist(version=VERSION_CHECKLIST):
+    """Charge et compile une version de la checklist (une seule fois par processus)"""
+    for extension in (".json", ".yaml", ".yml"):
+        chemin = os.path.join(DOSSIER_CHECKLISTS, version + extension)
+        if not os.path.exists(chemin):
+            continue
+        with open(chemin, encoding="utf-8") as f:
+            if extension == ".json":
+                definition = json.load(f)
+            else:
+                import yaml
+                definition = yaml.safe_load(f)
+        return compiler_checklist(definition)
+
+    raise FileNotFoundError(f"Checklist {version} introuvable dans {DOSSIER_CHECKLISTS}")
+
+INDEX_CHECKLIST = charger_checklist(VERSION_CHECKLIST)
+
+# Checklist et options de notation de la version courante
+CHECKLIST_AUDIT = INDEX_CHECKLIST.checklist
+NOTATION_OPTIONS = INDEX_CHECKLIST.notation_options
+
+# Étapes de la navigation, dans l'ordre de st.session_state.current_step
+ETAPES = [
+    "1️⃣ Informations Fournisseur", "2️⃣ Checklist d'Audit", "3️⃣ Rapport Final", "4️⃣ Tableau de bord", "5️⃣ Recherche"
+]
+
+# Rafraîchissement (en secondes) du statut d'un rapport Excel en cours de génération
+INTERVALLE_SUIVI_RAPPORT = 1
+
+# Statuts des travaux de la file de génération des rapports
+STATUT_EN_ATTENTE = "en attente"
+STATUT_EN_COURS = "en cours"
+STATUT_TERMINE = "terminé"
+STATUT_ECHEC = "échec"
+
+# Statuts des actions correctives du plan d'action (les actions non terminées sont ouvertes)
+STATUT_ACTION_EN_COURS = "En cours"
+STATUT_ACTION_TERMINE = "Terminé"
+STATUTS_ACTION = (STATUT_ACTION_EN_COURS, STATUT_ACTION_TERMINE)
+
+# Champs modifiables d'une action corrective
+CHAMPS_ACTION = ("action", "responsable", "echeance", "statut", "date_cloture", "commentaire")
+
+# Base de données des audits (modifiable via la variable d'environnement AUDIT_DB_PATH)
+CHEMIN_BASE_AUDITS = os.environ.get("AUDIT_DB_PATH", "audits.db")
+
+# Brouillons des audits en cours, sauvegardés en continu (modifiable via AUDIT_DRAFTS_DIR)
+DOSSIER_BROUILLONS = os.environ.get("AUDIT_DRAFTS_DIR", "brouillons")
+
+# Délai (en secondes) sans modification avant l'écriture d'un brouillon
+DELAI_AUTOSAUVEGARDE = 2
+
+# Export Parquet partitionné, mis à jour à chaque enregistrement (désactivé si AUDIT_PARQUET_DIR n'est pas défini)
+DOSSIER_PARQUET = os.environ.get("AUDIT_PARQUET_DIR")
+
+# Journal JSONL des mesures de performance (désactivé si AUDIT_METRICS_PATH n'est pas défini)
+CHEMIN_METRIQUES = os.environ.get("AUDIT_METRICS_PATH")
+
+# Mesures de la réexécution en cours, propres à chaque thread de script
+_mesures = threading.local()
+
+def instrumenter(nom):
+    """Décorateur : chronomètre la fonction et rattache la mesure à la réexécution en cours"""
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            pile = getattr(_mesures, "pile", None)
+            racine = pile is None
+            if racine:
+                pile = _mesures.pile = []
+            debut = time.perf_counter()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                pile.append((nom, (time.perf_counter() - debut) * 1000))
+                if racine:
+                    _mesures.pile = None
+                    terminer_mesures(nom, pile)
+        return enveloppe
+    return decorateur
+
+def taille_objet(objet, deja_vus=None):
+    """Taille mémoire approximative (octets) d'un objet et de son contenu"""
+    deja_vus = set() if deja_vus is None else deja_vus
+    # Les checklists compilées sont partagées par le processus : pas comptées par session
+    if id(objet) in deja_vus or isinstance(objet, (types.MappingProxyType, IndexChecklist)):
+        return 0
+    deja_vus.add(id(objet))
+
+    taille = sys.getsizeof(objet)
+    if isinstance(objet, dict):
+        taille += sum(taille_objet(k, deja_vus) + taille_objet(v, deja_vus) for k, v in objet.items())
+    elif isinstance(objet, (list, tuple, set, frozenset)):
+        taille += sum(taille_objet(element, deja_vus) for element in objet)
+    elif hasattr(objet, "__dict__"):
+        taille += taille_objet(vars(objet), deja_vus)
+    return taille
+
+def taille_session_state():
+    """Taille approximative du session_state de la session courante, en octets"""
+    deja_vus = set()
+    return sum(taille_objet(st.session_state[cle], deja_vus) for cle in st.session_state)
+
+class JournalMetriques:
+    """Ajout concurrent des mesures de performance dans un fichier JSONL"""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+
+    def ecrire(self, enregistrement):
+        ligne = json.dumps(enregistrement, ensure_ascii=False) + "\n"
+        with self._verrou:
+            with open(self.chemin, "a", encoding="utf-8") as f:
+                f.write(ligne)
+
+@st.cache_resource
+def get_journal_metriques():
+    """Journal des mesures partagé par toutes les sessions, ou None s'il est désactivé"""
+    return JournalMetriques(CHEMIN_METRIQUES) if CHEMIN_METRIQUES else None
+
+def terminer_mesures(type_execution, mesures):
+    """Regroupe les mesures d'une réexécution (ou d'un fragment), les garde en session et les journalise"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    
+    # Hors d'une session Streamlit (ligne de commande, threads de travail) : rien à rattacher
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return
+    
+    durees = {}
+    appels = {}
+    for nom, duree in mesures:
+        durees[nom] = durees.get(nom, 0.0) + duree
+        appels[nom] = appels.get(nom, 0) + 1
+    
+    journal = get_journal_metriques()
+    # Parcours de tout le session_state : seulement si le panneau ou le journal l'affichent
+    mesurer_session = journal is not None or st.session_state.get("panneau_performance", False)
+    
+    enregistrement = {
+        "date": datetime.now().isoformat(timespec="milliseconds"),
+        "session": st.session_state.get("id_session"),
+        "type": type_execution,
+        "etape": st.session_state.get("current_step"),
+        "durees_ms": {nom: round(duree, 3) for nom, duree in durees.items()},
+        "appels": appels,
+        "taille_session_octets": taille_session_state() if mesurer_session else None
+    }
+    st.session_state.derniere_mesure = enregistrement
+    
+    if journal:
+        journal.ecrire(enregistrement)
+
+# Codes des notations dans AuditCompact : 0 = item absent, 1 = item sans notation,
+# 2 + position de l'option sinon
+_CODE_ABSENT = 0
+_CODE_NON_NOTE = 1
+
+class ResultatItem(MutableMapping):
+    """Vue {"notation": ..., "commentaire": ...} d'un item d'un AuditCompact, modifiable en place"""
+    __slots__ = ("_audit", "_position")
+
+    def __init__(self, audit, position):
+        self._audit = audit
+        self._position = position
+
+    def __getitem__(self, cle):
+        if cle == "notation":
+            return self._audit._notation(self._position)
+        if cle == "commentaire":
+            return self._audit._commentaires.get(self._position, "")
+        raise KeyError(cle)
+
+    def __setitem__(self, cle, valeur):
+        if cle == "notation":
+            self._audit._noter(self._position, valeur)
+        elif cle == "commentaire":
+            self._audit._commenter(self._position, valeur)
+        else:
+            raise KeyError(cle)
+
+    def __delitem__(self, cle):
+        raise TypeError("les champs d'un résultat d'audit ne peuvent pas être supprimés")
+
+    def __iter__(self):
+        return iter(("notation", "commentaire"))
+
+    def __len__(self):
+        return 2
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class AuditCompact(MutableMapping):
+    """Résultats d'un audit : notations dans un tableau d'octets indexé par la position
+    des items dans la checklist, commentaires non vides dans un dictionnaire creux.
+    Se manipule comme le dictionnaire {item_id: {"notation": ..., "commentaire": ...}}"""
+
+    def __init__(self, checklist=None, audit_data=None):
+        self.checklist = checklist or INDEX_CHECKLIST
+        self._positions = self.checklist.position_item
+        self._notations_codees = bytearray(len(self.checklist.items))
+        self._commentaires = {}
+        # Items absents de la checklist (audit d'une autre version) : conservés tels quels
+        self._hors_checklist = {}
+        # Incrémentée à chaque modification effective (détection des changements à sauvegarder)
+        self.revision = 0
+
+        for item_id, resultat in (audit_data or {}).items():
+            self[item_id] = resultat
+
+    def copie(self):
+        """Copie indépendante, sans reconstruire les résultats item par item"""
+        copie = AuditCompact.__new__(AuditCompact)
+        copie.checklist = self.checklist
+        copie._positions = self._positions
+        copie._notations_codees = bytearray(self._notations_codees)
+        copie._commentaires = dict(self._commentaires)
+        copie._hors_checklist = dict(self._hors_checklist)
+        copie.revision = self.revision
+        return copie
+
+    def _notation(self, position):
+        code = self._notations_codees[position]
+        return self.checklist.options[code - _CODE_NON_NOTE - 1] if code > _CODE_NON_NOTE else None
+
+    def _noter(self, position, notation):
+        code = _CODE_NON_NOTE + 1 + self.checklist.position_option[notation] if notation else _CODE_NON_NOTE
+        if self._notations_codees[position] != code:
+            self._notations_codees[position] = code
+            self.revision += 1
+
+    def _commenter(self, position, commentaire):
+        commentaire = commentaire or ""
+        if self._notations_codees[position] == _CODE_ABSENT:
+            self._notations_codees[position] = _CODE_NON_NOTE
+            self.revision += 1
+        ancien = self._commentaires.get(position, "")
+        if ancien == commentaire:
+            # Même texte, reçu d'un widget : le record garde l'objet du widget plutôt qu'une
+            # seconde copie, libérée avec l'ancien objet
+            if commentaire and ancien is not commentaire:
+                self._commentaires[position] = commentaire
+            return
+        if commentaire:
+            self._commentaires[position] = commentaire
+        else:
+            del self._commentaires[position]
+        self.revision += 1
+
+    def __getitem__(self, item_id):
+        position = self._positions.get(item_id)
+        if position is None:
+            return self._hors_checklist[item_id]
+        if self._notations_codees[position] == _CODE_ABSENT:
+            raise KeyError(item_id)
+        return ResultatItem(self, position)
+
+    def __setitem__(self, item_id, resultat):
+        position = self._positions.get(item_id)
+        if position is None:
+            self._hors_checklist[item_id] = dict(resultat)
+            self.revision += 1
+            return
+        self._noter(position, resultat.get("notation"))
+        self._commenter(position, resultat.get("commentaire") or "")
+
+    def __delitem__(self, item_id):
+        position = self._positions.get(item_id)
+        if position is None:
+            del self._hors_checklist[item_id]
+            self.revision += 1
+            return
+        if self._notations_codees[position] == _CODE_ABSENT:
+            raise KeyError(item_id)
+        self._notations_codees[position] = _CODE_ABSENT
+        self._commentaires.pop(position, None)
+        self.revision += 1
+
+    def __contains__(self, item_id):
+        position = self._positions.get(item_id)
+        if position is None:
+            return item_id in self._hors_checklist
+        return self._notations_codees[position] != _CODE_ABSENT
+
+    def __iter__(self):
+        for item_id, code in zip(self.checklist.items, self._notations_codees):
+            if code != _CODE_ABSENT:
+                yield item_id
+        yield from self._hors_checklist
+
+    def __len__(self):
+        return len(self._notations_codees) - self._notations_codees.count(_CODE_ABSENT) + len(self._hors_checklist)
+
+    def setdefault(self, item_id, defaut=None):
+        # MutableMapping.setdefault renverrait le dictionnaire par défaut, pas la vue modifiable
+        if item_id not in self:
+            self[item_id] = defaut or {}
+        return self[item_id]
+
+    def __repr__(self):
+        return repr(self.en_dict())
+
+    def en_dict(self):
+        """Copie sous forme de dictionnaires imbriqués (sérialisation JSON)"""
+        return {item_id: dict(resultat) for item_id, resultat in self.items()}
 
 def initialize_session_state():
     """Initialise l'état de la session"""
+    if 'version_checklist' not in st.session_state:
+        st.session_state.version_checklist = VERSION_CHECKLIST
     if 'audit_data' not in st.session_state:
-        st.session_state.audit_data = {}
+        st.session_state.audit_data = AuditCompact(checklist_session())
     if 'fournisseur_info' not in st.session_state:
         st.session_state.fournisseur_info = {}
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 1
+    if 'audit_id' not in st.session_state:
+        st.session_state.audit_id = None
+    if 'id_session' not in st.session_state:
+        st.session_state.id_session = uuid.uuid4().hex[:12]
+    if 'score_incremental' not in st.session_state:
+        st.session_state.score_incremental = ScoreIncremental(st.session_state.audit_data, checklist_session())
+
+def checklist_session():
+    """Checklist compilée utilisée par l'audit en cours"""
+    return charger_checklist(st.session_state.version_checklist)
+
+def modele_rapport_session(reference=None):
+    """Modèle du rapport de l'audit en cours, comparé à l'audit enregistré reference (ligne de
+    lister_audits) s'il est indiqué et complété par son plan d'action s'il est enregistré ;
+    reconstruit seulement quand l'un d'eux a changé"""
+    fournisseur_info = st.session_state.fournisseur_info
+    audit_data = st.session_state.audit_data
+    actions = actions_audit_session()
+    etat = (
+        id(fournisseur_info), id(audit_data), getattr(audit_data, "revision", None), st.session_state.version_checklist,
+        (reference["id"], reference["date_maj"]) if reference else None, actions
+    )
+    modele = st.session_state.get("modele_rapport")
+    if modele is None or etat[2] is None or etat != st.session_state.get("etat_modele_rapport"):
+        modele = construire_modele_rapport(fournisseur_info, audit_data, checklist_session())
+        modele_reference = modele_audit_enregistre(reference) if reference else None
+        if modele_reference:
+            modele = comparer_modeles(modele, modele_reference, reference["id"])
+        if actions is not None:
+            modele = joindre_actions(modele, st.session_state.audit_id, actions)
+        st.session_state.modele_rapport = modele
+        st.session_state.etat_modele_rapport = etat
+    return modele
+
+def actions_audit_session():
+    """Actions correctives de l'audit en cours s'il est enregistré, gardées en session tant que
+    l'audit n'est pas modifié en base"""
+    audit_id = st.session_state.audit_id
+    if not audit_id:
+        return None
+
+    stockage = get_stockage()
+    cle = (audit_id, stockage.revision_audit(audit_id))
+    en_cache = st.session_state.get("actions_audit")
+    if en_cache and en_cache[0] == cle:
+        return en_cache[1]
+
+    actions = stockage.actions_audit(audit_id)
+    st.session_state.actions_audit = (cle, actions)
+    return actions
+
+def modele_audit_enregistre(audit):
+    """Modèle du rapport d'un audit enregistré (ligne de lister_audits), gardé en session tant
+    que l'audit n'est pas modifié ; None s'il n'existe plus"""
+    cle = (audit["id"], audit["date_maj"])
+    en_cache = st.session_state.get("modele_reference")
+    if en_cache and en_cache[0] == cle:
+        return en_cache[1]
+
+    charge = get_stockage().charger_audit(audit["id"])
+    if charge is None:
+        return None
+    checklist = charger_checklist(audit["version_checklist"] or VERSION_CHECKLIST)
+    modele = construire_modele_rapport(*charge, checklist)
+    st.session_state.modele_reference = (cle, modele)
+    return modele
 
-def calculer_score_global(audit_data):
+def audits_comparables():
+    """Autres audits enregistrés du fournisseur en cours, du plus récent au plus ancien (index fournisseur/date)"""
+    nom = st.session_state.fournisseur_info.get("Nom du fournisseur", "").strip()
+    if not nom:
+        return []
+
+    # Gardés en session tant qu'aucun audit n'est modifié en base
+    stockage = get_stockage()
+    cle = (nom, st.session_state.audit_id, stockage.revision)
+    en_cache = st.session_state.get("audits_comparables")
+    if en_cache and en_cache[0] == cle:
+        return en_cache[1]
+
+    comparables = [
+        audit for audit in stockage.lister_audits(fournisseur=nom)
+        if audit["id"] != st.session_state.audit_id
+    ]
+    st.session_state.audits_comparables = (cle, comparables)
+    return comparables
+
+def charger_audit_en_session(fournisseur_info, audit_data, audit_id=None, version_checklist=VERSION_CHECKLIST):
+    """Remplace l'audit en cours par un audit existant"""
+    st.session_state.fournisseur_info = fournisseur_info
+    st.session_state.audit_id = audit_id
+    st.session_state.version_checklist = version_checklist
+    st.session_state.audit_data = AuditCompact(checklist_session(), audit_data)
+    st.session_state.score_incremental = ScoreIncremental(audit_data, checklist_session())
+    st.session_state.pop("modele_rapport", None)
+
+    # Un audit tout juste chargé n'a pas de modification à sauvegarder en brouillon
+    st.session_state.cle_brouillon = None
+    st.session_state.etat_brouillon = (
+        id(fournisseur_info), id(st.session_state.audit_data), st.session_state.audit_data.revision
+    )
+
+    # Oublier l'état des widgets de la checklist pour qu'ils reprennent les valeurs chargées
+    for key in list(st.session_state.keys()):
+        if key.startswith(("notation_", "comment_", "form_notation_", "form_comment_")):
+            del st.session_state[key]
+
+@instrumenter("calculer_score_global")
+def calculer_score_global(audit_data, checklist=None):
     """Calcule le score global de l'audit"""
+    checklist = checklist or INDEX_CHECKLIST
     total_points = 0
     total_possible = 0
     details_par_categorie = {}
     
-    for categorie, data in CHECKLIST_AUDIT.items():
+    for categorie, data in checklist.checklist.items():
         coefficient = data["coefficient"]
         points_categorie = 0
         points_possibles_categorie = 0
@@ -293,9 +545,9 @@ def calculer_score_global(audit_data):
             item_id = item["id"]
             if item_id in audit_data and audit_data[item_id]["notation"] != "N/A":
                 note = audit_data[item_id]["notation"]
-                points = NOTATION_OPTIONS[note]["points"]
+                points = checklist.notation_options[note]["points"]
                 points_categorie += points * coefficient
-                points_possibles_categorie += 20 * coefficient
+                points_possibles_categorie += checklist.points_max * coefficient
                 items_evalues += 1
         
         if items_evalues > 0:
@@ -314,201 +566,2420 @@ def calculer_score_global(audit_data):
     
     return score_global, details_par_categorie
 
-def get_niveau_conformite(score):
-    """Détermine le niveau de conformité selon le score"""
-    if score >= 90:
-        return "EXCELLENT", "#28a745"
-    elif score >= 75:
-        return "SATISFAISANT", "#5cb85c"
-    elif score >= 60:
-        return "ACCEPTABLE", "#ffc107"
-    elif score >= 40:
-        return "INSUFFISANT", "#fd7e14"
+class ScoreIncremental:
+    """Scores et progression de l'audit en cours, mis à jour en O(1) à chaque notation"""
+
+    def __init__(self, audit_data=None, checklist=None):
+        self.checklist = checklist or INDEX_CHECKLIST
+        self.points = {categorie: 0.0 for categorie in self.checklist.categories}
+        self.points_possibles = {categorie: 0.0 for categorie in self.checklist.categories}
+        self.items_evalues = {categorie: 0 for categorie in self.checklist.categories}
+        self.items_completes = 0
+        self._notations = {}
+
+        for item_id, resultat in (audit_data or {}).items():
+            self.noter(item_id, resultat.get("notation"))
+
+    def _appliquer(self, categorie, notation, signe):
+        if not notation:
+            return
+        self.items_completes += signe
+        points = self.checklist.notation_options[notation]["points"]
+        if points is not None:
+            coefficient = self.checklist.coefficient[categorie]
+            self.points[categorie] += signe * points * coefficient
+            self.points_possibles[categorie] += signe * self.checklist.points_max * coefficient
+            self.items_evalues[categorie] += signe
+
+    def noter(self, item_id, notation):
+        """Remplace la notation d'un item (None pour l'effacer)"""
+        categorie = self.checklist.categorie_item.get(item_id)
+        ancienne = self._notations.get(item_id)
+        if categorie is None or ancienne == notation:
+            return
+
+        self._appliquer(categorie, ancienne, -1)
+        self._appliquer(categorie, notation, +1)
+        self._notations[item_id] = notation
+
+    def calculer(self):
+        """Même résultat que calculer_score_global, sans reparcourir l'audit"""
+        total_points = 0
+        total_possible = 0
+        details_par_categorie = {}
+
+        for categorie, data in self.checklist.checklist.items():
+            if self.items_evalues[categorie] > 0:
+                details_par_categorie[categorie] = {
+                    "score": (self.points[categorie] / self.points_possibles[categorie]) * 100,
+                    "points": self.points[categorie],
+                    "points_possibles": self.points_possibles[categorie],
+                    "items_evalues": self.items_evalues[categorie],
+                    "criticite": data["criticite"]
+                }
+                total_points += self.points[categorie]
+                total_possible += self.points_possibles[categorie]
+
+        score_global = (total_points / total_possible * 100) if total_possible > 0 else 0
+
+        return score_global, details_par_categorie
+
+def _vecteurs_scoring(checklist):
+    """Vecteurs précalculés d'une checklist pour le scoring vectorisé"""
+    return _vecteurs_scoring_version(checklist.version, checklist)
+
+@st.cache_resource(show_spinner=False)
+def _vecteurs_scoring_version(version, _checklist):
+    import numpy as np
+    
+    checklist = _checklist
+
+    items = list(checklist.items)
+    coefficients = np.array(
+        [checklist.coefficient[checklist.categorie_item[item_id]] for item_id in items], dtype=np.float64
+    )
+
+    # Matrice d'appartenance items × catégories
+    position_categorie = {categorie: c for c, categorie in enumerate(checklist.categories)}
+    appartenance = np.zeros((len(items), len(checklist.categories)), dtype=np.float64)
+    for j, item_id in enumerate(items):
+        appartenance[j, position_categorie[checklist.categorie_item[item_id]]] = 1.0
+
+    # Points et caractère évaluable de chaque code de notation (0 = non noté ; N/A et non noté exclus)
+    options = checklist.notation_options.values()
+    points_code = np.array([0.0] + [opt["points"] or 0.0 for opt in options])
+    evalue_code = np.array([False] + [opt["points"] is not None for opt in options])
+
+    positions = {item_id: j for j, item_id in enumerate(items)}
+    codes = {note: position + 1 for note, position in checklist.position_option.items()}
+    nb_codes = len(codes) + 1
+
+    return {
+        "categories": list(checklist.categories),
+        "items": items,
+        "positions": positions,
+        "codes": codes,
+        # Colonne et code de chaque couple (item, notation), en un seul entier (matrice_notations_plates)
+        "nb_codes": nb_codes,
+        "cles": {
+            (item_id, note): j * nb_codes + code for item_id, j in positions.items() for note, code in codes.items()
+        },
+        "coefficients": coefficients,
+        "appartenance": appartenance,
+        "points_code": points_code,
+        "evalue_code": evalue_code,
+        "points_max": checklist.points_max
+    }
+
+class ConfigurationScoring(NamedTuple):
+    """Règles de notation : coefficients par criticité, points par notation et seuils des niveaux"""
+    coefficients: Mapping       # criticité → coefficient
+    points: Mapping             # notation → points (None : item non évalué, comme N/A)
+    niveaux: tuple              # (score minimal, niveau, couleur), du plus exigeant au moins exigeant
+
+def configuration_scoring(coefficients=None, points=None, seuils=None, checklist=None):
+    """Configuration de notation : celle de la checklist, modifiée par les valeurs indiquées.
+    seuils : {niveau: score minimal}. Lève ValueError si la configuration est incohérente, ou si
+    des catégories de même criticité ont des coefficients différents (non modifiables par criticité)"""
+    checklist = checklist or INDEX_CHECKLIST
+
+    coefficients_actuels = {}
+    for categorie, data in checklist.checklist.items():
+        coefficient = coefficients_actuels.setdefault(data["criticite"], data["coefficient"])
+        if coefficient != data["coefficient"]:
+            raise ValueError(
+                f"Checklist {checklist.version} : les catégories {data['criticite']} n'ont pas toutes le même "
+                f"coefficient ({categorie} : {data['coefficient']}, autres : {coefficient})"
+            )
+    inconnues = set(coefficients or {}) - set(coefficients_actuels)
+    if inconnues:
+        raise ValueError(f"Criticité inconnue : {', '.join(sorted(inconnues))}")
+    coefficients_actuels.update(coefficients or {})
+    if any(coefficient < 0 for coefficient in coefficients_actuels.values()):
+        raise ValueError("Les coefficients doivent être positifs")
+
+    points_actuels = {note: option["points"] for note, option in checklist.notation_options.items()}
+    inconnues = set(points or {}) - set(points_actuels)
+    if inconnues:
+        raise ValueError(f"Notation inconnue : {', '.join(sorted(inconnues))}")
+    points_actuels.update(points or {})
+    if not any(points_notation for points_notation in points_actuels.values()):
+        raise ValueError("Au moins une notation doit rapporter des points")
+
+    seuils_actuels = {niveau: seuil for seuil, niveau, _ in NIVEAUX_CONFORMITE}
+    inconnus = set(seuils or {}) - set(seuils_actuels)
+    if inconnus:
+        raise ValueError(f"Niveau inconnu : {', '.join(sorted(inconnus))}")
+    seuils_actuels.update(seuils or {})
+    niveaux = tuple((seuils_actuels[niveau], niveau, couleur) for _, niveau, couleur in NIVEAUX_CONFORMITE)
+    if any(plus_exigeant[0] < suivant[0] for plus_exigeant, suivant in zip(niveaux, niveaux[1:])):
+        raise ValueError("Les seuils doivent décroître d'EXCELLENT à NON CONFORME")
+
+    return ConfigurationScoring(
+        coefficients=types.MappingProxyType(coefficients_actuels),
+        points=types.MappingProxyType(points_actuels),
+        niveaux=niveaux
+    )
+
+def _vecteurs_configuration(checklist, configuration):
+    """Vecteurs de scoring d'une checklist sous une autre configuration de notation"""
+    import numpy as np
+
+    vecteurs = _vecteurs_scoring(checklist)
+    coefficients = np.array(
+        [
+            configuration.coefficients.get(
+                checklist.checklist[checklist.categorie_item[item_id]]["criticite"],
+                checklist.coefficient[checklist.categorie_item[item_id]]
+            )
+            for item_id in vecteurs["items"]
+        ],
+        dtype=np.float64
+    )
+    points = [configuration.points.get(note, option["points"]) for note, option in checklist.notation_options.items()]
+
+    return {
+        **vecteurs,
+        "coefficients": coefficients,
+        "points_code": np.array([0.0] + [p or 0.0 for p in points]),
+        "evalue_code": np.array([False] + [p is not None for p in points]),
+        "points_max": max(p for p in points if p is not None)
+    }
+
+def matrice_notations(audits, checklist=None):
+    """Construit la matrice des codes de notation (audits × items de la checklist).
+    Les AuditCompact de la checklist sont recopiés tels quels ; les autres audits sont lus item par item"""
+    import numpy as np
+
+    checklist = checklist or INDEX_CHECKLIST
+    vecteurs = _vecteurs_scoring(checklist)
+    positions = vecteurs["positions"]
+    codes = vecteurs["codes"]
+    matrice = np.zeros((len(audits), len(positions)), dtype=np.int8)
+
+    compacts = []
+    for i, audit_data in enumerate(audits):
+        if isinstance(audit_data, AuditCompact) and audit_data.checklist.version == checklist.version:
+            compacts.append(i)
+            continue
+        for item_id, resultat in audit_data.items():
+            j = positions.get(item_id)
+            code = codes.get(resultat.get("notation"))
+            if j is not None and code:
+                matrice[i, j] = code
+
+    if compacts:
+        # Codes AuditCompact : 0 absent, 1 non noté, 2 + position ; matrice : 0 non noté, 1 + position
+        codes_compacts = np.frombuffer(
+            b"".join(audits[i]._notations_codees for i in compacts), dtype=np.uint8
+        ).reshape(len(compacts), len(positions))
+        matrice[compacts] = np.maximum(codes_compacts, _CODE_NON_NOTE) - _CODE_NON_NOTE
+
+    return matrice
+
+def matrice_notations_plates(notations, checklist=None):
+    """matrice_notations pour des audits lus en base, donnés en {item_id: notation} :
+    une seule recherche par item noté, faite par itération native, sans boucle Python"""
+    import numpy as np
+
+    checklist = checklist or INDEX_CHECKLIST
+    vecteurs = _vecteurs_scoring(checklist)
+    nb_codes = vecteurs["nb_codes"]
+    matrice = np.zeros((len(notations), len(vecteurs["items"])), dtype=np.int8)
+
+    lignes = np.repeat(np.arange(len(notations), dtype=np.int64), [len(n) for n in notations])
+    # (item_id, notation) → colonne × nb_codes + code ; -1 hors checklist, notation vide ou inconnue
+    cles = np.fromiter(
+        map(
+            vecteurs["cles"].get,
+            itertools.chain.from_iterable(map(operator.methodcaller("items"), notations)),
+            itertools.repeat(-1)
+        ),
+        dtype=np.int64,
+        count=len(lignes)
+    )
+    retenues = cles >= 0
+    cles = cles[retenues]
+    matrice[lignes[retenues], cles // nb_codes] = cles % nb_codes
+
+    return matrice
+
+def scorer_matrice(matrice, checklist=None, configuration=None):
+    """Calcule en une passe les scores par catégorie et globaux d'une matrice de notations
+    (selon la configuration de notation indiquée, celle de la checklist par défaut)"""
+    import numpy as np
+
+    checklist = checklist or INDEX_CHECKLIST
+    if configuration is None:
+        vecteurs = _vecteurs_scoring(checklist)
     else:
-        return "NON CONFORME", "#dc3545"
+        vecteurs = _vecteurs_configuration(checklist, configuration)
+    coefficients = vecteurs["coefficients"]
+    appartenance = vecteurs["appartenance"]
 
-def generer_rapport_excel(fournisseur_info, audit_data):
-    """Génère un rapport d'audit complet en Excel avec xlsxwriter"""
-    try:
-        import xlsxwriter
-        
-        # Créer un buffer en mémoire
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        
-        # Définir les formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'font_color': 'white',
-            'bg_color': '#2C3E50',
-            'font_size': 12,
-            'align': 'center',
-            'valign': 'vcenter',
-            'border': 1
-        })
-        
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 16,
-            'align': 'left'
-        })
-        
-        bold_format = workbook.add_format({'bold': True})
-        
-        conforme_format = workbook.add_format({
-            'bg_color': '#D5F4E6',
-            'border': 1
-        })
-        
-        mineur_format = workbook.add_format({
-            'bg_color': '#FFF3CD',
-            'border': 1
-        })
-        
-        majeur_format = workbook.add_format({
-            'bg_color': '#F8D7DA',
-            'border': 1
-        })
-        
-        border_format = workbook.add_format({'border': 1})
-        
-        # FEUILLE 1: Informations Fournisseur
-        ws1 = workbook.add_worksheet("Informations Fournisseur")
-        ws1.write(0, 0, "RAPPORT D'AUDIT FOURNISSEUR BIOCOOP", title_format)
-        ws1.merge_range(0, 0, 0, 3, "RAPPORT D'AUDIT FOURNISSEUR BIOCOOP", title_format)
-        
-        row = 2
-        for key, value in fournisseur_info.items():
-            ws1.write(row, 0, key, bold_format)
-            ws1.write(row, 1, str(value))
-            row += 1
-        
-        ws1.set_column('A:A', 35)
-        ws1.set_column('B:B', 50)
-        
-        # FEUILLE 2: Résultats Audit
-        ws2 = workbook.add_worksheet("Résultats Audit")
-        
-        headers = ["ID", "Catégorie", "Question", "Notation", "Commentaire", "Criticité"]
-        for col, header in enumerate(headers):
-            ws2.write(0, col, header, header_format)
-        
-        row = 1
-        for categorie, data in CHECKLIST_AUDIT.items():
-            for item in data["items"]:
-                item_id = item["id"]
-                if item_id in audit_data:
-                    notation = audit_data[item_id]["notation"]
-                    commentaire = audit_data[item_id].get("commentaire", "")
-                    
-                    # Choisir le format selon la notation
-                    if notation == "A":
-                        cell_format = conforme_format
-                    elif notation == "B":
-                        cell_format = mineur_format
-                    elif notation == "C":
-                        cell_format = majeur_format
-                    else:
-                        cell_format = border_format
-                    
-                    ws2.write(row, 0, item_id, cell_format)
-                    ws2.write(row, 1, categorie.split(".")[1].strip(), cell_format)
-                    ws2.write(row, 2, item["question"], cell_format)
-                    ws2.write(row, 3, notation, cell_format)
-                    ws2.write(row, 4, commentaire, cell_format)
-                    ws2.write(row, 5, data["criticite"], cell_format)
-                    
-                    row += 1
-        
-        ws2.set_column('A:A', 12)
-        ws2.set_column('B:B', 30)
-        ws2.set_column('C:C', 50)
-        ws2.set_column('D:D', 12)
-        ws2.set_column('E:E', 40)
-        ws2.set_column('F:F', 15)
-        
-        # FEUILLE 3: Plan d'Action
-        ws3 = workbook.add_worksheet("Plan d'Action")
-        
-        action_headers = ["ID", "Point d'audit", "Non-conformité", "Action corrective", 
-                         "Responsable", "Délai", "Statut", "Date clôture", "Commentaires"]
-        for col, header in enumerate(action_headers):
-            ws3.write(0, col, header, header_format)
-        
-        row = 1
-        for categorie, data in CHECKLIST_AUDIT.items():
-            for item in data["items"]:
-                item_id = item["id"]
-                if item_id in audit_data and audit_data[item_id]["notation"] in ["B", "C"]:
-                    cell_format = majeur_format if audit_data[item_id]["notation"] == "C" else mineur_format
-                    
-                    ws3.write(row, 0, item_id, cell_format)
-                    ws3.write(row, 1, item["question"], cell_format)
-                    ws3.write(row, 2, audit_data[item_id].get("commentaire", ""), cell_format)
-                    ws3.write(row, 3, "[À définir]", cell_format)
-                    ws3.write(row, 4, "[Responsable]", cell_format)
-                    ws3.write(row, 5, "[Date limite]", cell_format)
-                    ws3.write(row, 6, "En cours", cell_format)
-                    ws3.write(row, 7, "", cell_format)
-                    ws3.write(row, 8, "", cell_format)
-                    
-                    row += 1
-        
-        ws3.set_column('A:A', 12)
-        ws3.set_column('B:B', 40)
-        ws3.set_column('C:C', 35)
-        ws3.set_column('D:D', 35)
-        ws3.set_column('E:E', 20)
-        ws3.set_column('F:F', 15)
-        ws3.set_column('G:G', 12)
-        ws3.set_column('H:H', 15)
-        ws3.set_column('I:I', 30)
-        
-        # FEUILLE 4: Synthèse
-        ws4 = workbook.add_worksheet("Synthèse")
-        
-        score_global, details = calculer_score_global(audit_data)
-        niveau, couleur = get_niveau_conformite(score_global)
-        
-        ws4.write(0, 0, "SYNTHÈSE DE L'AUDIT", title_format)
-        ws4.merge_range(0, 0, 0, 3, "SYNTHÈSE DE L'AUDIT", title_format)
-        
-        ws4.write(2, 0, "Score Global", bold_format)
-        ws4.write(2, 1, f"{score_global:.1f}%", bold_format)
-        ws4.write(3, 0, "Niveau de Conformité", bold_format)
-        ws4.write(3, 1, niveau, bold_format)
-        
-        ws4.write(5, 0, "Scores par catégorie", bold_format)
-        
-        headers_synth = ["Catégorie", "Score (%)", "Criticité", "Items évalués"]
-        for col, header in enumerate(headers_synth):
-            ws4.write(6, col, header, header_format)
-        
-        row = 7
-        for categorie, info in details.items():
-            ws4.write(row, 0, categorie.split(".")[1].strip())
-            ws4.write(row, 1, f"{info['score']:.1f}%")
-            ws4.write(row, 2, info['criticite'])
-            ws4.write(row, 3, info['items_evalues'])
-            row += 1
-        
-        ws4.set_column('A:A', 40)
-        ws4.set_column('B:B', 15)
-        ws4.set_column('C:C', 15)
-        ws4.set_column('D:D', 15)
-        
-        # Fermer le workbook
-        workbook.close()
-        
-        # Récupérer le buffer
-        output.seek(0)
-        return output
-        
-    except Exception as e:
-        st.error(f"❌ Erreur lors de la génération du rapport Excel : {e}")
-        return None
+    evalue = vecteurs["evalue_code"][matrice]
+    points = vecteurs["points_code"][matrice] * coefficients
+    possibles = np.where(evalue, vecteurs["points_max"] * coefficients, 0.0)
+
+    points_categories = points @ appartenance
+    possibles_categories = possibles @ appartenance
+    items_evalues = evalue.astype(np.int64) @ appartenance.astype(np.int64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores_categories = np.where(
+            items_evalues > 0, (points_categories / possibles_categories) * 100, np.nan
+        )
+
+    # Les catégories sans item évalué ne comptent pas dans le total
+    total_points = np.where(items_evalues > 0, points_categories, 0.0).sum(axis=1)
+    total_possible = np.where(items_evalues > 0, possibles_categories, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores_globaux = np.where(total_possible > 0, total_points / total_possible * 100, 0.0)
+
+    return {
+        "score_global": scores_globaux,
+        "scores": scores_categories,
+        "points": points_categories,
+        "points_possibles": possibles_categories,
+        "items_evalues": items_evalues
+    }
+
+def calculer_scores_lot(audits, checklist=None):
+    """Même résultat que calculer_score_global pour chacun des N audits, au format de celui-ci.
+    La construction des dictionnaires de résultat coûte autant que le calcul : pour un lot, préférer
+    scorer_matrice sur une matrice déjà construite (matrice_notations_plates pour des audits lus en base)"""
+    checklist = checklist or INDEX_CHECKLIST
+    resultat = scorer_matrice(matrice_notations(audits, checklist), checklist)
+
+    scores = []
+    for i in range(len(audits)):
+        details_par_categorie = {}
+        for c, categorie in enumerate(checklist.categories):
+            items_evalues = int(resultat["items_evalues"][i, c])
+            if items_evalues > 0:
+                details_par_categorie[categorie] = {
+                    "score": float(resultat["scores"][i, c]),
+                    "points": float(resultat["points"][i, c]),
+                    "points_possibles": float(resultat["points_possibles"][i, c]),
+                    "items_evalues": items_evalues,
+                    "criticite": checklist.checklist[categorie]["criticite"]
+                }
+        score_global = float(resultat["score_global"][i]) if details_par_categorie else 0
+        scores.append((score_global, details_par_categorie))
+
+    return scores
+
+# Niveaux de conformité : (score minimal, niveau, couleur), du plus exigeant au moins exigeant
+NIVEAUX_CONFORMITE = (
+    (90, "EXCELLENT", "#28a745"),
+    (75, "SATISFAISANT", "#5cb85c"),
+    (60, "ACCEPTABLE", "#ffc107"),
+    (40, "INSUFFISANT", "#fd7e14"),
+    (0, "NON CONFORME", "#dc3545")
+)
+
+def get_niveau_conformite(score, niveaux=NIVEAUX_CONFORMITE):
+    """Détermine le niveau de conformité selon le score"""
+    for seuil, niveau, couleur in niveaux:
+        if score >= seuil:
+            return niveau, couleur
+    return niveaux[-1][1], niveaux[-1][2]
+
+class LigneRapport(NamedTuple):
+    """Résultat d'un item de l'audit, tel qu'il figure dans le rapport"""
+    item_id: str
+    categorie: str
+    nom_categorie: str
+    question: str
+    notation: str
+    commentaire: str
+    criticite: str
+    coefficient: float
+    points: float               # None si l'item est N/A ou non noté
+
+    @property
+    def non_conforme(self):
+        return self.notation in ("B", "C")
+
+    @property
+    def gravite(self):
+        return "Majeure" if self.notation == "C" else "Mineure"
+
+class ComparaisonAudits(NamedTuple):
+    """Écarts entre un audit et un audit antérieur (de référence) du même fournisseur"""
+    reference_id: int
+    date_reference: str
+    score_reference: float
+    niveau_reference: str
+    delta_score: float
+    categories: tuple           # (nom, score de référence, score, écart) ; score None si catégorie non évaluée
+    changements: tuple          # (item_id, nom_categorie, question, notation de référence, notation)
+    nc_resolues: tuple          # LigneRapport de la référence, plus notées B ou C
+    nc_persistantes: tuple      # LigneRapport de l'audit, déjà notées B ou C dans la référence
+    nc_nouvelles: tuple         # LigneRapport de l'audit, non-conformes pour la première fois
+
+class ModeleRapport(NamedTuple):
+    """Rapport d'un audit, immuable : scores, niveau, lignes par item et non-conformités.
+    Calculé une fois par version de l'audit, il alimente l'affichage et tous les exports"""
+    cle: str                    # empreinte de l'audit (cle_rapport), None si non calculée
+    version_checklist: str
+    fournisseur_info: Mapping
+    score_global: float
+    niveau: str
+    couleur: str
+    details: Mapping            # catégorie → {"nom", "score", "points", "points_possibles", "items_evalues", "criticite"}
+    lignes: tuple               # LigneRapport des items renseignés, dans l'ordre de la checklist
+    non_conformites: tuple      # LigneRapport notées B ou C
+    comparaison: ComparaisonAudits = None
+    audit_id: int = None        # audit enregistré dont le modèle porte le plan d'action
+    actions: Mapping = None     # item_id → ActionCorrective
+
+    def __hash__(self):
+        return hash(self.cle)
+
+def joindre_actions(modele, audit_id, actions):
+    """Modèle du rapport complété par les actions correctives enregistrées de l'audit"""
+    cle = None
+    if modele.cle:
+        cle = hashlib.sha256(f"{modele.cle}:{audit_id}:{actions!r}".encode("utf-8")).hexdigest()
+    return modele._replace(
+        cle=cle, audit_id=audit_id, actions=types.MappingProxyType({action.item_id: action for action in actions})
+    )
+
+def comparer_modeles(modele, reference, reference_id=None):
+    """Modèle du rapport complété par sa comparaison avec le modèle d'un audit antérieur"""
+    lignes_reference = {ligne.item_id: ligne for ligne in reference.lignes}
+    lignes = {ligne.item_id: ligne for ligne in modele.lignes}
+
+    changements = []
+    for ligne in modele.lignes:
+        ancienne = lignes_reference.get(ligne.item_id)
+        notation_reference = ancienne.notation if ancienne else None
+        if notation_reference != ligne.notation:
+            changements.append((ligne.item_id, ligne.nom_categorie, ligne.question, notation_reference, ligne.notation))
+    for ancienne in reference.lignes:
+        if ancienne.item_id not in lignes and ancienne.notation is not None:
+            changements.append((ancienne.item_id, ancienne.nom_categorie, ancienne.question, ancienne.notation, None))
+
+    # Scores par catégorie rapprochés par nom : les deux audits peuvent suivre des versions différentes
+    scores = {info["nom"]: info["score"] for info in modele.details.values()}
+    scores_reference = {info["nom"]: info["score"] for info in reference.details.values()}
+    categories = []
+    for nom in list(scores) + [nom for nom in scores_reference if nom not in scores]:
+        score, score_reference = scores.get(nom), scores_reference.get(nom)
+        ecart = score - score_reference if score is not None and score_reference is not None else None
+        categories.append((nom, score_reference, score, ecart))
+
+    nc_reference = {ligne.item_id for ligne in reference.non_conformites}
+    nc = {ligne.item_id for ligne in modele.non_conformites}
+    comparaison = ComparaisonAudits(
+        reference_id=reference_id,
+        date_reference=reference.fournisseur_info.get("Date audit", ""),
+        score_reference=reference.score_global,
+        niveau_reference=reference.niveau,
+        delta_score=modele.score_global - reference.score_global,
+        categories=tuple(categories),
+        changements=tuple(changements),
+        nc_resolues=tuple(ligne for ligne in reference.non_conformites if ligne.item_id not in nc),
+        nc_persistantes=tuple(ligne for ligne in modele.non_conformites if ligne.item_id in nc_reference),
+        nc_nouvelles=tuple(ligne for ligne in modele.non_conformites if ligne.item_id not in nc_reference)
+    )
+
+    cle = None
+    if modele.cle and reference.cle:
+        cle = hashlib.sha256(f"{modele.cle}:{reference.cle}".encode("utf-8")).hexdigest()
+    return modele._replace(cle=cle, comparaison=comparaison)
+
+@instrumenter("construire_modele_rapport")
+def construire_modele_rapport(fournisseur_info, audit_data, checklist=None, empreinte=True):
+    """Construit le modèle du rapport en un seul parcours de la checklist (mêmes scores que calculer_score_global).
+    empreinte=False : sans empreinte (cle=None), pour les exports qui ne passent pas par le cache des rapports"""
+    checklist = checklist or INDEX_CHECKLIST
+    lignes = []
+    details_par_categorie = {}
+    total_points = 0
+    total_possible = 0
+
+    for categorie, data in checklist.checklist.items():
+        coefficient = data["coefficient"]
+        points_categorie = 0
+        points_possibles_categorie = 0
+        items_evalues = 0
+
+        for item in data["items"]:
+            resultat = audit_data.get(item["id"])
+            if resultat is None:
+                continue
+            notation = resultat.get("notation")
+            points = checklist.notation_options[notation]["points"] if notation else None
+            lignes.append(LigneRapport(
+                item["id"], categorie, checklist.nom_categorie[categorie], item["question"],
+                notation, resultat.get("commentaire", ""), data["criticite"], coefficient, points
+            ))
+            if points is not None:
+                points_categorie += points * coefficient
+                points_possibles_categorie += checklist.points_max * coefficient
+                items_evalues += 1
+
+        if items_evalues > 0:
+            details_par_categorie[categorie] = types.MappingProxyType({
+                "nom": checklist.nom_categorie[categorie],
+                "score": (points_categorie / points_possibles_categorie) * 100,
+                "points": points_categorie,
+                "points_possibles": points_possibles_categorie,
+                "items_evalues": items_evalues,
+                "criticite": data["criticite"]
+            })
+            total_points += points_categorie
+            total_possible += points_possibles_categorie
+
+    score_global = (total_points / total_possible * 100) if total_possible > 0 else 0
+    niveau, couleur = get_niveau_conformite(score_global)
+
+    return ModeleRapport(
+        cle=cle_rapport(fournisseur_info, audit_data, checklist) if empreinte else None,
+        version_checklist=checklist.version,
+        fournisseur_info=types.MappingProxyType(dict(fournisseur_info)),
+        score_global=score_global,
+        niveau=niveau,
+        couleur=couleur,
+        details=types.MappingProxyType(details_par_categorie),
+        lignes=tuple(lignes),
+        non_conformites=tuple(ligne for ligne in lignes if ligne.non_conforme)
+    )
+
+def _date_iso(date_fr):
+    """Convertit une date JJ/MM/AAAA en AAAA-MM-JJ (ordre de tri de l'index)"""
+    try:
+        return datetime.strptime(date_fr, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return date_fr or ""
+
+def _date_fr(date_iso):
+    """Convertit une date AAAA-MM-JJ en JJ/MM/AAAA (affichage)"""
+    try:
+        return datetime.strptime(date_iso, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except (TypeError, ValueError):
+        return date_iso or ""
+
+def _date_action(valeur, item_id=""):
+    """Date d'une action (date, JJ/MM/AAAA ou AAAA-MM-JJ) au format AAAA-MM-JJ ; ValueError si illisible"""
+    if hasattr(valeur, "strftime"):
+        return valeur.strftime("%Y-%m-%d")
+    for format_date in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(valeur).strip(), format_date).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"Date invalide pour {item_id} : {valeur}")
+
+class ActionCorrective(NamedTuple):
+    """Action corrective d'une non-conformité d'un audit (dates au format AAAA-MM-JJ)"""
+    id: int
+    audit_id: int
+    item_id: str
+    action: str
+    responsable: str
+    echeance: str
+    statut: str
+    date_cloture: str
+    commentaire: str
+
+class StockageAudits:
+    """Stockage persistant des audits, fournisseurs et résultats par item (SQLite)"""
+
+    # Condition des actions dont l'item est actuellement non conforme (alias de la table : ac)
+    ACTION_NON_CONFORME = (
+        "EXISTS (SELECT 1 FROM resultats r WHERE r.audit_id = ac.audit_id AND r.item_id = ac.item_id "
+        "AND r.notation IN ('B', 'C'))"
+    )
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fournisseurs (
+            id INTEGER PRIMARY KEY,
+            nom TEXT NOT NULL UNIQUE,
+            adresse TEXT,
+            type_site TEXT
+        );
+        CREATE TABLE IF NOT EXISTS audits (
+            id INTEGER PRIMARY KEY,
+            fournisseur_id INTEGER NOT NULL REFERENCES fournisseurs(id),
+            date_audit TEXT NOT NULL,
+            auditeur TEXT,
+            version_checklist TEXT,
+            fournisseur_info TEXT NOT NULL,
+            date_maj TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS resultats (
+            audit_id INTEGER NOT NULL REFERENCES audits(id) ON DELETE CASCADE,
+            item_id TEXT NOT NULL,
+            notation TEXT,
+            commentaire TEXT,
+            PRIMARY KEY (audit_id, item_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_audits_fournisseur_date ON audits(fournisseur_id, date_audit);
+        CREATE INDEX IF NOT EXISTS idx_audits_date ON audits(date_audit);
+        CREATE INDEX IF NOT EXISTS idx_audits_auditeur ON audits(auditeur);
+        CREATE INDEX IF NOT EXISTS idx_resultats_item ON resultats(item_id, notation);
+        CREATE TABLE IF NOT EXISTS commentaires_index (
+            id INTEGER PRIMARY KEY,
+            audit_id INTEGER NOT NULL REFERENCES audits(id) ON DELETE CASCADE,
+            item_id TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_commentaires_audit ON commentaires_index(audit_id);
+        CREATE TABLE IF NOT EXISTS actions (
+            id INTEGER PRIMARY KEY,
+            audit_id INTEGER NOT NULL REFERENCES audits(id) ON DELETE CASCADE,
+            item_id TEXT NOT NULL,
+            action TEXT,
+            responsable TEXT,
+            echeance TEXT,
+            statut TEXT NOT NULL DEFAULT 'En cours',
+            date_cloture TEXT,
+            commentaire TEXT,
+            UNIQUE (audit_id, item_id)
+        );
+        -- Actions ouvertes par échéance : liste des retards sans parcourir les actions terminées
+        CREATE INDEX IF NOT EXISTS idx_actions_echeance ON actions(echeance) WHERE statut <> 'Terminé';
+    """
+
+    # Index plein texte des commentaires (rowid = commentaires_index.id), sans accents ni casse
+    SCHEMA_RECHERCHE = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS recherche_commentaires
+        USING fts5(commentaire, tokenize = 'unicode61 remove_diacritics 2')
+    """
+
+    def __init__(self, chemin=CHEMIN_BASE_AUDITS):
+        self.chemin = chemin
+        # Une seule connexion partagée entre les sessions, protégée par un verrou
+        self._verrou = threading.RLock()
+        self._conn = sqlite3.connect(chemin, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if chemin != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.SCHEMA)
+        self._ecouteurs = []
+        # Nombre de modifications (de la base, de chaque audit) faites par ce processus
+        self.revision = 0
+        self._revisions = {}
+
+        # SQLite sans FTS5 : la recherche se replie sur LIKE
+        try:
+            self._conn.execute(self.SCHEMA_RECHERCHE)
+            self.recherche_fts = True
+        except sqlite3.OperationalError:
+            self.recherche_fts = False
+        if self.recherche_fts and not self._conn.execute("SELECT 1 FROM commentaires_index LIMIT 1").fetchone():
+            with self._conn:
+                self._indexer_commentaires()
+        # Base antérieure au suivi des actions : une action par non-conformité déjà enregistrée
+        if not self._conn.execute("SELECT 1 FROM actions LIMIT 1").fetchone():
+            with self._conn:
+                self._synchroniser_actions()
+
+    def _indexer_commentaires(self, audit_id=None):
+        """(Ré)indexe les commentaires d'un audit, ou de tous les audits
+        (à appeler sous verrou, dans la transaction de l'appelant)"""
+        filtre, parametres = (" WHERE audit_id = ?", (audit_id,)) if audit_id is not None else ("", ())
+        self._conn.execute(
+            "DELETE FROM recherche_commentaires WHERE rowid IN "
+            f"(SELECT id FROM commentaires_index{filtre})", parametres
+        )
+        self._conn.execute(f"DELETE FROM commentaires_index{filtre}", parametres)
+        self._conn.execute(
+            "INSERT INTO commentaires_index (audit_id, item_id) SELECT audit_id, item_id FROM resultats"
+            f"{filtre}{' AND' if filtre else ' WHERE'} commentaire <> ''", parametres
+        )
+        self._conn.execute(
+            "INSERT INTO recherche_commentaires (rowid, commentaire) "
+            "SELECT c.id, r.commentaire FROM commentaires_index c "
+            "JOIN resultats r ON r.audit_id = c.audit_id AND r.item_id = c.item_id"
+            f"{filtre.replace('audit_id', 'c.audit_id')}", parametres
+        )
+
+    def ajouter_ecouteur(self, fonction):
+        """Appelle fonction(audit_id) après chaque enregistrement ou suppression d'un audit"""
+        self._ecouteurs.append(fonction)
+
+    def revision_audit(self, audit_id):
+        """Nombre de modifications de l'audit (enregistrement, actions, suppression) faites par ce processus"""
+        return self._revisions.get(audit_id, 0)
+
+    def _notifier(self, audit_id):
+        with self._verrou:
+            self.revision += 1
+            self._revisions[audit_id] = self._revisions.get(audit_id, 0) + 1
+        # Hors verrou : un écouteur peut relire la base
+        for fonction in self._ecouteurs:
+            fonction(audit_id)
+
+    def fermer(self):
+        with self._verrou:
+            self._conn.close()
+
+    def enregistrer_audit(self, fournisseur_info, audit_data, audit_id=None, version_checklist=VERSION_CHECKLIST):
+        """Enregistre (ou met à jour) un audit et renvoie son identifiant"""
+        nom = fournisseur_info.get("Nom du fournisseur", "").strip() or "Fournisseur sans nom"
+
+        with self._verrou, self._conn:
+            self._conn.execute(
+                "INSERT INTO fournisseurs (nom, adresse, type_site) VALUES (?, ?, ?) "
+                "ON CONFLICT(nom) DO UPDATE SET adresse = excluded.adresse, type_site = excluded.type_site",
+                (nom, fournisseur_info.get("Adresse", ""), fournisseur_info.get("Type site", ""))
+            )
+            fournisseur_id = self._conn.execute(
+                "SELECT id FROM fournisseurs WHERE nom = ?", (nom,)
+            ).fetchone()[0]
+
+            valeurs = (
+                fournisseur_id,
+                _date_iso(fournisseur_info.get("Date audit")),
+                fournisseur_info.get("Auditeur", ""),
+                version_checklist,
+                json.dumps(fournisseur_info, ensure_ascii=False),
+                datetime.now().isoformat(timespec="seconds")
+            )
+
+            if audit_id is None:
+                audit_id = self._conn.execute(
+                    "INSERT INTO audits (fournisseur_id, date_audit, auditeur, version_checklist, "
+                    "fournisseur_info, date_maj) VALUES (?, ?, ?, ?, ?, ?)",
+                    valeurs
+                ).lastrowid
+            else:
+                self._conn.execute(
+                    "UPDATE audits SET fournisseur_id = ?, date_audit = ?, auditeur = ?, "
+                    "version_checklist = ?, fournisseur_info = ?, date_maj = ? WHERE id = ?",
+                    valeurs + (audit_id,)
+                )
+                self._conn.execute("DELETE FROM resultats WHERE audit_id = ?", (audit_id,))
+
+            self._conn.executemany(
+                "INSERT INTO resultats (audit_id, item_id, notation, commentaire) VALUES (?, ?, ?, ?)",
+                [
+                    (audit_id, item_id, resultat.get("notation"), resultat.get("commentaire", ""))
+                    for item_id, resultat in audit_data.items()
+                ]
+            )
+
+            if self.recherche_fts:
+                self._indexer_commentaires(audit_id)
+            self._synchroniser_actions(audit_id)
+
+        self._notifier(audit_id)
+        return audit_id
+
+    def _synchroniser_actions(self, audit_id=None):
+        """Crée une action corrective par nouvelle non-conformité (B ou C) et retire celles des items
+        absents de l'audit, pour un audit ou pour tous (à appeler sous verrou, dans une transaction).
+        Les actions existantes sont gardées telles quelles : un item renoté conforme puis de nouveau
+        non conforme retrouve son action ; seules celles des items non conformes sont lues"""
+        filtre, parametres = (" AND audit_id = ?", (audit_id,)) if audit_id is not None else ("", ())
+        self._conn.execute(
+            "INSERT OR IGNORE INTO actions (audit_id, item_id) "
+            "SELECT audit_id, item_id FROM resultats WHERE notation IN ('B', 'C')" + filtre,
+            parametres
+        )
+        self._conn.execute(
+            "DELETE FROM actions WHERE NOT EXISTS (SELECT 1 FROM resultats r WHERE r.audit_id = actions.audit_id "
+            "AND r.item_id = actions.item_id)" + filtre,
+            parametres
+        )
+
+    def actions_audit(self, audit_id):
+        """Actions correctives d'un audit, dans l'ordre de création"""
+        with self._verrou:
+            return tuple(
+                ActionCorrective(*r) for r in self._conn.execute(
+                    "SELECT id, audit_id, item_id, action, responsable, echeance, statut, date_cloture, commentaire "
+                    f"FROM actions ac WHERE audit_id = ? AND {self.ACTION_NON_CONFORME} ORDER BY id", (audit_id,)
+                )
+            )
+
+    def mettre_a_jour_actions(self, audit_id, modifications):
+        """Met à jour les actions d'un audit ({item_id: {champ: valeur}}) et renvoie le nombre d'actions
+        modifiées ; les items sans action (conformes) sont ignorés. Lève ValueError si un champ est invalide"""
+        aujourd_hui = datetime.now().strftime("%Y-%m-%d")
+        requetes = []
+        for item_id, champs in modifications.items():
+            inconnus = set(champs) - set(CHAMPS_ACTION)
+            if inconnus:
+                raise ValueError(f"Champ d'action inconnu : {', '.join(sorted(inconnus))}")
+            champs = {champ: valeur if valeur != "" else None for champ, valeur in champs.items()}
+            if champs.get("statut") is not None and champs["statut"] not in STATUTS_ACTION:
+                raise ValueError(f"Statut inconnu pour {item_id} : {champs['statut']}")
+            for champ in ("echeance", "date_cloture"):
+                if champs.get(champ) is not None:
+                    champs[champ] = _date_action(champs[champ], item_id)
+            # Une action terminée sans date de clôture l'est du jour ; une action rouverte n'en a plus
+            if champs.get("statut") == STATUT_ACTION_TERMINE and not champs.get("date_cloture"):
+                champs["date_cloture"] = aujourd_hui
+            elif champs.get("statut") == STATUT_ACTION_EN_COURS:
+                champs.setdefault("date_cloture", None)
+            if champs:
+                requetes.append((
+                    f"UPDATE actions SET {', '.join(f'{champ} = ?' for champ in champs)} "
+                    "WHERE audit_id = ? AND item_id = ? AND EXISTS (SELECT 1 FROM resultats r WHERE "
+                    "r.audit_id = actions.audit_id AND r.item_id = actions.item_id AND r.notation IN ('B', 'C'))",
+                    (*champs.values(), audit_id, item_id)
+                ))
+
+        with self._verrou, self._conn:
+            nb_modifiees = sum(self._conn.execute(requete, parametres).rowcount for requete, parametres in requetes)
+        if nb_modifiees:
+            self._notifier(audit_id)
+        return nb_modifiees
+
+    def compter_actions_en_retard(self, date=None):
+        """Nombre d'actions ouvertes dont l'échéance est dépassée (index partiel idx_actions_echeance)"""
+        with self._verrou:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM actions ac WHERE statut <> 'Terminé' AND echeance < ? AND {self.ACTION_NON_CONFORME}",
+                (date or datetime.now().strftime("%Y-%m-%d"),)
+            ).fetchone()[0]
+
+    def actions_en_retard(self, date=None, limite=None):
+        """Actions ouvertes dont l'échéance est dépassée à la date indiquée (aujourd'hui par défaut),
+        de la plus ancienne échéance à la plus récente (index partiel idx_actions_echeance)"""
+        requete = (
+            "SELECT ac.id, ac.audit_id, ac.item_id, ac.action, ac.responsable, ac.echeance, ac.statut, "
+            "f.nom AS fournisseur, a.date_audit "
+            "FROM actions ac JOIN audits a ON a.id = ac.audit_id JOIN fournisseurs f ON f.id = a.fournisseur_id "
+            f"WHERE ac.statut <> 'Terminé' AND ac.echeance < ? AND {self.ACTION_NON_CONFORME} "
+            "ORDER BY ac.echeance, ac.id"
+        )
+        parametres = [date or datetime.now().strftime("%Y-%m-%d")]
+        if limite:
+            requete += " LIMIT ?"
+            parametres.append(limite)
+
+        with self._verrou:
+            return [dict(r) for r in self._conn.execute(requete, parametres)]
+
+    def charger_audit(self, audit_id):
+        """Renvoie (fournisseur_info, audit_data) pour un audit, ou None s'il n'existe pas"""
+        with self._verrou:
+            audit = self._conn.execute(
+                "SELECT fournisseur_info FROM audits WHERE id = ?", (audit_id,)
+            ).fetchone()
+            if audit is None:
+                return None
+
+            resultats = self._conn.execute(
+                "SELECT item_id, notation, commentaire FROM resultats WHERE audit_id = ?", (audit_id,)
+            ).fetchall()
+
+        audit_data = {
+            r["item_id"]: {"notation": r["notation"], "commentaire": r["commentaire"] or ""}
+            for r in resultats
+        }
+        return json.loads(audit["fournisseur_info"]), audit_data
+
+    def version_checklist(self, audit_id):
+        """Version de checklist avec laquelle un audit a été réalisé"""
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT version_checklist FROM audits WHERE id = ?", (audit_id,)
+            ).fetchone()
+        return (ligne[0] if ligne else None) or VERSION_CHECKLIST
+
+    def lister_audits(self, fournisseur=None, auditeur=None, date_debut=None, date_fin=None, limite=None):
+        """Liste les audits (du plus récent au plus ancien) avec filtres optionnels"""
+        requete = (
+            "SELECT a.id, f.nom AS fournisseur, a.date_audit, a.auditeur, a.version_checklist, a.date_maj "
+            "FROM audits a JOIN fournisseurs f ON f.id = a.fournisseur_id WHERE 1 = 1"
+        )
+        parametres = []
+
+        if fournisseur:
+            requete += " AND f.nom = ?"
+            parametres.append(fournisseur)
+        if auditeur:
+            requete += " AND a.auditeur = ?"
+            parametres.append(auditeur)
+        if date_debut:
+            requete += " AND a.date_audit >= ?"
+            parametres.append(date_debut)
+        if date_fin:
+            requete += " AND a.date_audit <= ?"
+            parametres.append(date_fin)
+
+        requete += " ORDER BY a.date_audit DESC, a.id DESC"
+        if limite:
+            requete += " LIMIT ?"
+            parametres.append(limite)
+
+        with self._verrou:
+            return [dict(r) for r in self._conn.execute(requete, parametres)]
+
+    def lister_fournisseurs(self):
+        """Liste les noms des fournisseurs ayant au moins un audit"""
+        with self._verrou:
+            return [
+                r[0] for r in self._conn.execute(
+                    "SELECT nom FROM fournisseurs f WHERE EXISTS "
+                    "(SELECT 1 FROM audits a WHERE a.fournisseur_id = f.id) ORDER BY nom"
+                )
+            ]
+
+    def derniers_audits(self, fournisseurs=None, audit_ids=None):
+        """Dernier audit de chaque fournisseur (ou des seuls fournisseurs indiqués et de ceux des audits
+        indiqués), avec le type de site et le nombre d'actions correctives ouvertes du fournisseur"""
+        requete = (
+            "SELECT f.nom AS fournisseur, f.type_site, a.id AS audit_id, a.date_audit, a.date_maj, "
+            "(SELECT COUNT(*) FROM audits a2 JOIN actions ac ON ac.audit_id = a2.id "
+            f"WHERE a2.fournisseur_id = f.id AND ac.statut <> 'Terminé' AND {self.ACTION_NON_CONFORME}) "
+            "AS actions_ouvertes "
+            "FROM fournisseurs f JOIN audits a ON a.id = (SELECT id FROM audits WHERE fournisseur_id = f.id "
+            "ORDER BY date_audit DESC, id DESC LIMIT 1)"
+        )
+        if fournisseurs is None and audit_ids is None:
+            with self._verrou:
+                return [dict(r) for r in self._conn.execute(requete)]
+
+        fournisseurs = list(fournisseurs or ())
+        audit_ids = list(audit_ids or ())
+        if not fournisseurs and not audit_ids:
+            return []
+        requete += (
+            f" WHERE f.nom IN ({', '.join('?' for _ in fournisseurs)}) OR f.id IN "
+            f"(SELECT fournisseur_id FROM audits WHERE id IN ({', '.join('?' for _ in audit_ids)}))"
+        )
+        with self._verrou:
+            return [dict(r) for r in self._conn.execute(requete, fournisseurs + audit_ids)]
+
+    def audits_par_item(self, item_id, notations=("B", "C")):
+        """Liste les audits où un item a reçu l'une des notations données"""
+        marqueurs = ", ".join("?" for _ in notations)
+        with self._verrou:
+            return [
+                dict(r) for r in self._conn.execute(
+                    "SELECT r.audit_id, f.nom AS fournisseur, a.date_audit, r.notation, r.commentaire "
+                    "FROM resultats r JOIN audits a ON a.id = r.audit_id "
+                    "JOIN fournisseurs f ON f.id = a.fournisseur_id "
+                    f"WHERE r.item_id = ? AND r.notation IN ({marqueurs}) ORDER BY a.date_audit DESC",
+                    (item_id, *notations)
+                )
+            ]
+
+    def notations_audits(self, audit_ids=None):
+        """Notations de plusieurs audits (tous par défaut) en lecture groupée :
+        {audit_id: {"fournisseur", "date_audit", "version_checklist", "notations": {item_id: notation}}}"""
+        requete_audits = (
+            "SELECT a.id, f.nom AS fournisseur, a.date_audit, a.version_checklist "
+            "FROM audits a JOIN fournisseurs f ON f.id = a.fournisseur_id"
+        )
+        requete_resultats = "SELECT audit_id, item_id, notation FROM resultats"
+        # Par paquets, pour rester sous la limite de paramètres de SQLite
+        paquets = [None] if audit_ids is None else [
+            list(audit_ids)[i:i + 500] for i in range(0, len(audit_ids), 500)
+        ]
+
+        audits = {}
+        with self._verrou:
+            for paquet in paquets:
+                filtre, parametres = "", []
+                if paquet is not None:
+                    filtre, parametres = f" IN ({', '.join('?' for _ in paquet)})", paquet
+                for r in self._conn.execute(requete_audits + (f" WHERE a.id{filtre}" if filtre else ""), parametres):
+                    audits[r["id"]] = {
+                        "fournisseur": r["fournisseur"],
+                        "date_audit": r["date_audit"],
+                        "version_checklist": r["version_checklist"] or VERSION_CHECKLIST,
+                        "notations": {}
+                    }
+                for r in self._conn.execute(requete_resultats + (f" WHERE audit_id{filtre}" if filtre else ""), parametres):
+                    if r["audit_id"] in audits:
+                        audits[r["audit_id"]]["notations"][r["item_id"]] = r["notation"]
+
+        return audits
+
+    def iterer_audits(self):
+        """Parcourt tous les audits par identifiant croissant, un à la fois (exports volumineux) :
+        génère (audit, audit_data), audit contenant id, fournisseur, date_audit, auditeur, version_checklist"""
+        if self.chemin == ":memory:":
+            with self._verrou:
+                yield from self._iterer_audits(self._conn)
+            return
+
+        # Connexion de lecture dédiée : le parcours ne bloque pas les autres sessions (WAL)
+        conn = sqlite3.connect(self.chemin)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield from self._iterer_audits(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _iterer_audits(conn):
+        audits = conn.execute(
+            "SELECT a.id, f.nom AS fournisseur, a.date_audit, a.auditeur, a.version_checklist, a.fournisseur_info "
+            "FROM audits a JOIN fournisseurs f ON f.id = a.fournisseur_id ORDER BY a.id"
+        )
+        # Parcours de la clé primaire (audit_id, item_id) : fusion avec les audits sans tri
+        resultats = conn.execute("SELECT audit_id, item_id, notation, commentaire FROM resultats ORDER BY audit_id")
+
+        suivant = resultats.fetchone()
+        for audit in audits:
+            audit_data = {}
+            while suivant is not None and suivant["audit_id"] <= audit["id"]:
+                if suivant["audit_id"] == audit["id"]:
+                    audit_data[suivant["item_id"]] = {
+                        "notation": suivant["notation"], "commentaire": suivant["commentaire"] or ""
+                    }
+                suivant = resultats.fetchone()
+            audit = dict(audit)
+            audit["version_checklist"] = audit["version_checklist"] or VERSION_CHECKLIST
+            audit["fournisseur_info"] = json.loads(audit["fournisseur_info"])
+            yield audit, audit_data
+
+    def versions_checklist(self):
+        """Versions de checklist utilisées par les audits enregistrés"""
+        with self._verrou:
+            return [
+                r[0] or VERSION_CHECKLIST
+                for r in self._conn.execute("SELECT DISTINCT version_checklist FROM audits ORDER BY version_checklist")
+            ]
+
+    def rechercher_commentaires(self, texte, item_ids=None, notations=None, limite=100):
+        """Recherche plein texte dans les commentaires (tous les mots, préfixes acceptés),
+        filtrée par items et notations ; les audits les plus récemment enregistrés d'abord"""
+        mots = texte.split()
+        if not mots:
+            return []
+
+        requete = (
+            "SELECT r.audit_id, f.nom AS fournisseur, a.date_audit, r.item_id, r.notation, {extrait} AS extrait "
+            "FROM {source} JOIN audits a ON a.id = r.audit_id JOIN fournisseurs f ON f.id = a.fournisseur_id "
+            "WHERE {condition}"
+        )
+        if self.recherche_fts:
+            requete = requete.format(
+                extrait="snippet(recherche_commentaires, 0, '**', '**', '…', 16)",
+                source=(
+                    "recherche_commentaires JOIN commentaires_index c ON c.id = recherche_commentaires.rowid "
+                    "JOIN resultats r ON r.audit_id = c.audit_id AND r.item_id = c.item_id"
+                ),
+                condition="recherche_commentaires MATCH ?"
+            )
+            # Chaque mot entre guillemets (pas de syntaxe FTS5 saisie par erreur), en préfixe
+            parametres = [" ".join('"' + mot.replace('"', '""') + '"*' for mot in mots)]
+        else:
+            requete = requete.format(
+                extrait="r.commentaire",
+                source="resultats r",
+                condition=" AND ".join("r.commentaire LIKE ? ESCAPE '\\'" for _ in mots)
+            )
+            parametres = [
+                "%" + mot.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for mot in mots
+            ]
+
+        if item_ids:
+            requete += f" AND r.item_id IN ({', '.join('?' for _ in item_ids)})"
+            parametres += list(item_ids)
+        if notations:
+            requete += f" AND r.notation IN ({', '.join('?' for _ in notations)})"
+            parametres += list(notations)
+
+        # Les plus récemment enregistrés d'abord : ordre natif de l'index, sans calculer de pertinence
+        requete += " ORDER BY recherche_commentaires.rowid DESC" if self.recherche_fts else " ORDER BY r.audit_id DESC"
+        requete += " LIMIT ?"
+        parametres.append(limite)
+
+        with self._verrou:
+            return [dict(r) for r in self._conn.execute(requete, parametres)]
+
+    def supprimer_audit(self, audit_id):
+        with self._verrou, self._conn:
+            if self.recherche_fts:
+                self._conn.execute(
+                    "DELETE FROM recherche_commentaires WHERE rowid IN "
+                    "(SELECT id FROM commentaires_index WHERE audit_id = ?)", (audit_id,)
+                )
+            self._conn.execute("DELETE FROM audits WHERE id = ?", (audit_id,))
+        self._notifier(audit_id)
+
+@st.cache_resource
+def get_stockage():
+    """Stockage des audits partagé par toutes les sessions"""
+    stockage = StockageAudits()
+    if DOSSIER_PARQUET:
+        export = ExportParquet(DOSSIER_PARQUET)
+        stockage.ajouter_ecouteur(lambda audit_id: export.planifier(stockage, audit_id))
+    return stockage
+
+# Colonnes Parquet des informations fournisseur (hors date d'audit, typée à part)
+COLONNES_FOURNISSEUR = {
+    "Nom du fournisseur": "fournisseur",
+    "Adresse": "adresse",
+    "Interlocuteurs": "interlocuteurs",
+    "Effectif": "effectif",
+    "Service qualité": "service_qualite",
+    "Contact crise": "contact_crise",
+    "Gamme produits": "gamme_produits",
+    "Année partenariat": "annee_partenariat",
+    "Certifications": "certifications",
+    "Type site": "type_site",
+    "Auditeur": "auditeur",
+    "Magasin référent": "magasin_referent",
+    "Dernière visite": "derniere_visite"
+}
+
+class ExportParquet:
+    """Historique des audits en Parquet, partitionné par année et catégorie
+    (annee=AAAA/categorie=.../audit_<id>.parquet) : un audit enregistré n'écrit que ses propres fichiers"""
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self.derniere_erreur = None
+        self._executeur = None
+        self._verrou = threading.Lock()
+
+    @staticmethod
+    def schema():
+        import pyarrow as pa
+
+        return pa.schema(
+            [("audit_id", pa.int64()), ("date_audit", pa.date32()), ("version_checklist", pa.string())]
+            + [(colonne, pa.string()) for colonne in COLONNES_FOURNISSEUR.values()]
+            + [
+                ("item_id", pa.string()),
+                ("notation", pa.string()),
+                ("points", pa.float64()),
+                ("coefficient", pa.float64()),
+                ("points_ponderes", pa.float64()),
+                ("score_categorie", pa.float64()),
+                ("score_global", pa.float64()),
+                ("niveau", pa.string())
+            ]
+        )
+
+    def _fichiers_audit(self, audit_id):
+        import glob
+
+        return glob.glob(os.path.join(self.dossier, "annee=*", "categorie=*", f"audit_{audit_id}.parquet"))
+
+    def ecrire_audit(self, audit_id, fournisseur_info, audit_data, version_checklist=VERSION_CHECKLIST):
+        """Écrit (ou réécrit) les fichiers d'un audit, un par catégorie notée"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from urllib.parse import quote
+
+        checklist = charger_checklist(version_checklist)
+        modele = construire_modele_rapport(fournisseur_info, audit_data, checklist, empreinte=False)
+        date_iso = _date_iso(fournisseur_info.get("Date audit"))
+        try:
+            date_audit = datetime.strptime(date_iso, "%Y-%m-%d").date()
+            annee = str(date_audit.year)
+        except ValueError:
+            date_audit, annee = None, "__HIVE_DEFAULT_PARTITION__"
+
+        communes = {"audit_id": audit_id, "date_audit": date_audit, "version_checklist": version_checklist}
+        for cle, colonne in COLONNES_FOURNISSEUR.items():
+            communes[colonne] = str(fournisseur_info.get(cle, ""))
+
+        # Une date modifiée change la partition : les fichiers précédents de l'audit sont remplacés
+        anciens = set(self._fichiers_audit(audit_id))
+        par_categorie = {}
+        for ligne in modele.lignes:
+            details = modele.details.get(ligne.categorie)
+            par_categorie.setdefault(ligne.nom_categorie, []).append({
+                **communes,
+                "item_id": ligne.item_id,
+                "notation": ligne.notation,
+                "points": ligne.points,
+                "coefficient": ligne.coefficient,
+                "points_ponderes": ligne.points * ligne.coefficient if ligne.points is not None else None,
+                "score_categorie": details["score"] if details else None,
+                "score_global": modele.score_global,
+                "niveau": modele.niveau
+            })
+
+        for nom_categorie, lignes in par_categorie.items():
+            dossier = os.path.join(self.dossier, f"annee={annee}", f"categorie={quote(nom_categorie, safe='')}")
+            os.makedirs(dossier, exist_ok=True)
+            chemin = os.path.join(dossier, f"audit_{audit_id}.parquet")
+            temporaire = chemin + ".tmp"
+            pq.write_table(pa.Table.from_pylist(lignes, schema=self.schema()), temporaire)
+            os.replace(temporaire, chemin)
+            anciens.discard(chemin)
+
+        for chemin in anciens:
+            os.remove(chemin)
+
+    def supprimer_audit(self, audit_id):
+        for chemin in self._fichiers_audit(audit_id):
+            os.remove(chemin)
+
+    def actualiser(self, stockage, audit_id):
+        """Met à jour les fichiers d'un audit après son enregistrement ou sa suppression"""
+        audit = stockage.charger_audit(audit_id)
+        if audit is None:
+            self.supprimer_audit(audit_id)
+        else:
+            self.ecrire_audit(audit_id, *audit, stockage.version_checklist(audit_id))
+
+    def planifier(self, stockage, audit_id):
+        """Met à jour les fichiers d'un audit hors de la réexécution en cours (un thread, dans l'ordre)"""
+        with self._verrou:
+            if self._executeur is None:
+                self._executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parquet")
+        self._executeur.submit(self._actualiser_sans_erreur, stockage, audit_id)
+
+    def _actualiser_sans_erreur(self, stockage, audit_id):
+        try:
+            self.actualiser(stockage, audit_id)
+        except Exception as e:
+            self.derniere_erreur = f"audit {audit_id} : {e}"
+
+    def synchroniser(self, stockage, tout=False):
+        """Écrit les audits de l'historique absents de l'export (tous si tout=True) ; renvoie leur nombre"""
+        import glob
+
+        presents = set()
+        if not tout:
+            for chemin in glob.glob(os.path.join(self.dossier, "annee=*", "categorie=*", "audit_*.parquet")):
+                presents.add(int(os.path.basename(chemin)[len("audit_"):-len(".parquet")]))
+
+        nb_audits = 0
+        for audit, audit_data in stockage.iterer_audits():
+            if audit["id"] in presents:
+                continue
+            self.ecrire_audit(audit["id"], audit["fournisseur_info"], audit_data, audit["version_checklist"])
+            nb_audits += 1
+        return nb_audits
+
+class TableauDeBord:
+    """Agrégats du portefeuille fournisseurs calculés sur l'historique des audits.
+    La synthèse de chaque audit est gardée en cache : seuls les audits enregistrés ou
+    supprimés depuis le dernier calcul sont relus et rescorés"""
+
+    def __init__(self, stockage):
+        self.stockage = stockage
+        self._audits = None
+        self._a_relire = set()
+        self._agregats = None
+        self._verrou = threading.Lock()
+        stockage.ajouter_ecouteur(self.invalider)
+
+    def invalider(self, audit_id):
+        """Marque un audit comme modifié ; les agrégats seront recalculés à la prochaine lecture"""
+        with self._verrou:
+            self._a_relire.add(audit_id)
+            self._agregats = None
+
+    def _synthetiser(self, audits):
+        """Score global, scores par catégorie et non-conformités d'audits lus en base (scoring vectorisé)"""
+        par_version = {}
+        for audit_id, audit in audits.items():
+            par_version.setdefault(audit["version_checklist"], []).append(audit_id)
+
+        syntheses = {}
+        for version, audit_ids in par_version.items():
+            checklist = charger_checklist(version)
+            matrice = matrice_notations_plates(
+                [audits[audit_id]["notations"] for audit_id in audit_ids], checklist
+            )
+            resultat = scorer_matrice(matrice, checklist)
+
+            for i, audit_id in enumerate(audit_ids):
+                audit = audits[audit_id]
+                scores = {
+                    categorie: float(resultat["scores"][i, c])
+                    for c, categorie in enumerate(checklist.categories)
+                    if resultat["items_evalues"][i, c] > 0
+                }
+                syntheses[audit_id] = {
+                    "fournisseur": audit["fournisseur"],
+                    "date_audit": audit["date_audit"],
+                    "score_global": float(resultat["score_global"][i]) if scores else 0.0,
+                    "scores": scores,
+                    "non_conformites": [
+                        (item_id, notation) for item_id, notation in audit["notations"].items()
+                        if notation in ("B", "C")
+                    ]
+                }
+
+        return syntheses
+
+    def agreger(self):
+        """Agrégats à jour (DataFrames) : distribution des scores par catégorie,
+        non-conformités les plus fréquentes, fournisseurs NON CONFORME au dernier audit"""
+        with self._verrou:
+            if self._agregats is not None:
+                return self._agregats
+
+            if self._audits is None:
+                self._audits = self._synthetiser(self.stockage.notations_audits())
+                self._a_relire.clear()
+            elif self._a_relire:
+                audit_ids = list(self._a_relire)
+                self._a_relire.clear()
+                for audit_id in audit_ids:
+                    self._audits.pop(audit_id, None)
+                self._audits.update(self._synthetiser(self.stockage.notations_audits(audit_ids)))
+
+            self._agregats = self._calculer_agregats()
+            return self._agregats
+
+    def _calculer_agregats(self):
+        import pandas as pd
+
+        audits = pd.DataFrame(
+            [
+                (audit_id, s["fournisseur"], s["date_audit"], s["score_global"])
+                for audit_id, s in self._audits.items()
+            ],
+            columns=["audit_id", "fournisseur", "date_audit", "score_global"]
+        )
+        scores = pd.DataFrame(
+            [(categorie, score) for s in self._audits.values() for categorie, score in s["scores"].items()],
+            columns=["categorie", "score"]
+        )
+        non_conformites = pd.DataFrame(
+            [nc for s in self._audits.values() for nc in s["non_conformites"]],
+            columns=["item_id", "notation"]
+        )
+
+        distribution = scores.groupby("categorie")["score"].describe()
+        distribution = distribution.rename(columns={
+            "count": "Audits", "mean": "Moyenne", "std": "Écart-type", "min": "Min",
+            "25%": "1er quartile", "50%": "Médiane", "75%": "3e quartile", "max": "Max"
+        })
+
+        frequences = (
+            non_conformites.groupby(["item_id", "notation"]).size()
+            .unstack(fill_value=0)
+            .reindex(columns=["B", "C"], fill_value=0)
+        )
+        frequences["Total"] = frequences["B"] + frequences["C"]
+        frequences = frequences.sort_values(["Total", "C"], ascending=False).rename_axis(index="Item", columns=None)
+        frequences.insert(0, "Question", [INDEX_CHECKLIST.items.get(i, {}).get("question", "") for i in frequences.index])
+
+        derniers = audits.sort_values(["date_audit", "audit_id"]).groupby("fournisseur").tail(1)
+        derniers = derniers.assign(niveau=derniers["score_global"].map(lambda score: get_niveau_conformite(score)[0]))
+        non_conformes = derniers[derniers["niveau"] == "NON CONFORME"].sort_values("score_global")
+
+        return {
+            "nb_audits": len(audits),
+            "nb_fournisseurs": audits["fournisseur"].nunique(),
+            "score_moyen_derniers": derniers["score_global"].mean() if len(derniers) else None,
+            "distribution": distribution,
+            "non_conformites": frequences,
+            "fournisseurs_non_conformes": non_conformes
+        }
+
+@st.cache_resource
+def get_tableau_de_bord():
+    """Agrégats du tableau de bord partagés par toutes les sessions"""
+    return TableauDeBord(get_stockage())
+
+class SimulationScoring:
+    """Rescoring de tout l'historique sous une autre configuration de notation.
+    La matrice des notations (audits × items) de chaque version de checklist est gardée
+    en mémoire : seuls les audits enregistrés ou supprimés depuis sont relus"""
+
+    def __init__(self, stockage):
+        self.stockage = stockage
+        self._audits = None         # audit_id → (fournisseur, date_audit, version_checklist, codes de notation)
+        self._a_relire = set()
+        self._matrices = None       # version → (audit_ids, matrice)
+        self._verrou = threading.Lock()
+        stockage.ajouter_ecouteur(self.invalider)
+
+    def invalider(self, audit_id):
+        with self._verrou:
+            self._a_relire.add(audit_id)
+            self._matrices = None
+
+    def _lire(self, audit_ids=None):
+        """Métadonnées et ligne de la matrice des notations d'audits lus en base"""
+        audits = self.stockage.notations_audits(audit_ids)
+        par_version = {}
+        for audit_id, audit in audits.items():
+            par_version.setdefault(audit["version_checklist"], []).append(audit_id)
+
+        lus = {}
+        for version, ids in par_version.items():
+            matrice = matrice_notations_plates(
+                [audits[audit_id]["notations"] for audit_id in ids], charger_checklist(version)
+            )
+            for i, audit_id in enumerate(ids):
+                audit = audits[audit_id]
+                lus[audit_id] = (audit["fournisseur"], audit["date_audit"], version, matrice[i])
+        return lus
+
+    def matrices(self):
+        """Matrices des notations à jour, par version de checklist ({version: (audit_ids, matrice)}),
+        et métadonnées des audits"""
+        import numpy as np
+
+        with self._verrou:
+            if self._audits is None:
+                self._audits = self._lire()
+                self._a_relire.clear()
+            elif self._a_relire:
+                audit_ids = list(self._a_relire)
+                self._a_relire.clear()
+                for audit_id in audit_ids:
+                    self._audits.pop(audit_id, None)
+                self._audits.update(self._lire(audit_ids))
+
+            if self._matrices is None:
+                lignes = {}
+                for audit_id, (_, _, version, codes) in self._audits.items():
+                    lignes.setdefault(version, ([], []))
+                    lignes[version][0].append(audit_id)
+                    lignes[version][1].append(codes)
+                self._matrices = {version: (ids, np.vstack(codes)) for version, (ids, codes) in lignes.items()}
+            return self._matrices, self._audits
+
+    def simuler(self, configuration):
+        """Scores et niveaux actuels et simulés de chaque audit, et changements de niveau des
+        fournisseurs (à leur dernier audit) : dict de DataFrames et de compteurs"""
+        import pandas as pd
+
+        matrices, audits = self.matrices()
+        lignes = []
+        for version, (audit_ids, matrice) in matrices.items():
+            checklist = charger_checklist(version)
+            actuels = scorer_matrice(matrice, checklist)["score_global"]
+            simules = scorer_matrice(matrice, checklist, configuration)["score_global"]
+            for audit_id, actuel, simule in zip(audit_ids, actuels.tolist(), simules.tolist()):
+                fournisseur, date_audit = audits[audit_id][:2]
+                lignes.append((
+                    audit_id, fournisseur, date_audit, actuel, simule,
+                    get_niveau_conformite(actuel)[0], get_niveau_conformite(simule, configuration.niveaux)[0]
+                ))
+
+        resultats = pd.DataFrame(lignes, columns=[
+            "audit_id", "fournisseur", "date_audit", "score_actuel", "score_simule", "niveau_actuel", "niveau_simule"
+        ])
+        derniers = resultats.sort_values(["date_audit", "audit_id"]).groupby("fournisseur").tail(1)
+        changements = derniers[derniers["niveau_actuel"] != derniers["niveau_simule"]]
+
+        # Transitions de niveau des fournisseurs, dans l'ordre des niveaux
+        ordre = [niveau for _, niveau, _ in NIVEAUX_CONFORMITE]
+        transitions = (
+            pd.crosstab(derniers["niveau_actuel"], derniers["niveau_simule"])
+            .reindex(index=ordre, columns=ordre, fill_value=0)
+            .rename_axis(index="Niveau actuel", columns="Niveau simulé")
+        )
+
+        return {
+            "nb_audits": len(resultats),
+            "nb_fournisseurs": len(derniers),
+            "nb_audits_changes": int((resultats["niveau_actuel"] != resultats["niveau_simule"]).sum()),
+            "nb_fournisseurs_changes": len(changements),
+            "score_moyen_actuel": derniers["score_actuel"].mean() if len(derniers) else None,
+            "score_moyen_simule": derniers["score_simule"].mean() if len(derniers) else None,
+            "transitions": transitions,
+            "fournisseurs_changes": changements.sort_values("score_simule"),
+            "audits": resultats
+        }
+
+@st.cache_resource
+def get_simulation_scoring():
+    """Matrices de l'historique pour la simulation de notation, partagées par toutes les sessions"""
+    return SimulationScoring(get_stockage())
+
+# Points de risque d'un fournisseur : par point de score manquant au dernier audit, par
+# non-conformité d'une catégorie CRITIQUE, pour un site mixte, par mois écoulé depuis le
+# dernier audit et par action corrective ouverte
+POIDS_RISQUE = types.MappingProxyType({
+    "score": 1.0,
+    "nc_critique": 5.0,
+    "site_mixte": 10.0,
+    "mois": 2.0,
+    "action_ouverte": 2.0
+})
+
+# Durée moyenne d'un mois, en jours (ancienneté du dernier audit)
+JOURS_PAR_MOIS = 30.4375
+
+# Nombre d'audits du plan mensuel proposé par défaut
+NB_AUDITS_PAR_MOIS = 10
+
+class RisqueFournisseur(NamedTuple):
+    """Risque d'un fournisseur d'après son dernier audit, hors ancienneté de cet audit"""
+    fournisseur: str
+    type_site: str
+    audit_id: int
+    date_audit: str             # AAAA-MM-JJ
+    score_global: float
+    nc_critiques: int
+    actions_ouvertes: int
+    risque_base: float
+
+    def anciennete(self, date):
+        """Mois écoulés entre le dernier audit et la date indiquée"""
+        return (date.toordinal() - datetime.fromisoformat(self.date_audit).toordinal()) / JOURS_PAR_MOIS
+
+class PlanificationAudits:
+    """File de priorité des fournisseurs à auditer, du plus risqué au moins risqué.
+    L'ancienneté du dernier audit compte linéairement : l'ordre des fournisseurs ne dépend pas
+    de la date, si bien que la clé de chaque fournisseur reste valable dans le temps.
+    L'enregistrement d'un audit ne fait que pousser la nouvelle entrée de son fournisseur
+    dans le tas, les entrées périmées étant écartées à la lecture"""
+
+    def __init__(self, stockage, poids=POIDS_RISQUE):
+        self.stockage = stockage
+        self.poids = poids
+        self._fournisseurs = None   # fournisseur → RisqueFournisseur courant
+        self._audits = {}           # audit_id du dernier audit → fournisseur
+        self._tas = []              # (-priorité, fournisseur, n° d'entrée, RisqueFournisseur)
+        self._entrees = itertools.count()
+        self._a_relire = set()
+        self._verrou = threading.Lock()
+        stockage.ajouter_ecouteur(self.invalider)
+
+    def invalider(self, audit_id):
+        """Marque un audit comme modifié ; son fournisseur sera replacé dans la file à la prochaine lecture"""
+        with self._verrou:
+            self._a_relire.add(audit_id)
+
+    def _lire(self, fournisseurs=None, audit_ids=None):
+        """Risque des fournisseurs lus en base (scoring vectorisé de leur dernier audit)"""
+        derniers = self.stockage.derniers_audits(fournisseurs, audit_ids)
+        audits = self.stockage.notations_audits([d["audit_id"] for d in derniers])
+        par_version = {}
+        for dernier in derniers:
+            if dernier["audit_id"] in audits:
+                par_version.setdefault(audits[dernier["audit_id"]]["version_checklist"], []).append(dernier)
+
+        risques = {}
+        for version, derniers_version in par_version.items():
+            checklist = charger_checklist(version)
+            critiques = {
+                item_id for item_id, categorie in checklist.categorie_item.items()
+                if checklist.checklist[categorie]["criticite"] == "CRITIQUE"
+            }
+            notations = [audits[dernier["audit_id"]]["notations"] for dernier in derniers_version]
+            scores = scorer_matrice(
+                matrice_notations_plates(notations, checklist),
+                checklist
+            )["score_global"].tolist()
+
+            for dernier, notations_audit, score_global in zip(derniers_version, notations, scores):
+                nc_critiques = sum(
+                    1 for item_id, notation in notations_audit.items()
+                    if notation in ("B", "C") and item_id in critiques
+                )
+                type_site = dernier["type_site"] or ""
+                risque_base = (
+                    self.poids["score"] * (100 - score_global)
+                    + self.poids["nc_critique"] * nc_critiques
+                    + self.poids["site_mixte"] * type_site.startswith("Site mixte")
+                    + self.poids["action_ouverte"] * dernier["actions_ouvertes"]
+                )
+                # Audit sans date lisible : daté de son enregistrement
+                date_audit = dernier["date_audit"]
+                try:
+                    datetime.fromisoformat(date_audit)
+                except (TypeError, ValueError):
+                    date_audit = dernier["date_maj"][:10]
+                risques[dernier["fournisseur"]] = RisqueFournisseur(
+                    dernier["fournisseur"], type_site, dernier["audit_id"], date_audit,
+                    score_global, nc_critiques, dernier["actions_ouvertes"], risque_base
+                )
+
+        return risques
+
+    def _priorite(self, risque):
+        """Clé du tas : risque à une date fixe, dans le même ordre que le risque à n'importe quelle date"""
+        return self.risque(risque, datetime.min)
+
+    def _placer(self, risque):
+        ancien = self._fournisseurs.get(risque.fournisseur)
+        if ancien is not None:
+            self._audits.pop(ancien.audit_id, None)
+        self._fournisseurs[risque.fournisseur] = risque
+        self._audits[risque.audit_id] = risque.fournisseur
+        heapq.heappush(self._tas, (-self._priorite(risque), risque.fournisseur, next(self._entrees), risque))
+
+    def _retirer(self, fournisseur):
+        ancien = self._fournisseurs.pop(fournisseur, None)
+        if ancien is not None:
+            self._audits.pop(ancien.audit_id, None)
+
+    def _mettre_a_jour(self):
+        """File à jour (à appeler sous verrou) : construction complète la première fois, puis
+        seuls les fournisseurs des audits enregistrés ou supprimés depuis sont relus"""
+        if self._fournisseurs is None:
+            self._fournisseurs = {}
+            self._audits = {}
+            self._tas = []
+            for risque in self._lire().values():
+                self._fournisseurs[risque.fournisseur] = risque
+                self._audits[risque.audit_id] = risque.fournisseur
+                self._tas.append((-self._priorite(risque), risque.fournisseur, next(self._entrees), risque))
+            heapq.heapify(self._tas)
+            self._a_relire.clear()
+            return
+
+        if not self._a_relire:
+            return
+        audit_ids = list(self._a_relire)
+        self._a_relire.clear()
+        # Fournisseurs dont le dernier audit a changé de fournisseur ou a été supprimé
+        anciens = {self._audits[audit_id] for audit_id in audit_ids if audit_id in self._audits}
+        risques = self._lire(anciens, audit_ids)
+        for fournisseur in anciens - risques.keys():
+            self._retirer(fournisseur)
+        for risque in risques.values():
+            self._placer(risque)
+
+        # Trop d'entrées périmées : le tas est reconstruit à partir des seules entrées valides
+        if len(self._tas) > 2 * len(self._fournisseurs) + 64:
+            self._tas = [entree for entree in self._tas if self._fournisseurs.get(entree[1]) is entree[3]]
+            heapq.heapify(self._tas)
+
+    def prochains(self, nb):
+        """Les nb fournisseurs les plus risqués, du plus au moins risqué (RisqueFournisseur)"""
+        with self._verrou:
+            self._mettre_a_jour()
+            retenus = []
+            depiles = []
+            while self._tas and len(retenus) < nb:
+                entree = heapq.heappop(self._tas)
+                if self._fournisseurs.get(entree[1]) is entree[3]:
+                    retenus.append(entree[3])
+                    depiles.append(entree)
+            # Les entrées retenues restent dans la file ; les périmées dépilées sont abandonnées
+            for entree in depiles:
+                heapq.heappush(self._tas, entree)
+            return retenus
+
+    def risque(self, risque, date):
+        """Points de risque d'un fournisseur à une date"""
+        return risque.risque_base + self.poids["mois"] * risque.anciennete(date)
+
+    def plan_mensuel(self, mois=None, nb_audits=NB_AUDITS_PAR_MOIS):
+        """Plan d'audit d'un mois (AAAA-MM, le mois prochain par défaut) : les nb_audits fournisseurs
+        les plus risqués au premier jour du mois, dans un DataFrame"""
+        import pandas as pd
+
+        if mois is None:
+            aujourd_hui = datetime.now()
+            debut_mois = datetime(aujourd_hui.year + aujourd_hui.month // 12, aujourd_hui.month % 12 + 1, 1)
+        else:
+            try:
+                debut_mois = datetime.strptime(mois, "%Y-%m")
+            except ValueError:
+                raise ValueError(f"Mois invalide (AAAA-MM attendu) : {mois}") from None
+
+        return pd.DataFrame(
+            [
+                (
+                    debut_mois.strftime("%Y-%m"), rang, risque.fournisseur, risque.type_site, _date_fr(risque.date_audit),
+                    round(risque.score_global, 1), get_niveau_conformite(risque.score_global)[0],
+                    risque.nc_critiques, risque.actions_ouvertes,
+                    round(risque.anciennete(debut_mois), 1), round(self.risque(risque, debut_mois), 1)
+                )
+                for rang, risque in enumerate(self.prochains(nb_audits), start=1)
+            ],
+            columns=[
+                "Mois", "Rang", "Fournisseur", "Type site", "Dernier audit", "Score (%)", "Niveau",
+                "NC critiques", "Actions ouvertes", "Ancienneté (mois)", "Risque"
+            ]
+        )
+
+@st.cache_resource
+def get_planification_audits():
+    """File de priorité des fournisseurs à auditer, partagée par toutes les sessions"""
+    return PlanificationAudits(get_stockage())
+
+def exporter_plan_audits(plan, sortie):
+    """Écrit un plan d'audit en Excel (chemin ou flux) ; en CSV si le chemin se termine par .csv"""
+    if isinstance(sortie, str) and sortie.lower().endswith(".csv"):
+        plan.to_csv(sortie, index=False)
+        return
+    import pandas as pd
+
+    feuille = f"Plan d'audit {plan['Mois'].iloc[0]}" if len(plan) else "Plan d'audit"
+    with pd.ExcelWriter(sortie, engine="xlsxwriter") as writer:
+        plan.to_excel(writer, sheet_name=feuille, index=False)
+        writer.sheets[feuille].autofit()
+
+def _creer_formats(workbook):
+    """Formats partagés par les rapports Excel"""
+    header_format = workbook.add_format({
+        'bold': True,
+        'font_color': 'white',
+        'bg_color': '#2C3E50',
+        'font_size': 12,
+        'align': 'center',
+        'valign': 'vcenter',
+        'border': 1
+    })
+    
+    title_format = workbook.add_format({
+        'bold': True,
+        'font_size': 16,
+        'align': 'left'
+    })
+    
+    bold_format = workbook.add_format({'bold': True})
+    
+    conforme_format = workbook.add_format({
+        'bg_color': '#D5F4E6',
+        'border': 1
+    })
+    
+    mineur_format = workbook.add_format({
+        'bg_color': '#FFF3CD',
+        'border': 1
+    })
+    
+    majeur_format = workbook.add_format({
+        'bg_color': '#F8D7DA',
+        'border': 1
+    })
+    
+    border_format = workbook.add_format({'border': 1})
+    
+    return {
+        "header": header_format,
+        "title": title_format,
+        "bold": bold_format,
+        "conforme": conforme_format,
+        "mineur": mineur_format,
+        "majeur": majeur_format,
+        "border": border_format
+    }
+
+def _format_notation(formats, notation):
+    """Format de cellule selon la notation"""
+    if notation == "A":
+        return formats["conforme"]
+    elif notation == "B":
+        return formats["mineur"]
+    elif notation == "C":
+        return formats["majeur"]
+    return formats["border"]
+
+def ecrire_rapport_excel(modele, output):
+    """Écrit le rapport d'audit (4 feuilles) dans un fichier ou un buffer, à partir de son modèle"""
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    
+    formats = _creer_formats(workbook)
+    header_format = formats["header"]
+    title_format = formats["title"]
+    bold_format = formats["bold"]
+    mineur_format = formats["mineur"]
+    majeur_format = formats["majeur"]
+    
+    # FEUILLE 1: Informations Fournisseur
+    ws1 = workbook.add_worksheet("Informations Fournisseur")
+    ws1.write(0, 0, "RAPPORT D'AUDIT FOURNISSEUR BIOCOOP", title_format)
+    ws1.merge_range(0, 0, 0, 3, "RAPPORT D'AUDIT FOURNISSEUR BIOCOOP", title_format)
+    
+    row = 2
+    for key, value in modele.fournisseur_info.items():
+        ws1.write(row, 0, key, bold_format)
+        ws1.write(row, 1, str(value))
+        row += 1
+    
+    ws1.set_column('A:A', 35)
+    ws1.set_column('B:B', 50)
+    
+    # FEUILLE 2: Résultats Audit
+    ws2 = workbook.add_worksheet("Résultats Audit")
+    
+    headers = ["ID", "Catégorie", "Question", "Notation", "Commentaire", "Criticité"]
+    for col, header in enumerate(headers):
+        ws2.write(0, col, header, header_format)
+    
+    for row, ligne in enumerate(modele.lignes, start=1):
+        # Choisir le format selon la notation
+        cell_format = _format_notation(formats, ligne.notation)
+        
+        ws2.write(row, 0, ligne.item_id, cell_format)
+        ws2.write(row, 1, ligne.nom_categorie, cell_format)
+        ws2.write(row, 2, ligne.question, cell_format)
+        ws2.write(row, 3, ligne.notation, cell_format)
+        ws2.write(row, 4, ligne.commentaire, cell_format)
+        ws2.write(row, 5, ligne.criticite, cell_format)
+    
+    ws2.set_column('A:A', 12)
+    ws2.set_column('B:B', 30)
+    ws2.set_column('C:C', 50)
+    ws2.set_column('D:D', 12)
+    ws2.set_column('E:E', 40)
+    ws2.set_column('F:F', 15)
+    
+    # FEUILLE 3: Plan d'Action
+    ws3 = workbook.add_worksheet("Plan d'Action")
+    
+    action_headers = ["ID", "Point d'audit", "Non-conformité", "Action corrective", 
+                     "Responsable", "Délai", "Statut", "Date clôture", "Commentaires"]
+    for col, header in enumerate(action_headers):
+        ws3.write(0, col, header, header_format)
+    
+    actions = modele.actions or {}
+    for row, ligne in enumerate(modele.non_conformites, start=1):
+        cell_format = majeur_format if ligne.notation == "C" else mineur_format
+        action = actions.get(ligne.item_id)
+        
+        ws3.write(row, 0, ligne.item_id, cell_format)
+        ws3.write(row, 1, ligne.question, cell_format)
+        ws3.write(row, 2, ligne.commentaire, cell_format)
+        ws3.write(row, 3, (action and action.action) or "[À définir]", cell_format)
+        ws3.write(row, 4, (action and action.responsable) or "[Responsable]", cell_format)
+        ws3.write(row, 5, _date_fr(action.echeance) if action and action.echeance else "[Date limite]", cell_format)
+        ws3.write(row, 6, action.statut if action else STATUT_ACTION_EN_COURS, cell_format)
+        ws3.write(row, 7, _date_fr(action.date_cloture) if action else "", cell_format)
+        ws3.write(row, 8, (action and action.commentaire) or "", cell_format)
+    
+    ws3.set_column('A:A', 12)
+    ws3.set_column('B:B', 40)
+    ws3.set_column('C:C', 35)
+    ws3.set_column('D:D', 35)
+    ws3.set_column('E:E', 20)
+    ws3.set_column('F:F', 15)
+    ws3.set_column('G:G', 12)
+    ws3.set_column('H:H', 15)
+    ws3.set_column('I:I', 30)
+    
+    # FEUILLE 4: Synthèse
+    ws4 = workbook.add_worksheet("Synthèse")
+    
+    ws4.write(0, 0, "SYNTHÈSE DE L'AUDIT", title_format)
+    ws4.merge_range(0, 0, 0, 3, "SYNTHÈSE DE L'AUDIT", title_format)
+    
+    ws4.write(2, 0, "Score Global", bold_format)
+    ws4.write(2, 1, f"{modele.score_global:.1f}%", bold_format)
+    ws4.write(3, 0, "Niveau de Conformité", bold_format)
+    ws4.write(3, 1, modele.niveau, bold_format)
+    
+    ws4.write(5, 0, "Scores par catégorie", bold_format)
+    
+    headers_synth = ["Catégorie", "Score (%)", "Criticité", "Items évalués"]
+    for col, header in enumerate(headers_synth):
+        ws4.write(6, col, header, header_format)
+    
+    row = 7
+    for info in modele.details.values():
+        ws4.write(row, 0, info['nom'])
+        ws4.write(row, 1, f"{info['score']:.1f}%")
+        ws4.write(row, 2, info['criticite'])
+        ws4.write(row, 3, info['items_evalues'])
+        row += 1
+    
+    ws4.set_column('A:A', 40)
+    ws4.set_column('B:B', 15)
+    ws4.set_column('C:C', 15)
+    ws4.set_column('D:D', 15)
+    
+    # Audit d'origine, pour réimporter le plan d'action renvoyé complété
+    if modele.audit_id is not None:
+        workbook.set_custom_property("Audit", modele.audit_id)
+    
+    # FEUILLE 5: Comparaison avec un audit antérieur du fournisseur
+    if modele.comparaison:
+        _ecrire_feuille_comparaison(workbook, formats, modele)
+    
+    # Fermer le workbook
+    workbook.close()
+
+def _ecrire_feuille_comparaison(workbook, formats, modele):
+    """Feuille « Comparaison » : écarts de score, changements de notation et suivi des non-conformités"""
+    comparaison = modele.comparaison
+    ws = workbook.add_worksheet("Comparaison")
+    
+    ws.merge_range(0, 0, 0, 4, f"COMPARAISON AVEC L'AUDIT DU {comparaison.date_reference}", formats["title"])
+    
+    ws.write_row(2, 0, ["", "Audit de référence", "Cet audit", "Écart"], formats["header"])
+    ws.write(3, 0, "Score Global", formats["bold"])
+    ws.write_row(3, 1, [f"{comparaison.score_reference:.1f}%", f"{modele.score_global:.1f}%",
+                        f"{comparaison.delta_score:+.1f}"])
+    ws.write(4, 0, "Niveau de Conformité", formats["bold"])
+    ws.write_row(4, 1, [comparaison.niveau_reference, modele.niveau])
+    
+    row = 6
+    ws.write(row, 0, "Scores par catégorie", formats["bold"])
+    ws.write_row(row + 1, 0, ["Catégorie", "Score de référence (%)", "Score (%)", "Écart"], formats["header"])
+    row += 2
+    for nom, score_reference, score, ecart in comparaison.categories:
+        ws.write(row, 0, nom)
+        ws.write_row(row, 1, [
+            f"{score_reference:.1f}" if score_reference is not None else "",
+            f"{score:.1f}" if score is not None else "",
+            f"{ecart:+.1f}" if ecart is not None else ""
+        ])
+        row += 1
+    
+    row += 1
+    ws.write(row, 0, "Changements de notation", formats["bold"])
+    ws.write_row(row + 1, 0, ["ID", "Catégorie", "Question", "Notation de référence", "Notation"], formats["header"])
+    row += 2
+    for item_id, nom_categorie, question, notation_reference, notation in comparaison.changements:
+        cell_format = _format_notation(formats, notation)
+        ws.write_row(row, 0, [item_id, nom_categorie, question, notation_reference, notation], cell_format)
+        row += 1
+    
+    row += 1
+    ws.write(row, 0, "Suivi des non-conformités", formats["bold"])
+    ws.write_row(row + 1, 0, ["ID", "Catégorie", "Question", "Notation", "Suivi"], formats["header"])
+    row += 2
+    for suivi, lignes, cell_format in [
+        ("Résolue", comparaison.nc_resolues, formats["conforme"]),
+        ("Persistante", comparaison.nc_persistantes, formats["majeur"]),
+        ("Nouvelle", comparaison.nc_nouvelles, formats["mineur"])
+    ]:
+        for ligne in lignes:
+            ws.write_row(row, 0, [ligne.item_id, ligne.nom_categorie, ligne.question, ligne.notation, suivi], cell_format)
+            row += 1
+    
+    ws.set_column('A:A', 40)
+    ws.set_column('B:B', 30)
+    ws.set_column('C:C', 50)
+    ws.set_column('D:D', 20)
+    ws.set_column('E:E', 15)
+
+def exporter_consolide(chemin, stockage=None):
+    """Écrit un classeur consolidé de tout l'historique : une ligne par audit × item et un tableau
+    audits × catégories des scores. Écriture en flux (constant_memory) : un audit en mémoire à la fois.
+    Renvoie le nombre d'audits exportés"""
+    import xlsxwriter
+    
+    stockage = stockage or get_stockage()
+    
+    # Colonnes du tableau des scores : toutes les catégories des versions présentes dans l'historique
+    checklists = {version: charger_checklist(version) for version in stockage.versions_checklist()}
+    noms_categories = []
+    for checklist in checklists.values():
+        for categorie in checklist.categories:
+            if checklist.nom_categorie[categorie] not in noms_categories:
+                noms_categories.append(checklist.nom_categorie[categorie])
+    
+    workbook = xlsxwriter.Workbook(chemin, {'constant_memory': True})
+    formats = _creer_formats(workbook)
+    
+    # FEUILLE 1: une ligne par audit × item
+    ws_resultats = workbook.add_worksheet("Résultats")
+    headers = ["Audit", "Fournisseur", "Date audit", "Auditeur", "Version checklist",
+               "ID", "Catégorie", "Question", "Notation", "Commentaire", "Criticité"]
+    for col, header in enumerate(headers):
+        ws_resultats.write(0, col, header, formats["header"])
+    for col, largeur in enumerate([8, 30, 12, 20, 12, 12, 30, 50, 10, 40, 15]):
+        ws_resultats.set_column(col, col, largeur)
+    
+    # FEUILLE 2: audits × catégories
+    ws_scores = workbook.add_worksheet("Scores par catégorie")
+    headers_scores = ["Audit", "Fournisseur", "Date audit", "Auditeur", "Score global (%)", "Niveau de conformité"]
+    for col, header in enumerate(headers_scores + noms_categories):
+        ws_scores.write(0, col, header, formats["header"])
+    ws_scores.set_column(0, 0, 8)
+    ws_scores.set_column(1, 1, 30)
+    ws_scores.set_column(2, 5, 15)
+    ws_scores.set_column(len(headers_scores), len(headers_scores) + len(noms_categories) - 1, 18)
+    
+    ligne_resultats = 1
+    nb_audits = 0
+    for audit, audit_data in stockage.iterer_audits():
+        checklist = checklists.get(audit["version_checklist"]) or charger_checklist(audit["version_checklist"])
+        entete = [audit["id"], audit["fournisseur"], audit["date_audit"], audit["auditeur"]]
+        
+        modele = construire_modele_rapport(audit["fournisseur_info"], audit_data, checklist, empreinte=False)
+        
+        for ligne in modele.lignes:
+            valeurs = entete + [
+                audit["version_checklist"], ligne.item_id, ligne.nom_categorie, ligne.question,
+                ligne.notation, ligne.commentaire, ligne.criticite
+            ]
+            ws_resultats.write_row(ligne_resultats, 0, valeurs, _format_notation(formats, ligne.notation))
+            ligne_resultats += 1
+        
+        nb_audits += 1
+        ws_scores.write_row(nb_audits, 0, entete + [round(modele.score_global, 1), modele.niveau])
+        for info in modele.details.values():
+            col = len(headers_scores) + noms_categories.index(info["nom"])
+            ws_scores.write(nb_audits, col, round(info["score"], 1))
+    
+    ws_resultats.autofilter(0, 0, max(ligne_resultats - 1, 1), len(headers) - 1)
+    ws_scores.freeze_panes(1, 2)
+    workbook.close()
+    return nb_audits
+
+@instrumenter("generer_rapport_excel")
+def generer_rapport_excel(modele):
+    """Génère un rapport d'audit complet en Excel avec xlsxwriter.
+    Appelée par les threads de la file des rapports : une erreur est levée, pas affichée"""
+    # Créer un buffer en mémoire
+    output = io.BytesIO()
+    ecrire_rapport_excel(modele, output)
+    
+    # Récupérer le buffer
+    output.seek(0)
+    return output
+
+def cle_rapport(fournisseur_info, audit_data, checklist=None):
+    """Empreinte stable d'un audit : informations fournisseur, réponses et version de checklist"""
+    contenu = json.dumps(
+        {
+            "version_checklist": (checklist or INDEX_CHECKLIST).version,
+            "fournisseur_info": fournisseur_info,
+            "audit_data": {
+                item_id: {"notation": resultat.get("notation"), "commentaire": resultat.get("commentaire", "")}
+                for item_id, resultat in audit_data.items()
+            }
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+class CacheRapports:
+    """Cache LRU des rapports Excel, avec débordement optionnel sur disque"""
+
+    def __init__(self, taille_max=32, dossier=None):
+        self.taille_max = taille_max
+        self.dossier = dossier
+        self.nb_succes = 0
+        self.nb_echecs = 0
+        self._rapports = OrderedDict()
+        self._verrou = threading.Lock()
+
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, f"{cle}.xlsx")
+
+    def _lire(self, cle):
+        """Cherche un rapport en mémoire puis sur disque (à appeler sous verrou)"""
+        if cle in self._rapports:
+            self._rapports.move_to_end(cle)
+            return self._rapports[cle]
+
+        if self.dossier and os.path.exists(self._chemin(cle)):
+            with open(self._chemin(cle), "rb") as f:
+                contenu = f.read()
+            self._ajouter(cle, contenu)
+            return contenu
+
+        return None
+
+    def _ajouter(self, cle, contenu):
+        """Ajoute un rapport en mémoire et évince le moins récemment utilisé (à appeler sous verrou)"""
+        self._rapports[cle] = contenu
+        self._rapports.move_to_end(cle)
+
+        while len(self._rapports) > self.taille_max:
+            cle_evincee, contenu_evince = self._rapports.popitem(last=False)
+            if self.dossier and not os.path.exists(self._chemin(cle_evincee)):
+                temporaire = self._chemin(cle_evincee) + ".tmp"
+                with open(temporaire, "wb") as f:
+                    f.write(contenu_evince)
+                os.replace(temporaire, self._chemin(cle_evincee))
+
+    def contient(self, cle):
+        """Indique si le rapport d'empreinte cle est disponible, sans le charger"""
+        with self._verrou:
+            return cle in self._rapports or bool(self.dossier and os.path.exists(self._chemin(cle)))
+
+    def lire(self, cle):
+        """Contenu du rapport d'empreinte cle, ou None s'il n'est pas en cache"""
+        with self._verrou:
+            contenu = self._lire(cle)
+            if contenu is not None:
+                self.nb_succes += 1
+            return contenu
+
+    def rapport(self, modele):
+        """Renvoie le rapport Excel de l'audit, généré seulement s'il n'est pas déjà en cache"""
+        cle = modele.cle
+
+        with self._verrou:
+            contenu = self._lire(cle)
+            if contenu is not None:
+                self.nb_succes += 1
+                return io.BytesIO(contenu)
+            self.nb_echecs += 1
+
+        buffer = generer_rapport_excel(modele)
+
+        with self._verrou:
+            self._ajouter(cle, buffer.getvalue())
+        return buffer
+
+    def vider(self):
+        with self._verrou:
+            self._rapports.clear()
+
+@st.cache_resource
+def get_cache_rapports():
+    """Cache des rapports partagé par tous les auditeurs du serveur"""
+    return CacheRapports(
+        taille_max=int(os.environ.get("AUDIT_CACHE_TAILLE", "32")),
+        dossier=os.environ.get("AUDIT_CACHE_DIR") or None
+    )
+
+class TravailRapport:
+    """Génération d'un rapport soumise à la file : identifiant, empreinte de l'audit et statut"""
+
+    def __init__(self, cle, statut=STATUT_EN_ATTENTE):
+        self.id = uuid.uuid4().hex[:12]
+        self.cle = cle
+        self.statut = statut
+        self.erreur = None
+        self.duree = None
+
+class FileRapports:
+    """File de génération des rapports Excel hors des réexécutions (pool de threads).
+    Les rapports produits sont conservés dans le cache des rapports"""
+
+    def __init__(self, cache, workers=2, historique_max=256):
+        self.cache = cache
+        self.historique_max = historique_max
+        self._executeur = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rapport")
+        self._travaux = OrderedDict()
+        # Empreinte d'audit → identifiant du dernier travail soumis pour cet audit
+        self._par_cle = {}
+        self._verrou = threading.Lock()
+
+    def soumettre(self, modele):
+        """Soumet la génération du rapport d'un audit (son modèle) et renvoie l'identifiant du travail.
+        Un audit identique déjà soumis (en cours ou disponible) n'est pas régénéré"""
+        # Le modèle est immuable : pas de copie, même si l'audit de la session change pendant la génération
+        cle = modele.cle
+
+        with self._verrou:
+            travail = self._travaux.get(self._par_cle.get(cle))
+            if travail and travail.statut in (STATUT_EN_ATTENTE, STATUT_EN_COURS):
+                return travail.id
+
+            if self.cache.contient(cle):
+                # Rapport déjà produit : le travail qui l'a produit sert à chaque réexécution
+                if travail and travail.statut == STATUT_TERMINE:
+                    return travail.id
+                travail = TravailRapport(cle, STATUT_TERMINE)
+                self._ajouter(travail)
+                return travail.id
+
+            travail = TravailRapport(cle)
+            self._ajouter(travail)
+
+        self._executeur.submit(self._executer, travail, modele)
+        return travail.id
+
+    def _ajouter(self, travail):
+        """Enregistre un travail et oublie les plus anciens travaux finis (à appeler sous verrou)"""
+        self._travaux[travail.id] = travail
+        self._par_cle[travail.cle] = travail.id
+
+        for ancien in list(self._travaux.values()):
+            if len(self._travaux) <= self.historique_max:
+                break
+            if ancien.statut in (STATUT_TERMINE, STATUT_ECHEC):
+                del self._travaux[ancien.id]
+                if self._par_cle.get(ancien.cle) == ancien.id:
+                    del self._par_cle[ancien.cle]
+
+    def _executer(self, travail, modele):
+        travail.statut = STATUT_EN_COURS
+        debut = time.perf_counter()
+        try:
+            buffer = self.cache.rapport(modele)
+        except Exception as e:
+            buffer = None
+            travail.erreur = f"Erreur lors de la génération du rapport Excel : {type(e).__name__}: {e}"
+        travail.duree = time.perf_counter() - debut
+
+        if buffer is None:
+            travail.erreur = travail.erreur or "Impossible de générer le rapport Excel"
+            travail.statut = STATUT_ECHEC
+        else:
+            travail.statut = STATUT_TERMINE
+
+    def travail(self, travail_id):
+        """Travail d'identifiant travail_id, ou None s'il est inconnu ou oublié"""
+        with self._verrou:
+            return self._travaux.get(travail_id)
+
+    def contenu(self, travail_id):
+        """Rapport produit par un travail terminé, ou None s'il n'est pas (ou plus) disponible.
+        Un rapport évincé du cache depuis la fin du travail fait oublier celui-ci : soumettre
+        le même audit relance alors la génération"""
+        travail = self.travail(travail_id)
+        if travail is None or travail.statut != STATUT_TERMINE:
+            return None
+        contenu = self.cache.lire(travail.cle)
+        if contenu is None:
+            with self._verrou:
+                self._travaux.pop(travail.id, None)
+                if self._par_cle.get(travail.cle) == travail.id:
+                    del self._par_cle[travail.cle]
+            return None
+        return io.BytesIO(contenu)
+
+    def nb_en_cours(self):
+        """Nombre de travaux en attente ou en cours"""
+        with self._verrou:
+            return sum(1 for t in self._travaux.values() if t.statut in (STATUT_EN_ATTENTE, STATUT_EN_COURS))
+
+@st.cache_resource
+def get_file_rapports():
+    """File de génération des rapports partagée par tous les auditeurs du serveur"""
+    return FileRapports(get_cache_rapports(), workers=int(os.environ.get("AUDIT_RAPPORTS_WORKERS", "2")))
+
+class SauvegardeBrouillons:
+    """Sauvegarde continue des audits en cours dans des brouillons JSON, par un thread
+    d'écriture différée : les modifications rapprochées d'un brouillon sont regroupées
+    en une seule écriture, faite de façon atomique (fichier temporaire puis renommage)"""
+
+    def __init__(self, dossier=DOSSIER_BROUILLONS, delai=DELAI_AUTOSAUVEGARDE):
+        self.dossier = dossier
+        self.delai = delai
+        self.derniere_erreur = None
+        # Clé du brouillon → (brouillon, échéance d'écriture, date de la première modification en attente)
+        self._en_attente = {}
+        # Clés retirées de la file et pas encore écrites, et celles supprimées entre-temps
+        self._en_ecriture = set()
+        self._annules = set()
+        self._index = {}
+        self._condition = threading.Condition()
+        # Empêche la suppression d'un brouillon pendant son écriture
+        self._verrou_fichiers = threading.Lock()
+
+        os.makedirs(dossier, exist_ok=True)
+        self._indexer()
+        threading.Thread(target=self._ecrire_en_continu, name="brouillons", daemon=True).start()
+        atexit.register(self.vider)
+
+    @staticmethod
+    def cle(fournisseur_info, id_session):
+        """Clé d'un brouillon : fournisseur et date d'audit, ou session tant que le fournisseur n'est pas saisi.
+        Le nom est rendu lisible dans le nom de fichier et suivi de l'empreinte du nom exact :
+        « A B », « A_B » et « A-B » ont des brouillons distincts"""
+        nom = fournisseur_info.get("Nom du fournisseur", "").strip()
+        if not nom:
+            return f"session_{id_session}"
+        lisible = "".join(c if c.isalnum() else "_" for c in nom)[:80]
+        empreinte = hashlib.sha256(nom.encode("utf-8")).hexdigest()[:8]
+        # Date saisie hors format JJ/MM/AAAA : pas de séparateur de chemin dans la clé
+        date = "".join(c if c.isalnum() or c == "-" else "_" for c in _date_iso(fournisseur_info.get("Date audit")))
+        return f"{lisible}_{empreinte}_{date}"
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, f"{cle}.json")
+
+    def _indexer(self):
+        for nom in os.listdir(self.dossier):
+            if not nom.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.dossier, nom), encoding="utf-8") as f:
+                    brouillon = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._index[nom[:-len(".json")]] = self._resume(brouillon)
+
+    @staticmethod
+    def _resume(brouillon):
+        fournisseur_info = brouillon.get("fournisseur_info", {})
+        return {
+            "fournisseur": fournisseur_info.get("Nom du fournisseur") or "Fournisseur sans nom",
+            "date_audit": fournisseur_info.get("Date audit", ""),
+            "date_maj": brouillon.get("date_maj", "")
+        }
+
+    def planifier(self, cle, fournisseur_info, audit_data, version_checklist=VERSION_CHECKLIST, audit_id=None):
+        """Programme l'écriture d'un brouillon ; ne fait qu'une copie peu coûteuse de l'audit"""
+        brouillon = {
+            "version_checklist": version_checklist,
+            "audit_id": audit_id,
+            "fournisseur_info": dict(fournisseur_info),
+            "audit_data": audit_data.copie() if isinstance(audit_data, AuditCompact) else {
+                item_id: dict(resultat) for item_id, resultat in audit_data.items()
+            }
+        }
+        maintenant = time.monotonic()
+        with self._condition:
+            precedent = self._en_attente.get(cle)
+            premiere = precedent[2] if precedent else maintenant
+            # Repoussée à chaque modification, mais jamais plus de 5 délais après la première
+            echeance = min(maintenant + self.delai, premiere + 5 * self.delai)
+            self._en_attente[cle] = (brouillon, echeance, premiere)
+            self._condition.notify()
+
+    def _ecrire_en_continu(self):
+        while True:
+            with self._condition:
+                while not self._en_attente:
+                    self._condition.wait()
+                maintenant = time.monotonic()
+                prets = [cle for cle, (_, echeance, _) in self._en_attente.items() if echeance <= maintenant]
+                if not prets:
+                    self._condition.wait(min(echeance for _, echeance, _ in self._en_attente.values()) - maintenant)
+                    continue
+                brouillons = [(cle, self._en_attente.pop(cle)[0]) for cle in prets]
+                self._en_ecriture.update(prets)
+
+            for cle, brouillon in brouillons:
+                self._ecrire(cle, brouillon)
+
+    def _ecrire(self, cle, brouillon):
+        brouillon["audit_data"] = {item_id: dict(resultat) for item_id, resultat in brouillon["audit_data"].items()}
+        brouillon["date_maj"] = datetime.now().isoformat(timespec="seconds")
+        try:
+            with self._verrou_fichiers:
+                # Brouillon supprimé depuis son retrait de la file : il ne doit pas réapparaître
+                with self._condition:
+                    self._en_ecriture.discard(cle)
+                    if cle in self._annules:
+                        self._annules.discard(cle)
+                        return
+                temporaire = self._chemin(cle) + ".tmp"
+                with open(temporaire, "w", encoding="utf-8") as f:
+                    json.dump(brouillon, f, ensure_ascii=False, default=str)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporaire, self._chemin(cle))
+                with self._condition:
+                    self._index[cle] = self._resume(brouillon)
+        except OSError as e:
+            self.derniere_erreur = str(e)
+
+    def vider(self):
+        """Écrit immédiatement les brouillons en attente (arrêt du serveur)"""
+        with self._condition:
+            brouillons = [(cle, attente[0]) for cle, attente in self._en_attente.items()]
+            self._en_ecriture.update(self._en_attente)
+            self._en_attente.clear()
+        for cle, brouillon in brouillons:
+            self._ecrire(cle, brouillon)
+
+    def lister(self):
+        """Brouillons disponibles, du plus récent au plus ancien : [(clé, résumé)]"""
+        with self._condition:
+            return sorted(self._index.items(), key=lambda b: b[1]["date_maj"], reverse=True)
+
+    def charger(self, cle):
+        """Contenu d'un brouillon, ou None s'il n'existe pas"""
+        try:
+            with open(self._chemin(cle), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def supprimer(self, cle):
+        """Supprime un brouillon et annule son écriture en attente"""
+        with self._condition:
+            self._en_attente.pop(cle, None)
+            self._index.pop(cle, None)
+            if cle in self._en_ecriture:
+                self._annules.add(cle)
+        with self._verrou_fichiers:
+            if os.path.exists(self._chemin(cle)):
+                os.remove(self._chemin(cle))
+
+@st.cache_resource
+def get_brouillons():
+    """Sauvegarde des brouillons partagée par toutes les sessions"""
+    return SauvegardeBrouillons()
+
+def autosauvegarder():
+    """Programme la sauvegarde du brouillon de l'audit en cours s'il a changé depuis la dernière fois"""
+    fournisseur_info = st.session_state.fournisseur_info
+    audit_data = st.session_state.audit_data
+    etat = (id(fournisseur_info), id(audit_data), getattr(audit_data, "revision", None))
+    if etat == st.session_state.get("etat_brouillon") and etat[2] is not None:
+        return
+    st.session_state.etat_brouillon = etat
+    if not fournisseur_info and not audit_data:
+        return
+    
+    brouillons = get_brouillons()
+    cle = brouillons.cle(fournisseur_info, st.session_state.id_session)
+    # Le fournisseur ou la date ont changé : l'ancien brouillon est remplacé
+    ancienne_cle = st.session_state.get("cle_brouillon")
+    if ancienne_cle and ancienne_cle != cle:
+        brouillons.supprimer(ancienne_cle)
+    st.session_state.cle_brouillon = cle
+    
+    brouillons.planifier(
+        cle, fournisseur_info, audit_data, st.session_state.version_checklist, st.session_state.audit_id
+    )
+
+def _enregistrer_audit_courant():
+    st.session_state.audit_id = get_stockage().enregistrer_audit(
+        st.session_state.fournisseur_info,
+        st.session_state.audit_data,
+        audit_id=st.session_state.audit_id,
+        version_checklist=st.session_state.version_checklist
+    )
+    # L'audit est en base : son brouillon n'est plus utile
+    if st.session_state.get("cle_brouillon"):
+        get_brouillons().supprimer(st.session_state.cle_brouillon)
+        st.session_state.cle_brouillon = None
+
+def _reprendre_brouillon():
+    cle = st.session_state.get("brouillon_a_reprendre")
+    brouillon = get_brouillons().charger(cle) if cle else None
+    if brouillon:
+        charger_audit_en_session(
+            brouillon["fournisseur_info"],
+            brouillon["audit_data"],
+            audit_id=brouillon.get("audit_id"),
+            version_checklist=brouillon.get("version_checklist") or VERSION_CHECKLIST
+        )
+        st.session_state.cle_brouillon = cle
+
+def _charger_audit_selectionne():
+    stockage = get_stockage()
+    audit_id = st.session_state.get("audit_a_charger")
+    audit = stockage.charger_audit(audit_id) if audit_id else None
+    if audit:
+        charger_audit_en_session(*audit, audit_id=audit_id, version_checklist=stockage.version_checklist(audit_id))
+
+def afficher_audits_enregistres():
+    """Enregistrement et rechargement des audits depuis la sidebar"""
+    stockage = get_stockage()
+
+    st.markdown("### 💾 Audits enregistrés")
+
+    st.button(
+        "Enregistrer l'audit en cours",
+        on_click=_enregistrer_audit_courant,
+        disabled=not st.session_state.fournisseur_info.get("Nom du fournisseur"),
+        use_container_width=True
+    )
+
+    audits = {a["id"]: a for a in stockage.lister_audits(limite=200)}
+    if audits:
+        st.selectbox(
+            "Audit à reprendre",
+            options=list(audits.keys()),
+            format_func=lambda a: f"{audits[a]['fournisseur']} - {audits[a]['date_audit']} ({audits[a]['auditeur']})",
+            key="audit_a_charger"
+        )
+        st.button("Charger l'audit", on_click=_charger_audit_selectionne, use_container_width=True)
+    else:
+        st.caption("Aucun audit enregistré")
+
+    brouillons = dict(get_brouillons().lister())
+    if brouillons:
+        st.markdown("### 📝 Brouillons")
+        st.selectbox(
+            "Brouillon à reprendre",
+            options=list(brouillons.keys()),
+            format_func=lambda b: f"{brouillons[b]['fournisseur']} - {brouillons[b]['date_audit']} "
+                                  f"(modifié {brouillons[b]['date_maj'].replace('T', ' ')})",
+            key="brouillon_a_reprendre"
+        )
+        st.button("Reprendre le brouillon", on_click=_reprendre_brouillon, use_container_width=True)
 
 # Interface principale
+def _changer_etape():
+    st.session_state.current_step = ETAPES.index(st.session_state.navigation) + 1
+
+@instrumenter("rerun")
 def main():
     initialize_session_state()
     
@@ -520,19 +2991,22 @@ def main():
         
         st.title("Navigation")
         
-        step = st.radio(
+        # Synchronisée avec current_step, que les boutons des étapes modifient aussi
+        st.session_state.navigation = ETAPES[st.session_state.current_step - 1]
+        st.radio(
             "Étapes de l'audit",
-            ["1️⃣ Informations Fournisseur", "2️⃣ Checklist d'Audit", "3️⃣ Rapport Final"],
-            index=st.session_state.current_step - 1
+            ETAPES,
+            key="navigation",
+            on_change=_changer_etape
         )
-        
-        if "1️⃣" in step:
-            st.session_state.current_step = 1
-        elif "2️⃣" in step:
-            st.session_state.current_step = 2
-        else:
-            st.session_state.current_step = 3
-        
+
+        if st.session_state.current_step == 2:
+            st.divider()
+            afficher_score_en_direct()
+
+        st.divider()
+        afficher_audits_enregistres()
+
         st.divider()
         st.markdown("### 📊 Système de notation")
         st.markdown("**A** (20 pts) = Conforme ✅")
@@ -540,17 +3014,61 @@ def main():
         st.markdown("**C** (0 pts) = NC majeure ❌")
         st.markdown("**N/A** = Non applicable ⊘")
         
+        st.divider()
+        afficher_panneau_performance()
+        
         st.divider()
         st.caption("Version 1.1 - Octobre 2025")
     
     # Contenu principal
-    if st.session_state.current_step == 1:
-        afficher_etape_informations()
-    elif st.session_state.current_step == 2:
-        afficher_etape_checklist()
-    else:
-        afficher_etape_rapport()
+    affichages = [
+        afficher_etape_informations, afficher_etape_checklist, afficher_etape_rapport,
+        afficher_tableau_de_bord, afficher_recherche
+    ]
+    affichages[st.session_state.current_step - 1]()
+    
+    autosauvegarder()
+
+def afficher_panneau_performance():
+    """Panneau de debug : durées de la réexécution précédente, taille de session, cache"""
+    if not st.toggle("🔧 Panneau de performance", key="panneau_performance"):
+        return
+    
+    mesure = st.session_state.get("derniere_mesure")
+    if mesure:
+        st.caption(f"Dernière exécution ({mesure['type']}, étape {mesure['etape']})")
+        for nom, duree in sorted(mesure["durees_ms"].items(), key=lambda m: m[1], reverse=True):
+            appels = mesure["appels"][nom]
+            st.caption(f"`{nom}` : {duree:.1f} ms" + (f" ({appels} appels)" if appels > 1 else ""))
+        if mesure["taille_session_octets"] is not None:
+            st.caption(f"Session : {mesure['taille_session_octets'] / 1024:.1f} Ko")
+    
+    cache = get_cache_rapports()
+    st.caption(f"Cache rapports : {cache.nb_succes} succès / {cache.nb_echecs} échecs")
+    st.caption(f"File rapports : {get_file_rapports().nb_en_cours()} en cours")
+    if CHEMIN_METRIQUES:
+        st.caption(f"Journal : `{CHEMIN_METRIQUES}`")
+
+def noter_item(item_id, notation):
+    """Met à jour la notation d'un item et les scores de la session"""
+    resultat = st.session_state.audit_data.setdefault(item_id, {"notation": None, "commentaire": ""})
+    if resultat["notation"] != notation:
+        st.session_state.score_incremental.noter(item_id, notation)
+        resultat["notation"] = notation
+
+@st.fragment(key="score_en_direct")
+def afficher_score_en_direct():
+    """Score global et par catégorie de l'audit en cours (ScoreIncremental, sans recalcul)"""
+    checklist = checklist_session()
+    score_global, details_categories = st.session_state.score_incremental.calculer()
+    niveau, couleur = get_niveau_conformite(score_global)
+    
+    st.markdown("### 🎯 Score en direct")
+    st.metric("Score global", f"{score_global:.1f}%", niveau, delta_color="off")
+    for categorie, info in details_categories.items():
+        st.caption(f"{checklist.nom_categorie[categorie]} : {info['score']:.0f}% ({info['items_evalues']} items)")
 
+@instrumenter("afficher_etape_informations")
 def afficher_etape_informations():
     st.title("📋 Informations sur le Fournisseur")
     st.markdown("---")
@@ -594,8 +3112,9 @@ def afficher_etape_informations():
     col3, col4 = st.columns(2)
     
     with col3:
+        date_audit = st.session_state.fournisseur_info.get("Date audit")
         date_visite = st.date_input("Date de l'audit*",
-                                    value=datetime.now())
+                                    value=datetime.strptime(date_audit, "%d/%m/%Y") if date_audit else datetime.now())
         auditeur = st.text_input("Nom de l'auditeur*",
                                  value=st.session_state.fournisseur_info.get("Auditeur", ""))
     
@@ -629,23 +3148,23 @@ def afficher_etape_informations():
         st.session_state.current_step = 2
         st.rerun()
 
+@instrumenter("afficher_etape_checklist")
 def afficher_etape_checklist():
+    checklist = checklist_session()
+    
     st.title("✅ Checklist d'Audit BIOCOOP")
     st.markdown("---")
     
     # Barre de progression
-    total_items = sum(len(data["items"]) for data in CHECKLIST_AUDIT.values())
-    items_completes = len([k for k in st.session_state.audit_data if st.session_state.audit_data[k].get("notation")])
-    progress = items_completes / total_items if total_items > 0 else 0
-    
-    st.progress(progress, text=f"Progression : {items_completes}/{total_items} items complétés ({progress*100:.0f}%)")
+    afficher_progression()
     
     # Filtres
     col1, col2 = st.columns([3, 1])
     with col1:
         categorie_selectionnee = st.selectbox(
             "Sélectionner une catégorie",
-            ["Toutes les catégories"] + list(CHECKLIST_AUDIT.keys())
+            ["Toutes les catégories"] + list(checklist.categories),
+            key="categorie_selectionnee"
         )
     
     with col2:
@@ -655,18 +3174,37 @@ def afficher_etape_checklist():
             default=[]
         )
     
+    saisie_groupee = st.toggle(
+        "Saisie groupée par catégorie",
+        key="saisie_groupee",
+        help="Les notations et commentaires d'une catégorie sont enregistrés en une seule fois, "
+             "avec le bouton de validation de la catégorie"
+    )
+    
     st.markdown("---")
     
     # Affichage des items
-    categories_a_afficher = CHECKLIST_AUDIT.keys() if categorie_selectionnee == "Toutes les catégories" else [categorie_selectionnee]
+    categorie_seule = categorie_selectionnee != "Toutes les catégories"
+    categories_a_afficher = [categorie_selectionnee] if categorie_seule else checklist.categories
     
     for categorie in categories_a_afficher:
-        data = CHECKLIST_AUDIT[categorie]
+        data = checklist.checklist[categorie]
         
-        with st.expander(f"**{categorie}**", expanded=(categorie_selectionnee != "Toutes les catégories")):
+        expander = st.expander(
+            f"**{categorie}**",
+            expanded=categorie_seule,
+            key=f"categorie_{'seule' if categorie_seule else 'liste'}_{categorie}",
+            on_change="rerun"
+        )
+        with expander:
             st.markdown(f"**Criticité**: {data['criticite']} | **Coefficient**: {data['coefficient']}x")
             st.markdown("---")
             
+            # Les catégories repliées ne construisent pas leurs widgets
+            if not expander.open:
+                continue
+            
+            items_affiches = []
             for item in data["items"]:
                 item_id = item["id"]
                 
@@ -678,36 +3216,13 @@ def afficher_etape_checklist():
                 if filtre_notation and st.session_state.audit_data[item_id]["notation"] not in filtre_notation:
                     continue
                 
-                # Conteneur pour chaque item
-                with st.container():
-                    st.markdown(f"**{item_id}** - {item['question']}")
-                    st.caption(item['details'])
-                    
-                    col_note, col_comment = st.columns([1, 3])
-                    
-                    with col_note:
-                        notation = st.selectbox(
-                            "Notation",
-                            options=list(NOTATION_OPTIONS.keys()),
-                            format_func=lambda x: NOTATION_OPTIONS[x]["label"],
-                            key=f"notation_{item_id}",
-                            index=list(NOTATION_OPTIONS.keys()).index(st.session_state.audit_data[item_id]["notation"]) 
-                                  if st.session_state.audit_data[item_id]["notation"] else 0,
-                            label_visibility="collapsed"
-                        )
-                        st.session_state.audit_data[item_id]["notation"] = notation
-                    
-                    with col_comment:
-                        commentaire = st.text_area(
-                            "Commentaire / Constat",
-                            value=st.session_state.audit_data[item_id]["commentaire"],
-                            key=f"comment_{item_id}",
-                            height=80,
-                            placeholder="Détaillez vos observations, preuves, constats..."
-                        )
-                        st.session_state.audit_data[item_id]["commentaire"] = commentaire
-                    
-                    st.markdown("---")
+                items_affiches.append(item)
+            
+            if saisie_groupee:
+                afficher_formulaire_categorie(categorie, items_affiches)
+            else:
+                for item in items_affiches:
+                    afficher_item(item)
     
     # Boutons de navigation
     col1, col2 = st.columns(2)
@@ -721,71 +3236,188 @@ def afficher_etape_checklist():
             st.session_state.current_step = 3
             st.rerun()
 
+@st.fragment
+@instrumenter("afficher_item")
+def afficher_item(item):
+    """Notation et commentaire d'un item ; une saisie ne réexécute que ce fragment"""
+    item_id = item["id"]
+    checklist = checklist_session()
+    notation_actuelle = st.session_state.audit_data[item_id]["notation"]
+    
+    with st.container():
+        st.markdown(f"**{item_id}** - {item['question']}")
+        st.caption(item['details'])
+        
+        col_note, col_comment = st.columns([1, 3])
+        
+        with col_note:
+            notation = st.selectbox(
+                "Notation",
+                options=checklist.options,
+                format_func=lambda x: checklist.notation_options[x]["label"],
+                key=f"notation_{item_id}",
+                index=checklist.position_option[notation_actuelle] if notation_actuelle else 0,
+                label_visibility="collapsed",
+                on_change=_noter_depuis_selectbox,
+                args=(item_id,)
+            )
+            noter_item(item_id, notation)
+        
+        with col_comment:
+            commentaire = st.text_area(
+                "Commentaire / Constat",
+                value=st.session_state.audit_data[item_id]["commentaire"],
+                key=f"comment_{item_id}",
+                height=80,
+                placeholder="Détaillez vos observations, preuves, constats..."
+            )
+            st.session_state.audit_data[item_id]["commentaire"] = commentaire
+        
+        st.markdown("---")
+    
+    # Seul ce fragment est réexécuté après une saisie : main() ne passe pas par autosauvegarder
+    autosauvegarder()
+
+def _noter_depuis_selectbox(item_id):
+    """Une notation modifiée ne réexécute que le score et la progression, affichés hors du fragment de l'item"""
+    noter_item(item_id, st.session_state[f"notation_{item_id}"])
+    autosauvegarder()
+    st.rerun(scope=["score_en_direct", "progression"])
+
+def _valider_formulaire_categorie(items):
+    for item in items:
+        item_id = item["id"]
+        noter_item(item_id, st.session_state[f"form_notation_{item_id}"])
+        st.session_state.audit_data[item_id]["commentaire"] = st.session_state[f"form_comment_{item_id}"]
+
+def afficher_formulaire_categorie(categorie, items):
+    """Saisie groupée : les items d'une catégorie sont enregistrés en une seule soumission"""
+    if not items:
+        return
+    
+    checklist = checklist_session()
+    
+    with st.form(key=f"form_{categorie}", border=False):
+        for item in items:
+            item_id = item["id"]
+            resultat = st.session_state.audit_data[item_id]
+            
+            st.markdown(f"**{item_id}** - {item['question']}")
+            st.caption(item['details'])
+            
+            col_note, col_comment = st.columns([1, 3])
+            
+            with col_note:
+                st.selectbox(
+                    "Notation",
+                    options=checklist.options,
+                    format_func=lambda x: checklist.notation_options[x]["label"],
+                    key=f"form_notation_{item_id}",
+                    index=checklist.position_option[resultat["notation"]] if resultat["notation"] else 0,
+                    label_visibility="collapsed"
+                )
+            
+            with col_comment:
+                st.text_area(
+                    "Commentaire / Constat",
+                    value=resultat["commentaire"],
+                    key=f"form_comment_{item_id}",
+                    height=80,
+                    placeholder="Détaillez vos observations, preuves, constats..."
+                )
+            
+            st.markdown("---")
+        
+        st.form_submit_button(
+            "💾 Valider la catégorie",
+            on_click=_valider_formulaire_categorie,
+            args=(items,),
+            type="primary",
+            use_container_width=True
+        )
+
+@st.fragment(key="progression")
+def afficher_progression():
+    """Barre de progression de l'audit en cours"""
+    nb_items = len(checklist_session().items)
+    items_completes = st.session_state.score_incremental.items_completes
+    progress = items_completes / nb_items if nb_items > 0 else 0
+    st.progress(progress, text=f"Progression : {items_completes}/{nb_items} items complétés ({progress*100:.0f}%)")
+
+@instrumenter("afficher_etape_rapport")
 def afficher_etape_rapport():
+    checklist = checklist_session()
+    
     st.title("📊 Rapport d'Audit Final")
     st.markdown("---")
     
-    # Calculer les scores
-    score_global, details_categories = calculer_score_global(st.session_state.audit_data)
-    niveau, couleur = get_niveau_conformite(score_global)
+    # Audit de référence pour la comparaison : par défaut le dernier audit antérieur du fournisseur
+    comparables = {audit["id"]: audit for audit in audits_comparables()}
+    date_audit = _date_iso(st.session_state.fournisseur_info.get("Date audit"))
+    reference_defaut = next(
+        (audit_id for audit_id, audit in comparables.items() if audit["date_audit"] <= date_audit), 0
+    )
+    if st.session_state.get("audit_reference") not in (0, *comparables):
+        st.session_state.pop("audit_reference", None)
+    reference_id = st.session_state.get("audit_reference", reference_defaut)
+    
+    # Modèle du rapport, recalculé seulement si l'audit a changé depuis le dernier affichage
+    modele = modele_rapport_session(comparables.get(reference_id))
     
     # Affichage du score global
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Score Global", f"{score_global:.1f}%")
+        st.metric("Score Global", f"{modele.score_global:.1f}%")
     
     with col2:
-        st.metric("Niveau de Conformité", niveau)
+        st.metric("Niveau de Conformité", modele.niveau)
     
     with col3:
-        total_nc = sum(1 for v in st.session_state.audit_data.values() 
-                      if v.get("notation") in ["B", "C"])
-        st.metric("Non-conformités", total_nc)
+        st.metric("Non-conformités", len(modele.non_conformites))
     
     st.markdown("---")
     
     # Détails par catégorie
     st.subheader("📈 Scores par catégorie")
     
-    df_scores = pd.DataFrame([
-        {
-            "Catégorie": cat.split(".")[1].strip(),
-            "Score (%)": f"{info['score']:.1f}",
-            "Criticité": info['criticite'],
-            "Items évalués": info['items_evalues']
-        }
-        for cat, info in details_categories.items()
-    ])
+    # Données en colonnes : pandas n'est chargé par Streamlit qu'à l'affichage de cette étape
+    details_categories = modele.details.values()
+    scores_par_categorie = {
+        "Catégorie": [info['nom'] for info in details_categories],
+        "Score (%)": [f"{info['score']:.1f}" for info in details_categories],
+        "Criticité": [info['criticite'] for info in details_categories],
+        "Items évalués": [info['items_evalues'] for info in details_categories]
+    }
     
-    st.dataframe(df_scores, use_container_width=True, hide_index=True)
+    st.dataframe(scores_par_categorie, use_container_width=True, hide_index=True)
     
     st.markdown("---")
     
     # Plan d'action (non-conformités)
     st.subheader("⚠️ Non-conformités identifiées")
     
-    nc_list = []
-    for categorie, data in CHECKLIST_AUDIT.items():
-        for item in data["items"]:
-            item_id = item["id"]
-            if item_id in st.session_state.audit_data:
-                notation = st.session_state.audit_data[item_id]["notation"]
-                if notation in ["B", "C"]:
-                    nc_list.append({
-                        "ID": item_id,
-                        "Catégorie": categorie.split(".")[1].strip(),
-                        "Question": item["question"],
-                        "Gravité": "Majeure" if notation == "C" else "Mineure",
-                        "Commentaire": st.session_state.audit_data[item_id].get("commentaire", "")
-                    })
-    
-    if nc_list:
-        df_nc = pd.DataFrame(nc_list)
-        st.dataframe(df_nc, use_container_width=True, hide_index=True)
+    nc_list = {
+        "ID": [ligne.item_id for ligne in modele.non_conformites],
+        "Catégorie": [ligne.nom_categorie for ligne in modele.non_conformites],
+        "Question": [ligne.question for ligne in modele.non_conformites],
+        "Gravité": [ligne.gravite for ligne in modele.non_conformites],
+        "Commentaire": [ligne.commentaire for ligne in modele.non_conformites]
+    }
+    
+    if modele.non_conformites:
+        st.dataframe(nc_list, use_container_width=True, hide_index=True)
     else:
         st.success("✅ Aucune non-conformité identifiée !")
     
+    if comparables:
+        st.markdown("---")
+        afficher_comparaison(modele, comparables, reference_defaut)
+    
+    if modele.non_conformites:
+        st.markdown("---")
+        afficher_plan_action(modele)
+    
     st.markdown("---")
     
     # Génération du rapport Excel
@@ -796,11 +3428,29 @@ def afficher_etape_rapport():
     with col1:
         if st.button("🔄 Régénérer le rapport", use_container_width=True):
             st.rerun()
+        
+        st.download_button(
+            label="💾 Télécharger l'audit (JSON)",
+            data=audit_vers_json(st.session_state.fournisseur_info, st.session_state.audit_data, checklist.version),
+            file_name=f"Audit_BIOCOOP_{st.session_state.fournisseur_info.get('Nom du fournisseur', 'Fournisseur').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
     
     with col2:
-        buffer = generer_rapport_excel(st.session_state.fournisseur_info, st.session_state.audit_data)
+        # La génération passe par la file : la page s'affiche sans attendre le fichier Excel
+        file_rapports = get_file_rapports()
+        travail_id = file_rapports.soumettre(modele)
+        travail = file_rapports.travail(travail_id)
+        buffer = file_rapports.contenu(travail_id)
+        if buffer is None and travail.statut == STATUT_TERMINE:
+            # Rapport évincé du cache entre-temps : il est régénéré
+            travail_id = file_rapports.soumettre(modele)
+            travail = file_rapports.travail(travail_id)
         
-        if buffer:
+        if travail.statut in (STATUT_EN_ATTENTE, STATUT_EN_COURS):
+            suivre_travail_rapport(travail_id)
+        elif buffer:
             nom_fichier = f"Audit_BIOCOOP_{st.session_state.fournisseur_info.get('Nom du fournisseur', 'Fournisseur').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
             
             st.download_button(
@@ -812,7 +3462,7 @@ def afficher_etape_rapport():
                 use_container_width=True
             )
         else:
-            st.error("❌ Impossible de générer le rapport Excel")
+            st.error(f"❌ {travail.erreur or 'Impossible de générer le rapport Excel'}")
     
     st.markdown("---")
     
@@ -821,5 +3471,806 @@ def afficher_etape_rapport():
         st.session_state.current_step = 2
         st.rerun()
 
+def afficher_comparaison(modele, comparables, reference_defaut):
+    """Écarts avec un audit antérieur du fournisseur, choisi parmi ses audits enregistrés"""
+    st.subheader("🔁 Comparaison avec un audit précédent")
+    
+    # 0 : aucune comparaison (les identifiants d'audit commencent à 1)
+    options = [0] + list(comparables)
+    st.selectbox(
+        "Audit de référence",
+        options,
+        index=options.index(reference_defaut),
+        format_func=lambda audit_id: "Aucune comparaison" if not audit_id else (
+            f"{comparables[audit_id]['date_audit']} ({comparables[audit_id]['auditeur']})"
+        ),
+        key="audit_reference"
+    )
+    
+    comparaison = modele.comparaison
+    if comparaison is None:
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Score de référence", f"{comparaison.score_reference:.1f}%", comparaison.niveau_reference,
+                delta_color="off")
+    col2.metric("Score de cet audit", f"{modele.score_global:.1f}%", f"{comparaison.delta_score:+.1f}")
+    col3.metric("Non-conformités", len(modele.non_conformites),
+                f"{len(comparaison.nc_nouvelles) - len(comparaison.nc_resolues):+d}", delta_color="inverse")
+    
+    st.dataframe(
+        {
+            "Catégorie": [nom for nom, _, _, _ in comparaison.categories],
+            "Score de référence (%)": [f"{s:.1f}" if s is not None else "" for _, s, _, _ in comparaison.categories],
+            "Score (%)": [f"{s:.1f}" if s is not None else "" for _, _, s, _ in comparaison.categories],
+            "Écart": [f"{e:+.1f}" if e is not None else "" for _, _, _, e in comparaison.categories]
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    st.markdown(
+        f"**Non-conformités** : {len(comparaison.nc_resolues)} résolue(s), "
+        f"{len(comparaison.nc_persistantes)} persistante(s), {len(comparaison.nc_nouvelles)} nouvelle(s)"
+    )
+    suivi = [
+        (ligne, libelle)
+        for libelle, lignes in [
+            ("Nouvelle", comparaison.nc_nouvelles),
+            ("Persistante", comparaison.nc_persistantes),
+            ("Résolue", comparaison.nc_resolues)
+        ]
+        for ligne in lignes
+    ]
+    if suivi:
+        st.dataframe(
+            {
+                "ID": [ligne.item_id for ligne, _ in suivi],
+                "Question": [ligne.question for ligne, _ in suivi],
+                "Notation": [ligne.notation for ligne, _ in suivi],
+                "Suivi": [libelle for _, libelle in suivi]
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    with st.expander(f"Changements de notation ({len(comparaison.changements)})"):
+        st.dataframe(
+            {
+                "ID": [c[0] for c in comparaison.changements],
+                "Catégorie": [c[1] for c in comparaison.changements],
+                "Question": [c[2] for c in comparaison.changements],
+                "Avant": [c[3] for c in comparaison.changements],
+                "Après": [c[4] for c in comparaison.changements]
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+
+def afficher_plan_action(modele):
+    """Suivi des actions correctives de l'audit enregistré : édition et import d'un plan renvoyé"""
+    st.subheader("🛠️ Suivi du plan d'action")
+    
+    if modele.actions is None:
+        st.info("Enregistrez l'audit (barre latérale) pour suivre son plan d'action.")
+        return
+    if not modele.actions:
+        st.info("Les non-conformités de l'audit enregistré n'ont pas encore d'action : enregistrez-le à nouveau.")
+        return
+    
+    lignes = [ligne for ligne in modele.non_conformites if ligne.item_id in modele.actions]
+    actions = [modele.actions[ligne.item_id] for ligne in lignes]
+    
+    def date(iso):
+        return datetime.strptime(iso, "%Y-%m-%d").date() if iso else None
+    
+    edition = st.data_editor(
+        {
+            "ID": [ligne.item_id for ligne in lignes],
+            "Point d'audit": [ligne.question for ligne in lignes],
+            "Action corrective": [action.action or "" for action in actions],
+            "Responsable": [action.responsable or "" for action in actions],
+            "Échéance": [date(action.echeance) for action in actions],
+            "Statut": [action.statut for action in actions],
+            "Date clôture": [date(action.date_cloture) for action in actions],
+            "Commentaires": [action.commentaire or "" for action in actions]
+        },
+        column_config={
+            "Échéance": st.column_config.DateColumn(format="DD/MM/YYYY"),
+            "Statut": st.column_config.SelectboxColumn(options=list(STATUTS_ACTION), required=True),
+            "Date clôture": st.column_config.DateColumn(format="DD/MM/YYYY")
+        },
+        disabled=["ID", "Point d'audit"],
+        hide_index=True,
+        use_container_width=True,
+        key="editeur_actions"
+    )
+    
+    if st.button("💾 Enregistrer le plan d'action", use_container_width=True):
+        champs_colonnes = {
+            "action": "Action corrective", "responsable": "Responsable", "echeance": "Échéance",
+            "statut": "Statut", "date_cloture": "Date clôture", "commentaire": "Commentaires"
+        }
+        modifications = {}
+        for i, action in enumerate(actions):
+            champs = {}
+            for champ, colonne in champs_colonnes.items():
+                valeur = list(edition[colonne])[i]
+                valeur = _date_action(valeur) if hasattr(valeur, "strftime") else (valeur or None)
+                if valeur != getattr(action, champ):
+                    champs[champ] = valeur
+            if champs:
+                modifications[action.item_id] = champs
+        try:
+            nb_modifiees = get_stockage().mettre_a_jour_actions(modele.audit_id, modifications)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+        else:
+            st.session_state.pop("editeur_actions", None)
+            st.toast(f"✅ {nb_modifiees} action(s) mise(s) à jour")
+            st.rerun()
+    
+    fichier = st.file_uploader("Importer un plan d'action complété (rapport Excel renvoyé)", type=["xlsx"],
+                               key="import_plan_action")
+    if fichier is not None and st.button("📥 Importer le plan d'action", use_container_width=True):
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            st.error("❌ L'import des plans d'action nécessite openpyxl (pip install openpyxl)")
+            return
+        try:
+            audit_id, nb_modifiees = importer_plan_action(fichier)
+        except Exception as e:
+            st.error(f"❌ {e}")
+        else:
+            if audit_id != modele.audit_id:
+                st.warning(f"⚠️ Le fichier concerne un autre audit (n° {audit_id}) : {nb_modifiees} action(s) mise(s) à jour")
+            else:
+                st.session_state.pop("editeur_actions", None)
+                st.toast(f"✅ {nb_modifiees} action(s) importée(s)")
+                st.rerun()
+
+@instrumenter("afficher_tableau_de_bord")
+def afficher_tableau_de_bord():
+    st.title("📈 Tableau de bord fournisseurs")
+    st.markdown("---")
+    
+    agregats = get_tableau_de_bord().agreger()
+    if agregats["nb_audits"] == 0:
+        st.info("Aucun audit enregistré : le tableau de bord se remplit à mesure que les audits sont enregistrés.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Audits", agregats["nb_audits"])
+    col2.metric("Fournisseurs", agregats["nb_fournisseurs"])
+    col3.metric("Score moyen (dernier audit)", f"{agregats['score_moyen_derniers']:.1f}%")
+    
+    st.subheader("📊 Distribution des scores par catégorie")
+    distribution = agregats["distribution"]
+    st.bar_chart(distribution["Médiane"])
+    st.dataframe(distribution.round(1), use_container_width=True)
+    
+    st.subheader("⚠️ Non-conformités les plus fréquentes")
+    if len(agregats["non_conformites"]):
+        st.dataframe(agregats["non_conformites"].head(20), use_container_width=True)
+    else:
+        st.success("✅ Aucune non-conformité dans l'historique")
+    
+    st.subheader("❌ Fournisseurs NON CONFORME au dernier audit")
+    non_conformes = agregats["fournisseurs_non_conformes"]
+    if len(non_conformes):
+        st.dataframe(
+            non_conformes[["fournisseur", "date_audit", "score_global"]].rename(columns={
+                "fournisseur": "Fournisseur", "date_audit": "Date", "score_global": "Score (%)"
+            }).round(1),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.success("✅ Aucun fournisseur NON CONFORME")
+    
+    st.subheader("⏰ Actions correctives en retard")
+    stockage = get_stockage()
+    nb_retards = stockage.compter_actions_en_retard()
+    if nb_retards:
+        retards = stockage.actions_en_retard(limite=200)
+        st.caption(f"{nb_retards} action(s) ouverte(s) à l'échéance dépassée"
+                   + (" (les 200 plus anciennes ci-dessous)" if nb_retards > len(retards) else ""))
+        st.dataframe(
+            {
+                "Fournisseur": [r["fournisseur"] for r in retards],
+                "Date audit": [r["date_audit"] for r in retards],
+                "ID": [r["item_id"] for r in retards],
+                "Action corrective": [r["action"] or "" for r in retards],
+                "Responsable": [r["responsable"] or "" for r in retards],
+                "Échéance": [r["echeance"] for r in retards]
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.success("✅ Aucune action en retard")
+    
+    afficher_plan_audits()
+    afficher_simulation()
+
+def afficher_plan_audits():
+    """Plan d'audit du mois : les fournisseurs les plus risqués d'abord"""
+    st.subheader("📅 Plan d'audit mensuel")
+    st.caption(
+        "Fournisseurs classés par risque : score du dernier audit, non-conformités des catégories CRITIQUE, "
+        "site mixte, ancienneté du dernier audit et actions correctives ouvertes."
+    )
+    
+    aujourd_hui = datetime.now()
+    mois_possibles = [
+        f"{aujourd_hui.year + (aujourd_hui.month + i - 1) // 12}-{(aujourd_hui.month + i - 1) % 12 + 1:02d}"
+        for i in range(13)
+    ]
+    col1, col2 = st.columns(2)
+    with col1:
+        mois = st.selectbox("Mois", mois_possibles, index=1, key="plan_audits_mois")
+    with col2:
+        nb_audits = st.number_input("Nombre d'audits", min_value=1, max_value=200, value=NB_AUDITS_PAR_MOIS,
+                                    key="plan_audits_nombre")
+    
+    plan = get_planification_audits().plan_mensuel(mois, int(nb_audits))
+    st.dataframe(plan.drop(columns="Mois"), use_container_width=True, hide_index=True)
+    
+    buffer = io.BytesIO()
+    exporter_plan_audits(plan, buffer)
+    st.download_button(
+        label="📥 Télécharger le plan d'audit (Excel)",
+        data=buffer.getvalue(),
+        file_name=f"Plan_audits_BIOCOOP_{mois}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        use_container_width=True
+    )
+
+def afficher_simulation():
+    """Rescoring de l'historique sous d'autres coefficients, points ou seuils"""
+    st.subheader("🧪 Simulation d'une autre notation")
+    try:
+        actuelle = configuration_scoring()
+    except ValueError as e:
+        st.info(f"Simulation indisponible : {e}")
+        return
+    
+    with st.form("simulation"):
+        st.caption("Coefficients par criticité")
+        colonnes = st.columns(len(actuelle.coefficients))
+        coefficients = {
+            criticite: colonne.number_input(criticite, min_value=0.0, value=float(coefficient), step=0.1,
+                                            key=f"simulation_coefficient_{criticite}")
+            for colonne, (criticite, coefficient) in zip(colonnes, actuelle.coefficients.items())
+        }
+        
+        st.caption("Points par notation")
+        notees = {note: points for note, points in actuelle.points.items() if points is not None}
+        colonnes = st.columns(len(notees))
+        points = {
+            note: colonne.number_input(note, value=float(valeur), step=1.0, key=f"simulation_points_{note}")
+            for colonne, (note, valeur) in zip(colonnes, notees.items())
+        }
+        
+        st.caption("Score minimal de chaque niveau (%)")
+        colonnes = st.columns(len(actuelle.niveaux) - 1)
+        seuils = {
+            niveau: colonne.number_input(niveau, min_value=0.0, max_value=100.0, value=float(seuil), step=1.0,
+                                         key=f"simulation_seuil_{niveau}")
+            for colonne, (seuil, niveau, _) in zip(colonnes, actuelle.niveaux)
+        }
+        
+        if st.form_submit_button("🧪 Simuler sur tout l'historique", use_container_width=True):
+            try:
+                configuration = configuration_scoring(coefficients, points, seuils)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                debut = time.perf_counter()
+                simulation = get_simulation_scoring().simuler(configuration)
+                # Le détail par audit (tout l'historique) n'est pas gardé dans la session
+                del simulation["audits"]
+                simulation["duree"] = time.perf_counter() - debut
+                st.session_state.resultat_simulation = simulation
+    
+    simulation = st.session_state.get("resultat_simulation")
+    if not simulation:
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Fournisseurs changeant de niveau",
+                f"{simulation['nb_fournisseurs_changes']} / {simulation['nb_fournisseurs']}")
+    col2.metric("Audits changeant de niveau", f"{simulation['nb_audits_changes']} / {simulation['nb_audits']}")
+    if simulation["score_moyen_simule"] is not None:
+        col3.metric("Score moyen simulé (dernier audit)", f"{simulation['score_moyen_simule']:.1f}%",
+                    f"{simulation['score_moyen_simule'] - simulation['score_moyen_actuel']:+.1f}")
+    st.caption(f"{simulation['nb_audits']} audits rescorés en {simulation['duree'] * 1000:.0f} ms")
+    
+    st.dataframe(simulation["transitions"], use_container_width=True)
+    if len(simulation["fournisseurs_changes"]):
+        st.dataframe(
+            simulation["fournisseurs_changes"][
+                ["fournisseur", "date_audit", "score_actuel", "score_simule", "niveau_actuel", "niveau_simule"]
+            ].rename(columns={
+                "fournisseur": "Fournisseur", "date_audit": "Date", "score_actuel": "Score actuel (%)",
+                "score_simule": "Score simulé (%)", "niveau_actuel": "Niveau actuel", "niveau_simule": "Niveau simulé"
+            }).round(1),
+            use_container_width=True,
+            hide_index=True
+        )
+
+@instrumenter("afficher_recherche")
+def afficher_recherche():
+    st.title("🔎 Recherche dans les constats")
+    st.markdown("---")
+    
+    checklist = INDEX_CHECKLIST
+    texte = st.text_input("Mots recherchés", placeholder="ex : détecteur de métaux, certificat expiré…")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        categories = st.multiselect("Catégories", list(checklist.categories), format_func=checklist.nom_categorie.get)
+    with col2:
+        items_possibles = [
+            item_id for item_id, categorie in checklist.categorie_item.items()
+            if not categories or categorie in categories
+        ]
+        items = st.multiselect("Items", items_possibles)
+    with col3:
+        notations = st.multiselect("Notations", list(checklist.options))
+    
+    if not texte.strip():
+        st.info("Saisissez un ou plusieurs mots : les commentaires contenant tous ces mots (ou des mots qui "
+                "commencent par eux) sont recherchés dans tous les audits enregistrés, sans tenir compte des accents.")
+        return
+    
+    item_ids = items or (items_possibles if categories else None)
+    stockage = get_stockage()
+    debut = time.perf_counter()
+    resultats = stockage.rechercher_commentaires(texte, item_ids=item_ids, notations=notations, limite=200)
+    duree = (time.perf_counter() - debut) * 1000
+    
+    st.caption(
+        f"{len(resultats)}{'+' if len(resultats) == 200 else ''} constat(s) en {duree:.0f} ms"
+        + ("" if stockage.recherche_fts else " (recherche simple : SQLite sans FTS5)")
+    )
+    for resultat in resultats:
+        item = checklist.items.get(resultat["item_id"], {})
+        st.markdown(
+            f"**{resultat['fournisseur']}** - {resultat['date_audit']} · "
+            f"**{resultat['item_id']}** {item.get('question', '')} · notation **{resultat['notation'] or '-'}**"
+        )
+        st.caption(resultat["extrait"])
+
+@st.fragment(run_every=INTERVALLE_SUIVI_RAPPORT)
+def suivre_travail_rapport(travail_id):
+    """Statut d'un rapport en cours de génération ; la page est réaffichée dès qu'il est prêt"""
+    travail = get_file_rapports().travail(travail_id)
+    if travail is None or travail.statut in (STATUT_TERMINE, STATUT_ECHEC):
+        st.rerun()
+    
+    st.info(f"⏳ Génération du rapport Excel : {travail.statut}…")
+
+def audit_vers_json(fournisseur_info, audit_data, version_checklist=VERSION_CHECKLIST):
+    """Sérialise un audit au format lu par la génération de rapports en lot"""
+    return json.dumps(
+        {
+            "version_checklist": version_checklist,
+            "fournisseur_info": fournisseur_info,
+            "audit_data": {item_id: dict(resultat) for item_id, resultat in audit_data.items()}
+        },
+        ensure_ascii=False,
+        indent=2,
+        default=str
+    )
+
+def _generer_rapport_depuis_json(chemin_json, dossier_sortie):
+    """Génère le rapport Excel d'un audit JSON (exécuté dans un processus du pool)"""
+    with open(chemin_json, encoding="utf-8") as f:
+        audit = json.load(f)
+
+    fournisseur_info = audit.get("fournisseur_info", {})
+    audit_data = audit.get("audit_data", {})
+    checklist = charger_checklist(audit.get("version_checklist", VERSION_CHECKLIST))
+
+    nom_rapport = os.path.splitext(os.path.basename(chemin_json))[0] + ".xlsx"
+    chemin_rapport = os.path.join(dossier_sortie, nom_rapport)
+    modele = construire_modele_rapport(fournisseur_info, audit_data, checklist, empreinte=False)
+    ecrire_rapport_excel(modele, chemin_rapport)
+
+    return chemin_rapport, modele.score_global
+
+def generer_rapports_lot(dossier_audits, dossier_sortie=None, workers=None):
+    """Génère un rapport Excel par audit JSON du dossier, réparti sur un pool de processus"""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    dossier_sortie = dossier_sortie or dossier_audits
+    os.makedirs(dossier_sortie, exist_ok=True)
+
+    fichiers = sorted(
+        os.path.join(dossier_audits, nom)
+        for nom in os.listdir(dossier_audits)
+        if nom.lower().endswith(".json")
+    )
+
+    resultats = []
+    erreurs = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        taches = {pool.submit(_generer_rapport_depuis_json, chemin, dossier_sortie): chemin for chemin in fichiers}
+        for tache in as_completed(taches):
+            try:
+                resultats.append(tache.result())
+            except Exception as e:
+                erreurs.append((taches[tache], e))
+
+    return sorted(resultats), sorted(erreurs, key=lambda erreur: erreur[0])
+
+def lire_rapport_excel(chemin, checklist=None):
+    """Relit un rapport produit par ecrire_rapport_excel et renvoie (fournisseur_info, audit_data).
+    Lecture en flux (openpyxl en lecture seule) ; ValueError si le rapport ne correspond pas à la checklist"""
+    from openpyxl import load_workbook
+
+    checklist = checklist or INDEX_CHECKLIST
+    classeur = load_workbook(chemin, read_only=True, data_only=True)
+    try:
+        for feuille in ("Informations Fournisseur", "Résultats Audit"):
+            if feuille not in classeur.sheetnames:
+                raise ValueError(f"feuille « {feuille} » absente")
+
+        fournisseur_info = {}
+        for cle, valeur in classeur["Informations Fournisseur"].iter_rows(min_row=3, max_col=2, values_only=True):
+            if cle:
+                fournisseur_info[str(cle)] = "" if valeur is None else str(valeur)
+
+        audit_data = {}
+        inconnus = []
+        lignes = classeur["Résultats Audit"].iter_rows(min_row=2, max_col=5, values_only=True)
+        for item_id, _, _, notation, commentaire in lignes:
+            if not item_id:
+                continue
+            if item_id not in checklist.items:
+                inconnus.append(str(item_id))
+                continue
+            if item_id in audit_data:
+                raise ValueError(f"item {item_id} présent deux fois")
+            if notation is not None and notation not in checklist.notation_options:
+                raise ValueError(f"notation inconnue pour {item_id} : {notation}")
+            audit_data[item_id] = {"notation": notation, "commentaire": "" if commentaire is None else str(commentaire)}
+        if inconnus:
+            raise ValueError(f"items absents de la checklist {checklist.version} : {', '.join(inconnus)}")
+
+        # Le score affiché dans la synthèse doit être celui recalculé avec cette checklist
+        # (calculé comme à l'écriture du rapport : les items non notés ne comptent pas)
+        if "Synthèse" in classeur.sheetnames:
+            for _, score_rapport in classeur["Synthèse"].iter_rows(min_row=3, max_row=3, max_col=2, values_only=True):
+                score_global = construire_modele_rapport(fournisseur_info, audit_data, checklist, empreinte=False).score_global
+                if score_rapport and score_rapport != f"{score_global:.1f}%":
+                    raise ValueError(f"score du rapport ({score_rapport}) différent du score recalculé ({score_global:.1f}%)")
+    finally:
+        classeur.close()
+
+    return fournisseur_info, audit_data
+
+# Textes des cellules à compléter du Plan d'Action, équivalents à une cellule vide
+_MARQUES_PLAN_ACTION = {"[À définir]", "[Responsable]", "[Date limite]"}
+
+def _valeur_plan_action(valeur):
+    if valeur is None or str(valeur).strip() in _MARQUES_PLAN_ACTION | {""}:
+        return None
+    return valeur if hasattr(valeur, "strftime") else str(valeur).strip()
+
+def lire_plan_action(chemin):
+    """Relit la feuille « Plan d'Action » d'un rapport renvoyé complété.
+    Renvoie (audit_id du rapport ou None, fournisseur_info, {item_id: champs de l'action})"""
+    from openpyxl import load_workbook
+
+    classeur = load_workbook(chemin, read_only=True, data_only=True)
+    try:
+        if "Plan d'Action" not in classeur.sheetnames:
+            raise ValueError("feuille « Plan d'Action » absente")
+
+        proprietes = getattr(classeur, "custom_doc_props", None)
+        audit_id = next((p.value for p in proprietes.props if p.name == "Audit"), None) if proprietes else None
+
+        fournisseur_info = {}
+        if "Informations Fournisseur" in classeur.sheetnames:
+            for cle, valeur in classeur["Informations Fournisseur"].iter_rows(min_row=3, max_col=2, values_only=True):
+                if cle:
+                    fournisseur_info[str(cle)] = "" if valeur is None else str(valeur)
+
+        modifications = {}
+        lignes = classeur["Plan d'Action"].iter_rows(min_row=2, max_col=9, values_only=True)
+        for item_id, _, _, action, responsable, echeance, statut, date_cloture, commentaire in lignes:
+            if not item_id:
+                continue
+            champs = {
+                "action": _valeur_plan_action(action),
+                "responsable": _valeur_plan_action(responsable),
+                "echeance": _valeur_plan_action(echeance),
+                "date_cloture": _valeur_plan_action(date_cloture),
+                "commentaire": _valeur_plan_action(commentaire)
+            }
+            if _valeur_plan_action(statut):
+                champs["statut"] = _valeur_plan_action(statut)
+            modifications[str(item_id)] = champs
+    finally:
+        classeur.close()
+
+    return audit_id, fournisseur_info, modifications
+
+def importer_plan_action(chemin, stockage=None):
+    """Reporte dans l'historique le plan d'action d'un rapport renvoyé complété.
+    L'audit est celui inscrit dans le rapport, à défaut celui du même fournisseur à la même date.
+    Renvoie (audit_id, nombre d'actions mises à jour) ; ValueError si l'audit est introuvable"""
+    stockage = stockage or get_stockage()
+    audit_id, fournisseur_info, modifications = lire_plan_action(chemin)
+
+    if audit_id is None:
+        nom = fournisseur_info.get("Nom du fournisseur", "").strip()
+        date_audit = _date_iso(fournisseur_info.get("Date audit"))
+        candidats = [a["id"] for a in stockage.lister_audits(fournisseur=nom) if a["date_audit"] == date_audit] if nom else []
+        if len(candidats) != 1:
+            raise ValueError(f"audit de « {nom} » du {fournisseur_info.get('Date audit', '?')} "
+                             f"{'introuvable' if not candidats else 'ambigu'} dans l'historique")
+        audit_id = candidats[0]
+    elif stockage.charger_audit(audit_id) is None:
+        raise ValueError(f"audit {audit_id} absent de l'historique")
+
+    return audit_id, stockage.mettre_a_jour_actions(audit_id, modifications)
+
+def _lire_rapport_excel_fichier(chemin, version_checklist):
+    """Relit un rapport Excel (exécuté dans un processus du pool)"""
+    return lire_rapport_excel(chemin, charger_checklist(version_checklist))
+
+def importer_rapports_lot(dossier_rapports, stockage=None, workers=None, version_checklist=VERSION_CHECKLIST):
+    """Importe dans l'historique les rapports Excel d'un dossier, relus en parallèle sur un pool de processus.
+    Renvoie (importés [(chemin, audit_id)], ignorés [(chemin, raison)], erreurs [(chemin, exception)])"""
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from itertools import islice
+
+    stockage = stockage or get_stockage()
+    workers = workers or os.cpu_count() or 1
+    fichiers = iter(sorted(
+        os.path.join(dossier_rapports, nom)
+        for nom in os.listdir(dossier_rapports)
+        # ~$… : fichiers de verrouillage laissés par Excel
+        if nom.lower().endswith(".xlsx") and not nom.startswith("~$")
+    ))
+
+    importes = []
+    ignores = []
+    erreurs = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Nombre borné de fichiers en cours : la mémoire ne dépend pas de la taille du dossier
+        en_cours = {}
+        while True:
+            for chemin in islice(fichiers, 4 * workers - len(en_cours)):
+                en_cours[pool.submit(_lire_rapport_excel_fichier, chemin, version_checklist)] = chemin
+            if not en_cours:
+                break
+
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for tache in termines:
+                chemin = en_cours.pop(tache)
+                try:
+                    fournisseur_info, audit_data = tache.result()
+                except Exception as e:
+                    erreurs.append((chemin, e))
+                    continue
+
+                nom = fournisseur_info.get("Nom du fournisseur", "").strip() or "Fournisseur sans nom"
+                date_audit = _date_iso(fournisseur_info.get("Date audit"))
+                if stockage.lister_audits(fournisseur=nom, date_debut=date_audit, date_fin=date_audit, limite=1):
+                    ignores.append((chemin, f"audit de {nom} du {fournisseur_info.get('Date audit')} déjà présent"))
+                    continue
+
+                audit_id = stockage.enregistrer_audit(fournisseur_info, audit_data, version_checklist=version_checklist)
+                importes.append((chemin, audit_id))
+
+    return sorted(importes), sorted(ignores), sorted(erreurs, key=lambda erreur: erreur[0])
+
+def synthese_metriques(chemin):
+    """Agrège un journal JSONL de mesures : {mesure: (nb, médiane_ms, p95_ms, max_ms)}, triées par p95"""
+    durees = {}
+    with open(chemin, encoding="utf-8") as f:
+        for ligne in f:
+            if not ligne.strip():
+                continue
+            enregistrement = json.loads(ligne)
+            for nom, duree in enregistrement["durees_ms"].items():
+                durees.setdefault(f"{enregistrement['type']}/{nom}", []).append(duree)
+    
+    synthese = {}
+    for nom, valeurs in durees.items():
+        valeurs.sort()
+        synthese[nom] = (
+            len(valeurs),
+            valeurs[len(valeurs) // 2],
+            valeurs[min(len(valeurs) - 1, int(len(valeurs) * 0.95))],
+            valeurs[-1]
+        )
+    return dict(sorted(synthese.items(), key=lambda m: m[1][2], reverse=True))
+
+def cli(argv=None):
+    """Point d'entrée en ligne de commande : python app.py <commande> ..."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="app.py", description="Outils hors interface de l'audit BIOCOOP")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+
+    parser_rapports = commandes.add_parser("rapports", help="Génère un rapport Excel par audit JSON d'un dossier")
+    parser_rapports.add_argument("dossier", help="Dossier contenant les audits sauvegardés (.json)")
+    parser_rapports.add_argument("-o", "--sortie", help="Dossier des rapports (par défaut : celui des audits)")
+    parser_rapports.add_argument("-j", "--workers", type=int, default=None,
+                                 help="Nombre de processus (par défaut : nombre de CPU)")
+
+    parser_importer = commandes.add_parser("importer", help="Importe dans l'historique les rapports Excel d'un dossier")
+    parser_importer.add_argument("dossier", help="Dossier contenant les rapports (.xlsx)")
+    parser_importer.add_argument("-j", "--workers", type=int, default=None,
+                                 help="Nombre de processus (par défaut : nombre de CPU)")
+    parser_importer.add_argument("--version-checklist", default=VERSION_CHECKLIST,
+                                 help=f"Version de checklist des rapports (par défaut : {VERSION_CHECKLIST})")
+
+    parser_exporter = commandes.add_parser("exporter", help="Exporte tout l'historique dans un classeur consolidé")
+    parser_exporter.add_argument("fichier", help="Classeur à écrire (.xlsx)")
+
+    parser_parquet = commandes.add_parser("parquet", help="Exporte l'historique en Parquet partitionné (année, catégorie)")
+    parser_parquet.add_argument("dossier", nargs="?", default=DOSSIER_PARQUET,
+                                help="Dossier de l'export (par défaut : AUDIT_PARQUET_DIR)")
+    parser_parquet.add_argument("--tout", action="store_true",
+                                help="Réécrit tous les audits, pas seulement ceux absents de l'export")
+
+    parser_metriques = commandes.add_parser("metriques", help="Synthèse d'un journal de mesures de performance")
+    parser_metriques.add_argument("journal", nargs="?", default=CHEMIN_METRIQUES,
+                                  help="Fichier JSONL des mesures (par défaut : AUDIT_METRICS_PATH)")
+
+    parser_simuler = commandes.add_parser("simuler", help="Rescore tout l'historique sous une autre notation")
+    parser_simuler.add_argument("--coefficient", action="append", default=[], metavar="CRITICITE=VALEUR",
+                                help="Coefficient d'une criticité, ex. CRITIQUE=2.5 (répétable)")
+    parser_simuler.add_argument("--points", action="append", default=[], metavar="NOTATION=VALEUR",
+                                help="Points d'une notation, ex. B=0.5 (répétable)")
+    parser_simuler.add_argument("--seuil", action="append", default=[], metavar="NIVEAU=SCORE",
+                                help="Score minimal d'un niveau, ex. EXCELLENT=85 (répétable)")
+    parser_simuler.add_argument("--sortie", help="Fichier CSV des scores actuels et simulés de chaque audit")
+
+    parser_plan = commandes.add_parser("importer-actions",
+                                       help="Reporte dans l'historique les plans d'action de rapports renvoyés complétés")
+    parser_plan.add_argument("fichiers", nargs="+", help="Rapports Excel (.xlsx)")
+
+    parser_retards = commandes.add_parser("retards", help="Liste les actions correctives ouvertes à l'échéance dépassée")
+    parser_retards.add_argument("--date", help="Date de référence AAAA-MM-JJ (par défaut : aujourd'hui)")
+    parser_retards.add_argument("--limite", type=int, default=None, help="Nombre maximal d'actions listées")
+
+    parser_planifier = commandes.add_parser("planifier", help="Plan d'audit mensuel des fournisseurs les plus risqués")
+    parser_planifier.add_argument("--mois", help="Mois du plan AAAA-MM (par défaut : le mois prochain)")
+    parser_planifier.add_argument("-n", "--audits", type=int, default=NB_AUDITS_PAR_MOIS,
+                                  help=f"Nombre d'audits du plan (par défaut : {NB_AUDITS_PAR_MOIS})")
+    parser_planifier.add_argument("--sortie", help="Fichier du plan (.xlsx, ou .csv)")
+
+    args = parser.parse_args(argv)
+
+    if args.commande == "planifier":
+        try:
+            plan = get_planification_audits().plan_mensuel(args.mois, args.audits)
+        except ValueError as e:
+            parser.error(str(e))
+        print(plan.drop(columns="Mois").to_string(index=False))
+        if args.sortie:
+            if not args.sortie.lower().endswith(".csv"):
+                try:
+                    import xlsxwriter  # noqa: F401
+                except ImportError:
+                    parser.error("l'export Excel du plan nécessite xlsxwriter (pip install xlsxwriter)")
+            exporter_plan_audits(plan, args.sortie)
+            print(f"✅ Plan d'audit {plan['Mois'].iloc[0] if len(plan) else ''} écrit dans {args.sortie}")
+        return 0
+
+    if args.commande == "importer-actions":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            parser.error("l'import des plans d'action nécessite openpyxl (pip install openpyxl)")
+        erreurs = 0
+        for chemin in args.fichiers:
+            try:
+                audit_id, nb_modifiees = importer_plan_action(chemin)
+            except Exception as e:
+                print(f"❌ {chemin} : {e}", file=sys.stderr)
+                erreurs += 1
+            else:
+                print(f"✅ {chemin} : {nb_modifiees} action(s) mise(s) à jour (audit {audit_id})")
+        return 1 if erreurs else 0
+
+    if args.commande == "retards":
+        stockage = get_stockage()
+        for r in stockage.actions_en_retard(args.date, args.limite):
+            print(f"{_date_fr(r['echeance'])}  {r['fournisseur']} ({_date_fr(r['date_audit'])})  {r['item_id']}  "
+                  f"{r['action'] or '[À définir]'}  {r['responsable'] or ''}")
+        print(f"{stockage.compter_actions_en_retard(args.date)} action(s) en retard")
+        return 0
+
+    if args.commande == "simuler":
+        def valeurs(couples, option):
+            resultat = {}
+            for couple in couples:
+                cle, _, valeur = couple.rpartition("=")
+                try:
+                    resultat[cle] = float(valeur)
+                except ValueError:
+                    parser.error(f"{option} attend CLE=NOMBRE : {couple}")
+            return resultat
+
+        try:
+            configuration = configuration_scoring(
+                valeurs(args.coefficient, "--coefficient"), valeurs(args.points, "--points"),
+                valeurs(args.seuil, "--seuil")
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        debut = time.perf_counter()
+        simulation = get_simulation_scoring().simuler(configuration)
+        duree = time.perf_counter() - debut
+        print(f"{simulation['nb_audits']} audit(s) rescoré(s) en {duree * 1000:.0f} ms")
+        print(f"{simulation['nb_fournisseurs_changes']}/{simulation['nb_fournisseurs']} fournisseur(s) et "
+              f"{simulation['nb_audits_changes']}/{simulation['nb_audits']} audit(s) changent de niveau")
+        print(simulation["transitions"].to_string())
+        for ligne in simulation["fournisseurs_changes"].itertuples():
+            print(f"  {ligne.fournisseur} ({ligne.date_audit}) : {ligne.score_actuel:.1f}% {ligne.niveau_actuel} "
+                  f"→ {ligne.score_simule:.1f}% {ligne.niveau_simule}")
+        if args.sortie:
+            simulation["audits"].to_csv(args.sortie, index=False)
+        return 0
+
+    if args.commande == "importer":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            parser.error("l'import des rapports Excel nécessite openpyxl (pip install openpyxl)")
+        importes, ignores, erreurs = importer_rapports_lot(args.dossier, workers=args.workers,
+                                                           version_checklist=args.version_checklist)
+        for chemin, raison in ignores:
+            print(f"⏭️ {chemin} : {raison}")
+        for chemin, erreur in erreurs:
+            print(f"❌ {chemin} : {erreur}", file=sys.stderr)
+        print(f"{len(importes)} audit(s) importé(s), {len(ignores)} ignoré(s), {len(erreurs)} erreur(s)")
+        return 1 if erreurs else 0
+
+    if args.commande == "exporter":
+        nb_audits = exporter_consolide(args.fichier)
+        print(f"✅ {nb_audits} audit(s) exporté(s) dans {args.fichier}")
+        return 0
+
+    if args.commande == "parquet":
+        if not args.dossier:
+            parser.error("aucun dossier indiqué et AUDIT_PARQUET_DIR n'est pas défini")
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("l'export Parquet nécessite pyarrow (pip install pyarrow)")
+        nb_audits = ExportParquet(args.dossier).synchroniser(get_stockage(), tout=args.tout)
+        print(f"✅ {nb_audits} audit(s) écrit(s) dans {args.dossier}")
+        return 0
+
+    if args.commande == "metriques":
+        if not args.journal:
+            parser.error("aucun journal indiqué et AUDIT_METRICS_PATH n'est pas défini")
+        print(f"{'Mesure':<50} {'nb':>6} {'médiane':>10} {'p95':>10} {'max':>10}")
+        for nom, (nb, mediane, p95, maximum) in synthese_metriques(args.journal).items():
+            print(f"{nom:<50} {nb:>6} {mediane:>8.1f}ms {p95:>8.1f}ms {maximum:>8.1f}ms")
+        return 0
+
+    if args.commande == "rapports":
+        resultats, erreurs = generer_rapports_lot(args.dossier, args.sortie, args.workers)
+        for chemin, score_global in resultats:
+            print(f"✅ {chemin} ({score_global:.1f}%)")
+        for chemin, erreur in erreurs:
+            print(f"❌ {chemin} : {erreur}", file=sys.stderr)
+        print(f"{len(resultats)} rapport(s) généré(s), {len(erreurs)} erreur(s)")
+        return 1 if erreurs else 0
+
 if __name__ == "__main__":
-    main()
+    if st.runtime.exists():
+        main()
+    else:
+        sys.exit(cli())
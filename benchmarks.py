@@ -0,0 +1,269 @@
+"""Benchmarks des chemins critiques de l'application d'audit
+
+Usage :
+    python benchmarks.py [--sortie benchmarks.json] [--repetitions 20] [--sans-apptest]
+    python benchmarks.py --comparer ancien.json
+
+Mesure le scoring, la génération du rapport Excel et les réexécutions complètes
+de chaque étape (AppTest : durée de main() mesurée par l'application, et à
+part durée de at.run(), qui recompile app.py à chaque fois), sur la checklist
+réelle et sur une checklist synthétique de 500 items avec des commentaires jusqu'à 5 Ko, ainsi que la
+mémoire occupée par un audit selon sa représentation. Les résultats sont
+écrits en JSON pour comparer les commits entre eux.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DOSSIER_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Base d'audits jetable pour les réexécutions AppTest (lue par app.py à l'import)
+os.environ.setdefault("AUDIT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench_audit_"), "audits.db"))
+os.environ.setdefault("AUDIT_DRAFTS_DIR", tempfile.mkdtemp(prefix="bench_brouillons_"))
+sys.path.insert(0, DOSSIER_APP)
+
+import app
+
+TAILLE_MAX_COMMENTAIRE = 5 * 1024
+
+def checklist_synthetique(nb_items=500, nb_categories=10):
+    """Checklist de nb_items items répartis en nb_categories catégories"""
+    criticites = [("CRITIQUE", 2.0), ("MAJEUR", 1.5), ("STANDARD", 1.0)]
+    categories = {}
+    for c in range(nb_categories):
+        criticite, coefficient = criticites[c % len(criticites)]
+        categories[f"{c + 1}. CATÉGORIE SYNTHÉTIQUE {c + 1}"] = {
+            "criticite": criticite,
+            "coefficient": coefficient,
+            "items": [
+                {
+                    "id": f"S{c:02d}-{i:03d}",
+                    "question": f"Question synthétique {i} de la catégorie {c + 1}",
+                    "details": "Détails de l'exigence " * 5
+                }
+                for i in range(nb_items // nb_categories)
+            ]
+        }
+
+    return app.compiler_checklist({
+        "version": f"synthetique-{nb_items}",
+        "notations": dict(app.NOTATION_OPTIONS),
+        "categories": categories
+    })
+
+def audit_aleatoire(checklist, taille_max_commentaire, graine=0):
+    """Audit complet aux notations et commentaires aléatoires (reproductible)"""
+    alea = random.Random(graine)
+    return {
+        item_id: {
+            "notation": alea.choice(checklist.options),
+            "commentaire": "x" * alea.randint(0, taille_max_commentaire)
+        }
+        for item_id in checklist.items
+    }
+
+def fournisseur_exemple():
+    return {
+        "Nom du fournisseur": "Conserverie du Terroir",
+        "Adresse": "1 rue des Vergers, 26000 Valence",
+        "Type site": "100% BIO",
+        "Date audit": "15/10/2025",
+        "Auditeur": "Benchmark"
+    }
+
+def chronometrer(fonction, repetitions):
+    """Durées (ms) de repetitions appels, après un appel de chauffe"""
+    fonction()
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return resumer(durees)
+
+def resumer(durees):
+    """Statistiques (ms) d'une série de durées"""
+    return {
+        "repetitions": len(durees),
+        "min_ms": min(durees),
+        "mediane_ms": statistics.median(durees),
+        "moyenne_ms": statistics.fmean(durees),
+        "max_ms": max(durees)
+    }
+
+def benchmarks_fonctions(repetitions):
+    resultats = {}
+    fournisseur_info = fournisseur_exemple()
+
+    for nom, checklist, taille_commentaire in [
+        ("reel", app.INDEX_CHECKLIST, 500),
+        ("synthetique_500", checklist_synthetique(500), TAILLE_MAX_COMMENTAIRE)
+    ]:
+        audit_data = audit_aleatoire(checklist, taille_commentaire)
+        historique = [audit_aleatoire(checklist, 0, graine) for graine in range(1000)]
+
+        resultats[f"calculer_score_global/{nom}"] = chronometrer(
+            lambda: app.calculer_score_global(audit_data, checklist), repetitions * 10
+        )
+        resultats[f"score_incremental_noter/{nom}"] = chronometrer(
+            lambda: _noter_tous(checklist, audit_data), repetitions
+        )
+        resultats[f"calculer_scores_lot_1000/{nom}"] = chronometrer(
+            lambda: app.calculer_scores_lot(historique, checklist), max(1, repetitions // 4)
+        )
+        # Chemin des lots lus en base : matrice construite une fois, puis scorée en une passe
+        notations = [{item_id: r["notation"] for item_id, r in audit.items()} for audit in historique]
+        resultats[f"matrice_notations_plates_1000/{nom}"] = chronometrer(
+            lambda: app.matrice_notations_plates(notations, checklist), repetitions
+        )
+        matrice = app.matrice_notations_plates(notations, checklist)
+        resultats[f"scorer_matrice_1000/{nom}"] = chronometrer(
+            lambda: app.scorer_matrice(matrice, checklist), repetitions
+        )
+        resultats[f"construire_modele_rapport/{nom}"] = chronometrer(
+            lambda: app.construire_modele_rapport(fournisseur_info, audit_data, checklist), repetitions * 10
+        )
+        resultats[f"generer_rapport_excel/{nom}"] = chronometrer(
+            lambda: app.generer_rapport_excel(app.construire_modele_rapport(fournisseur_info, audit_data, checklist)),
+            repetitions
+        )
+
+    scores = [random.Random(0).uniform(0, 100) for _ in range(10000)]
+    resultats["get_niveau_conformite/10000"] = chronometrer(
+        lambda: [app.get_niveau_conformite(score) for score in scores], repetitions
+    )
+
+    return resultats
+
+def benchmarks_memoire():
+    """Taille (octets) d'un audit en dictionnaires imbriqués et en AuditCompact"""
+    resultats = {}
+    for nom, checklist, taille_commentaire in [
+        ("reel", app.INDEX_CHECKLIST, 500),
+        ("synthetique_500", checklist_synthetique(500), TAILLE_MAX_COMMENTAIRE)
+    ]:
+        for variante, audit_data in [
+            ("vide", {item_id: {"notation": None, "commentaire": ""} for item_id in checklist.items}),
+            ("sans_commentaires", audit_aleatoire(checklist, 0)),
+            ("avec_commentaires", audit_aleatoire(checklist, taille_commentaire))
+        ]:
+            resultats[f"audit_{variante}/{nom}"] = {
+                "dict_octets": app.taille_objet(audit_data),
+                "compact_octets": app.taille_objet(app.AuditCompact(checklist, audit_data))
+            }
+
+    return resultats
+
+def _noter_tous(checklist, audit_data):
+    score = app.ScoreIncremental(checklist=checklist)
+    for item_id, resultat in audit_data.items():
+        score.noter(item_id, resultat["notation"])
+    return score.calculer()
+
+def benchmarks_apptest(repetitions):
+    """Réexécutions complètes du script pour chaque étape, via AppTest.
+
+    AppTest recompile app.py à chaque at.run() (cache de script neuf à chaque exécution),
+    ce que le serveur Streamlit ne fait pas. apptest_rerun/* mesure donc l'exécution de
+    main() vue par l'application (derniere_mesure, mesure « rerun ») ; la durée complète de
+    at.run(), compilation comprise, est donnée à part dans apptest_run_complet/*"""
+    from streamlit.testing.v1 import AppTest
+
+    audit_data = audit_aleatoire(app.INDEX_CHECKLIST, 500)
+    resultats = {}
+
+    for nom, etape, categorie in [
+        ("etape_1_informations", 1, None),
+        ("etape_2_checklist_repliee", 2, None),
+        ("etape_2_checklist_categorie", 2, app.INDEX_CHECKLIST.categories[0]),
+        ("etape_3_rapport", 3, None)
+    ]:
+        at = AppTest.from_file(os.path.join(DOSSIER_APP, "app.py"), default_timeout=60).run()
+        at.session_state.fournisseur_info = fournisseur_exemple()
+        at.session_state.audit_data = app.AuditCompact(app.INDEX_CHECKLIST, audit_data)
+        at.session_state.score_incremental = app.ScoreIncremental(audit_data)
+        at.session_state.current_step = etape
+        at.run()
+        if categorie:
+            at.selectbox[0].select(categorie).run()
+
+        at.run()
+        durees_main = []
+        durees_completes = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            at.run()
+            durees_completes.append((time.perf_counter() - debut) * 1000)
+            if at.exception:
+                raise RuntimeError(f"{nom} : {at.exception[0].message}")
+            durees_main.append(at.session_state["derniere_mesure"]["durees_ms"]["rerun"])
+
+        resultats[f"apptest_rerun/{nom}"] = resumer(durees_main)
+        resultats[f"apptest_run_complet/{nom}"] = resumer(durees_completes)
+
+    return resultats
+
+def commit_courant():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=DOSSIER_APP, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparer(ancien, nouveau):
+    """Affiche l'évolution des médianes entre deux fichiers de résultats"""
+    print(f"{'Benchmark':<48} {'avant':>10} {'après':>10} {'ratio':>7}")
+    for nom, mesure in nouveau["resultats"].items():
+        if nom not in ancien["resultats"]:
+            continue
+        avant = ancien["resultats"][nom]["mediane_ms"]
+        apres = mesure["mediane_ms"]
+        print(f"{nom:<48} {avant:>8.2f}ms {apres:>8.2f}ms {apres / avant:>6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de l'application d'audit BIOCOOP")
+    parser.add_argument("--sortie", default="benchmarks.json", help="Fichier JSON des résultats")
+    parser.add_argument("--repetitions", type=int, default=20, help="Répétitions par benchmark")
+    parser.add_argument("--sans-apptest", action="store_true", help="Ne pas mesurer les réexécutions AppTest")
+    parser.add_argument("--comparer", metavar="ANCIEN_JSON", help="Compare les résultats à un fichier précédent")
+    args = parser.parse_args(argv)
+
+    resultats = benchmarks_fonctions(args.repetitions)
+    if not args.sans_apptest:
+        resultats.update(benchmarks_apptest(args.repetitions))
+    memoire = benchmarks_memoire()
+
+    rapport = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_courant(),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "resultats": resultats,
+        "memoire": memoire
+    }
+
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+
+    for nom, mesure in resultats.items():
+        print(f"{nom:<48} médiane {mesure['mediane_ms']:>9.3f} ms  (min {mesure['min_ms']:.3f} ms)")
+    for nom, tailles in memoire.items():
+        print(f"{nom:<48} dict {tailles['dict_octets'] / 1024:>9.1f} Ko  compact {tailles['compact_octets'] / 1024:>9.1f} Ko")
+    print(f"Résultats écrits dans {args.sortie}")
+
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            comparer(json.load(f), rapport)
+
+if __name__ == "__main__":
+    main()
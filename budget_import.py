@@ -0,0 +1,101 @@
+"""Vérifie le budget de démarrage de l'application (python -X importtime)
+
+Usage :
+    python budget_import.py [--budget-ms 1000] [--repetitions 5] [--premier-rendu]
+
+Échoue (code de sortie 1) si le temps d'import de app.py dépasse le budget ou
+si une dépendance lourde réservée aux étapes suivantes est chargée au démarrage.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DOSSIER_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Modules qui ne doivent pas être chargés avant l'affichage du rapport ou des exports
+MODULES_DIFFERES = ["pandas", "xlsxwriter", "openpyxl", "pyarrow", "yaml"]
+
+def mesurer_imports():
+    """Importe app.py dans un processus neuf et renvoie {module: (propre_us, cumulé_us, profondeur)}"""
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=DOSSIER_APP,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    modules = {}
+    for ligne in resultat.stderr.splitlines():
+        if not ligne.startswith("import time:") or "self [us]" in ligne:
+            continue
+        propre, cumule, nom = ligne[len("import time:"):].split("|")
+        profondeur = (len(nom) - len(nom.lstrip(" "))) // 2
+        modules[nom.strip()] = (int(propre), int(cumule), profondeur)
+
+    return modules
+
+def mesurer_premier_rendu():
+    """Durée (ms) du premier affichage de la page dans un processus neuf, via AppTest"""
+    code = (
+        "import time\n"
+        "debut = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file('app.py', default_timeout=60).run()\n"
+        "print((time.perf_counter() - debut) * 1000)\n"
+    )
+    resultat = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=DOSSIER_APP,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(resultat.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Budget de temps d'import de app.py")
+    parser.add_argument("--budget-ms", type=float, default=1000,
+                        help="Temps d'import maximal de app.py, en millisecondes (défaut : 1000)")
+    parser.add_argument("--repetitions", type=int, default=5,
+                        help="Nombre de mesures, la médiane est retenue (défaut : 5)")
+    parser.add_argument("--premier-rendu", action="store_true",
+                        help="Mesure aussi le premier affichage de la page (AppTest)")
+    args = parser.parse_args(argv)
+
+    mesures = [mesurer_imports() for _ in range(args.repetitions)]
+    temps_app = statistics.median(m["app"][1] for m in mesures) / 1000
+    modules = mesures[-1]
+
+    print(f"Import de app.py : {temps_app:.0f} ms (médiane de {args.repetitions}, budget {args.budget_ms:.0f} ms)")
+
+    print("Imports directs les plus coûteux :")
+    directs = sorted(
+        ((nom, cumule) for nom, (_, cumule, profondeur) in modules.items() if profondeur == 1),
+        key=lambda m: m[1],
+        reverse=True
+    )
+    for nom, cumule in directs[:8]:
+        print(f"  {nom:<30} {cumule / 1000:8.1f} ms")
+
+    if args.premier_rendu:
+        print(f"Premier affichage (AppTest) : {mesurer_premier_rendu():.0f} ms")
+
+    echecs = []
+    if temps_app > args.budget_ms:
+        echecs.append(f"temps d'import {temps_app:.0f} ms > budget {args.budget_ms:.0f} ms")
+    for module in MODULES_DIFFERES:
+        if module in modules:
+            echecs.append(f"{module} est importé au démarrage")
+
+    for echec in echecs:
+        print(f"❌ {echec}")
+    if not echecs:
+        print("✅ Budget de démarrage respecté")
+
+    return 1 if echecs else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Test de charge : plusieurs sessions d'audit simultanées sur un même processus
+
+Usage :
+    python charge.py [--sessions 10] [--commentaire 200] [--sortie charge.json]
+
+Chaque session (AppTest, dans son propre thread) saisit les informations
+fournisseur, note tous les items de la checklist catégorie par catégorie puis
+affiche le rapport final et attend que le rapport Excel, généré en
+arrière-plan, soit téléchargeable. Les ressources
+partagées (checklist compilée, cache des rapports, base d'audits) le sont entre
+sessions comme sur un serveur Streamlit unique. Le test mesure la latence des
+réexécutions (p50/p95 par étape), le pic de mémoire résidente du processus et
+la mémoire par session.
+
+AppTest n'autorise pas deux réexécutions simultanées dans un même processus
+(runtime et configuration globaux) : les réexécutions des sessions passent donc
+une à une, comme sous le GIL d'un serveur unique. La latence mesurée comprend
+l'attente de ce tour de passage, le temps d'exécution seul est donné à part.
+
+AppTest recompile aussi app.py à chaque réexécution, ce que ne fait pas un
+serveur Streamlit : la durée de main() mesurée par l'application elle-même
+(derniere_mesure, mesure « rerun ») est donc donnée à côté des durées mesurées
+de l'extérieur, et c'est elle qui reflète la charge réelle. De même, la mémoire
+par session inclut celle de l'instance AppTest et majore celle d'une vraie
+session.
+
+Un changement de notation ne réexécute que les fragments du score et de la
+progression ; AppTest n'en gardant que la sortie, la page est ensuite
+reconstruite hors mesure avant l'item suivant.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+DOSSIER_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Base d'audits jetable, partagée par les sessions simulées (lue par app.py à l'import)
+os.environ.setdefault("AUDIT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="charge_audit_"), "audits.db"))
+os.environ.setdefault("AUDIT_DRAFTS_DIR", tempfile.mkdtemp(prefix="charge_brouillons_"))
+sys.path.insert(0, DOSSIER_APP)
+
+import app
+
+# Une seule réexécution AppTest à la fois dans le processus
+_verrou_reexecution = threading.Lock()
+
+def rss_courant():
+    """Mémoire résidente actuelle du processus, en octets (None hors Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+def rss_pic():
+    """Pic de mémoire résidente du processus, en octets"""
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux compte en Ko, macOS en octets
+    return pic if sys.platform == "darwin" else pic * 1024
+
+def percentile(valeurs, p):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p))] if valeurs else None
+
+def _widget(elements, debut_label):
+    return next(e for e in elements if e.label.startswith(debut_label))
+
+class SessionSimulee:
+    """Un auditeur qui parcourt les étapes 1 à 3 dans sa propre session"""
+
+    def __init__(self, numero, taille_commentaire, timeout):
+        self.numero = numero
+        self.taille_commentaire = taille_commentaire
+        self.timeout = timeout
+        self.latences = {"etape_1": [], "etape_2": [], "etape_3": []}
+        self.durees_app = {"etape_1": [], "etape_2": [], "etape_3": []}
+        self.executions = []
+        self._derniere_mesure = None
+        self.erreur = None
+        self.taille_session = None
+        self.attente_rapport = None
+        self.at = None
+
+    def _executer(self, etape, action):
+        debut = time.perf_counter()
+        with _verrou_reexecution:
+            debut_execution = time.perf_counter()
+            action.run()
+            fin = time.perf_counter()
+        self.latences[etape].append((fin - debut) * 1000)
+        self.executions.append((fin - debut_execution) * 1000)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+        # Une réexécution limitée au score et à la progression (changement de notation) ne
+        # passe pas par main() : la dernière mesure de l'application est alors inchangée
+        mesure = self.at.session_state["derniere_mesure"]
+        if mesure is not self._derniere_mesure:
+            self.durees_app[etape].append(mesure["durees_ms"]["rerun"])
+            self._derniere_mesure = mesure
+
+    def _resynchroniser(self, categorie):
+        """Reconstruit la page hors mesure après une réexécution limitée au score et à la progression.
+
+        AppTest ne garde alors que la sortie de ces fragments et oublie la valeur des autres
+        widgets, que le navigateur renverrait : la catégorie affichée est donc redonnée"""
+        with _verrou_reexecution:
+            self.at.session_state.categorie_selectionnee = categorie
+            self.at.run()
+
+    def parcourir(self, depart):
+        from streamlit.testing.v1 import AppTest
+
+        try:
+            alea = random.Random(self.numero)
+            checklist = app.INDEX_CHECKLIST
+            self.at = at = AppTest.from_file(os.path.join(DOSSIER_APP, "app.py"), default_timeout=self.timeout)
+            # Panneau de performance ouvert : la taille de la session est mesurée à chaque réexécution
+            at.session_state.panneau_performance = True
+            depart.wait()
+            self._executer("etape_1", at)
+
+            # Étape 1 : informations fournisseur
+            _widget(at.text_input, "Nom du fournisseur").input(f"Fournisseur de charge {self.numero}")
+            _widget(at.text_input, "Nom de l'auditeur").input(f"Auditeur {self.numero}")
+            self._executer("etape_1", _widget(at.button, "➡️ Passer à la checklist").click())
+
+            # Étape 2 : une catégorie à la fois, une réexécution par item saisi
+            for categorie in checklist.categories:
+                self._executer("etape_2", _widget(at.selectbox, "Sélectionner une catégorie").select(categorie))
+                for item in checklist.checklist[categorie]["items"]:
+                    commentaire = "x" * alea.randint(0, self.taille_commentaire)
+                    self._executer("etape_2", at.text_area(key=f"comment_{item['id']}").input(commentaire))
+                    notation = alea.choice(checklist.options)
+                    self._executer("etape_2", at.selectbox(key=f"notation_{item['id']}").select(notation))
+                    self._resynchroniser(categorie)
+            self._executer("etape_2", _widget(at.button, "➡️ Générer le rapport").click())
+
+            # Étape 3 : rapport final, puis attente du fichier Excel généré en arrière-plan
+            debut = time.perf_counter()
+            self._executer("etape_3", at)
+            while not any(b.label.startswith("📥") for b in at.get("download_button")):
+                if time.perf_counter() - debut > self.timeout:
+                    raise TimeoutError("rapport Excel non disponible")
+                time.sleep(app.INTERVALLE_SUIVI_RAPPORT)
+                self._executer("etape_3", at)
+            self.attente_rapport = (time.perf_counter() - debut) * 1000
+            self.taille_session = at.session_state["derniere_mesure"]["taille_session_octets"]
+        except Exception as e:
+            self.erreur = f"{type(e).__name__}: {e}"
+
+def lancer(nb_sessions, taille_commentaire, timeout):
+    """Lance nb_sessions sessions simultanées et renvoie les mesures agrégées"""
+    rss_depart = rss_courant()
+    sessions = [SessionSimulee(numero, taille_commentaire, timeout) for numero in range(nb_sessions)]
+    depart = threading.Barrier(nb_sessions)
+    threads = [threading.Thread(target=session.parcourir, args=(depart,)) for session in sessions]
+
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duree = time.perf_counter() - debut
+
+    # Les sessions (et leurs AppTest) sont encore en vie : la différence de RSS leur est due
+    rss_fin = rss_courant()
+    reussies = [session for session in sessions if session.erreur is None]
+
+    latences = {}
+    for etape in ("etape_1", "etape_2", "etape_3"):
+        valeurs = [latence for session in reussies for latence in session.latences[etape]]
+        durees_app = [duree for session in reussies for duree in session.durees_app[etape]]
+        latences[etape] = {
+            "reexecutions": len(valeurs),
+            "p50_ms": percentile(valeurs, 0.50),
+            "p95_ms": percentile(valeurs, 0.95),
+            "max_ms": max(valeurs) if valeurs else None,
+            "app_p50_ms": percentile(durees_app, 0.50),
+            "app_p95_ms": percentile(durees_app, 0.95)
+        }
+    toutes = [latence for session in reussies for valeurs in session.latences.values() for latence in valeurs]
+    executions = [duree for session in reussies for duree in session.executions]
+    durees_app = [duree for session in reussies for valeurs in session.durees_app.values() for duree in valeurs]
+
+    return {
+        "sessions": nb_sessions,
+        "sessions_reussies": len(reussies),
+        "erreurs": [f"session {session.numero} : {session.erreur}" for session in sessions if session.erreur],
+        "duree_s": duree,
+        "reexecutions_par_s": len(toutes) / duree if duree else None,
+        "latences": latences,
+        "latence_globale": {"p50_ms": percentile(toutes, 0.50), "p95_ms": percentile(toutes, 0.95)},
+        "attente_rapport_excel": {
+            "p50_ms": percentile([session.attente_rapport for session in reussies], 0.50),
+            "p95_ms": percentile([session.attente_rapport for session in reussies], 0.95)
+        },
+        "execution_seule": {"p50_ms": percentile(executions, 0.50), "p95_ms": percentile(executions, 0.95)},
+        "execution_app": {"p50_ms": percentile(durees_app, 0.50), "p95_ms": percentile(durees_app, 0.95)},
+        "rss_pic_octets": rss_pic(),
+        "rss_par_session_octets": (rss_fin - rss_depart) / nb_sessions if rss_depart and rss_fin else None,
+        "session_state_moyen_octets": (
+            sum(session.taille_session for session in reussies) / len(reussies) if reussies else None
+        )
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de l'application d'audit BIOCOOP")
+    parser.add_argument("--sessions", type=int, default=10, help="Nombre de sessions simultanées")
+    parser.add_argument("--commentaire", type=int, default=200,
+                        help="Longueur maximale des commentaires saisis, en caractères")
+    parser.add_argument("--timeout", type=float, default=120, help="Délai maximal d'une réexécution, en secondes")
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    args = parser.parse_args(argv)
+
+    resultats = lancer(args.sessions, args.commentaire, args.timeout)
+
+    print(f"{resultats['sessions_reussies']}/{args.sessions} sessions terminées en {resultats['duree_s']:.1f} s "
+          f"({resultats['reexecutions_par_s']:.1f} réexécutions/s)")
+    for etape, mesure in resultats["latences"].items():
+        if mesure["reexecutions"]:
+            print(f"  {etape:<8} {mesure['reexecutions']:>6} réexécutions  p50 {mesure['p50_ms']:>8.1f} ms  "
+                  f"p95 {mesure['p95_ms']:>8.1f} ms  max {mesure['max_ms']:>8.1f} ms  "
+                  f"(main() : p50 {mesure['app_p50_ms']:.1f} ms  p95 {mesure['app_p95_ms']:.1f} ms)")
+    if resultats["execution_seule"]["p50_ms"] is not None:
+        print(f"  exécution seule (hors attente, recompilation AppTest comprise) : "
+              f"p50 {resultats['execution_seule']['p50_ms']:.1f} ms  p95 {resultats['execution_seule']['p95_ms']:.1f} ms")
+        print(f"  durée de main() mesurée par l'application : p50 {resultats['execution_app']['p50_ms']:.1f} ms  "
+              f"p95 {resultats['execution_app']['p95_ms']:.1f} ms")
+    if resultats["attente_rapport_excel"]["p50_ms"] is not None:
+        print(f"  rapport Excel disponible après : p50 {resultats['attente_rapport_excel']['p50_ms']:.0f} ms  "
+              f"p95 {resultats['attente_rapport_excel']['p95_ms']:.0f} ms")
+    print(f"Pic RSS : {resultats['rss_pic_octets'] / 2**20:.0f} Mo")
+    if resultats["rss_par_session_octets"] is not None:
+        print(f"RSS par session (instance AppTest comprise) : {resultats['rss_par_session_octets'] / 2**20:.2f} Mo")
+    if resultats["session_state_moyen_octets"] is not None:
+        print(f"session_state moyen : {resultats['session_state_moyen_octets'] / 1024:.1f} Ko")
+    for erreur in resultats["erreurs"]:
+        print(f"❌ {erreur}")
+
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump({
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "plateforme": platform.platform(),
+                "cpu": os.cpu_count(),
+                **resultats
+            }, f, ensure_ascii=False, indent=2)
+
+    return 1 if resultats["erreurs"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""Configuration commune des tests : base d'audits et brouillons jetables, lus par app.py à l'import"""
+import os
+import sys
+import tempfile
+
+DOSSIER_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["AUDIT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="tests_audit_"), "audits.db")
+os.environ["AUDIT_DRAFTS_DIR"] = tempfile.mkdtemp(prefix="tests_brouillons_")
+os.environ.pop("AUDIT_METRICS_PATH", None)
+sys.path.insert(0, DOSSIER_APP)
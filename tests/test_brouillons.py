@@ -0,0 +1,17 @@
+"""Brouillons des audits en cours"""
+import app
+
+def test_cles_distinctes_pour_des_noms_proches():
+    cles = {
+        app.SauvegardeBrouillons.cle({"Nom du fournisseur": nom, "Date audit": "01/02/2025"}, "session")
+        for nom in ("A B", "A_B", "A-B", "A/B")
+    }
+    assert len(cles) == 4
+    assert all("/" not in cle and cle.endswith("_2025-02-01") for cle in cles)
+
+def test_cle_stable_et_sans_separateur():
+    fournisseur_info = {"Nom du fournisseur": " Ferme du Val ", "Date audit": "1/2/25"}
+    cle = app.SauvegardeBrouillons.cle(fournisseur_info, "session")
+    assert cle == app.SauvegardeBrouillons.cle(dict(fournisseur_info), "autre session")
+    assert "/" not in cle
+    assert app.SauvegardeBrouillons.cle({}, "abc") == "session_abc"
@@ -0,0 +1,55 @@
+"""File de génération des rapports Excel et cache des rapports"""
+import time
+
+import pytest
+
+import app
+
+FOURNISSEUR = {"Nom du fournisseur": "Fournisseur test", "Date audit": "01/02/2025", "Auditeur": "Auditeur test"}
+
+def modele(numero=0):
+    audit_data = {item_id: {"notation": "A", "commentaire": f"constat {numero}"} for item_id in app.INDEX_CHECKLIST.items}
+    return app.construire_modele_rapport(FOURNISSEUR, audit_data)
+
+def attendre(file_rapports, travail_id, delai=30):
+    debut = time.perf_counter()
+    while file_rapports.travail(travail_id).statut in (app.STATUT_EN_ATTENTE, app.STATUT_EN_COURS):
+        assert time.perf_counter() - debut < delai
+        time.sleep(0.01)
+    return file_rapports.travail(travail_id)
+
+@pytest.fixture
+def file_rapports():
+    file_rapports = app.FileRapports(app.CacheRapports(taille_max=1), workers=1)
+    yield file_rapports
+    file_rapports._executeur.shutdown(wait=True)
+
+def test_rapport_deja_produit_reutilise_le_travail(file_rapports):
+    travail_id = file_rapports.soumettre(modele())
+    assert attendre(file_rapports, travail_id).statut == app.STATUT_TERMINE
+    assert file_rapports.contenu(travail_id) is not None
+
+    assert file_rapports.soumettre(modele()) == travail_id
+    assert len(file_rapports._travaux) == 1
+
+def test_rapport_evince_regenere(file_rapports):
+    premier = modele(1)
+    travail_id = file_rapports.soumettre(premier)
+    attendre(file_rapports, travail_id)
+    # Un autre rapport évince le premier du cache (une seule place)
+    attendre(file_rapports, file_rapports.soumettre(modele(2)))
+
+    assert file_rapports.contenu(travail_id) is None
+    nouveau_id = file_rapports.soumettre(premier)
+    assert nouveau_id != travail_id
+    assert attendre(file_rapports, nouveau_id).statut == app.STATUT_TERMINE
+    assert file_rapports.contenu(nouveau_id) is not None
+
+def test_erreur_de_generation_conservee(file_rapports, monkeypatch):
+    def echec(modele, sortie):
+        raise ValueError("feuille invalide")
+
+    monkeypatch.setattr(app, "ecrire_rapport_excel", echec)
+    travail = attendre(file_rapports, file_rapports.soumettre(modele(3)))
+    assert travail.statut == app.STATUT_ECHEC
+    assert "ValueError: feuille invalide" in travail.erreur
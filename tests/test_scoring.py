@@ -0,0 +1,76 @@
+"""Parité des calculs de score : unitaire, par lot (vectorisé) et incrémental"""
+import random
+
+import pytest
+
+import app
+
+def audit_aleatoire(graine, checklist=None):
+    checklist = checklist or app.INDEX_CHECKLIST
+    alea = random.Random(graine)
+    return {
+        item_id: {"notation": alea.choice(checklist.options), "commentaire": ""}
+        for item_id in checklist.items
+        if alea.random() < 0.8
+    }
+
+def verifier_identiques(attendu, obtenu):
+    score_attendu, details_attendus = attendu
+    score_obtenu, details_obtenus = obtenu
+    assert score_obtenu == pytest.approx(score_attendu)
+    assert details_obtenus.keys() == details_attendus.keys()
+    for categorie, detail in details_attendus.items():
+        assert details_obtenus[categorie] == pytest.approx(detail)
+
+def test_scores_lot_identiques_au_calcul_unitaire():
+    audits = [audit_aleatoire(graine) for graine in range(200)] + [{}]
+    for audit_data, resultat in zip(audits, app.calculer_scores_lot(audits)):
+        verifier_identiques(app.calculer_score_global(audit_data), resultat)
+
+def test_scores_lot_audits_compacts():
+    audits = [audit_aleatoire(graine) for graine in range(50)]
+    compacts = [app.AuditCompact(audit_data=audit_data) for audit_data in audits]
+    for audit_data, resultat in zip(audits, app.calculer_scores_lot(compacts)):
+        verifier_identiques(app.calculer_score_global(audit_data), resultat)
+
+def test_matrice_notations_plates_identique():
+    audits = [audit_aleatoire(graine) for graine in range(50)]
+    # Items hors checklist et notations inconnues ignorés
+    audits[0]["HORS-001"] = {"notation": "A", "commentaire": ""}
+    notations = [{item_id: resultat["notation"] for item_id, resultat in audit.items()} for audit in audits]
+    notations[1][next(iter(notations[1]))] = "Z"
+    audits[1][next(iter(audits[1]))] = {"notation": "Z", "commentaire": ""}
+    assert (app.matrice_notations_plates(notations) == app.matrice_notations(audits)).all()
+
+def test_score_incremental_identique():
+    audit_data = audit_aleatoire(1)
+    score = app.ScoreIncremental()
+    for item_id, resultat in audit_data.items():
+        score.noter(item_id, resultat["notation"])
+    verifier_identiques(app.calculer_score_global(audit_data), score.calculer())
+
+    # Renotations successives
+    alea = random.Random(2)
+    for item_id in alea.sample(list(audit_data), 10):
+        notation = alea.choice(app.INDEX_CHECKLIST.options)
+        score.noter(item_id, notation)
+        audit_data[item_id] = {"notation": notation, "commentaire": ""}
+    verifier_identiques(app.calculer_score_global(audit_data), score.calculer())
+
+def test_configuration_refuse_coefficients_differents_par_criticite():
+    checklist = app.compiler_checklist({
+        "version": "test-criticite",
+        "notations": dict(app.NOTATION_OPTIONS),
+        "categories": {
+            "1. A": {"criticite": "CRITIQUE", "coefficient": 2.0, "items": [{"id": "A-1", "question": "", "details": ""}]},
+            "2. B": {"criticite": "CRITIQUE", "coefficient": 3.0, "items": [{"id": "B-1", "question": "", "details": ""}]}
+        }
+    })
+    with pytest.raises(ValueError, match="CRITIQUE"):
+        app.configuration_scoring(checklist=checklist)
+
+def test_configuration_modifie_les_coefficients_par_criticite():
+    configuration = app.configuration_scoring({"CRITIQUE": 3.0})
+    assert configuration.coefficients["CRITIQUE"] == 3.0
+    with pytest.raises(ValueError):
+        app.configuration_scoring({"INCONNUE": 1.0})
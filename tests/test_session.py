@@ -0,0 +1,35 @@
+"""Contenu de la session Streamlit pendant la saisie d'un audit (AppTest)"""
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import app
+
+CHEMIN_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+def _widget(elements, debut_label):
+    return next(e for e in elements if e.label.startswith(debut_label))
+
+def test_commentaires_partages_avec_les_widgets():
+    at = AppTest.from_file(CHEMIN_APP, default_timeout=60).run()
+    _widget(at.text_input, "Nom du fournisseur").input("Fournisseur session")
+    _widget(at.text_input, "Nom de l'auditeur").input("Auditeur session")
+    _widget(at.button, "➡️ Passer à la checklist").click().run()
+
+    categorie = app.INDEX_CHECKLIST.categories[0]
+    _widget(at.selectbox, "Sélectionner une catégorie").select(categorie).run()
+    items = [item["id"] for item in app.INDEX_CHECKLIST.checklist[categorie]["items"]]
+    for item_id in items:
+        at.text_area(key=f"comment_{item_id}").input(f"Constat détaillé {item_id} " * 20).run()
+    # Réexécution suivante : les valeurs des widgets sont de nouveaux objets
+    at.run()
+    assert not at.exception
+
+    audit_data = at.session_state.audit_data
+    for item_id in items:
+        # Le texte n'est gardé qu'une fois : la clé du widget et l'audit désignent le même objet
+        assert at.session_state[f"comment_{item_id}"] is audit_data[item_id]["commentaire"]
+
+    # Les clés des widgets ne sont gardées que pour les items affichés
+    autres = [item_id for item_id in app.INDEX_CHECKLIST.items if item_id not in items]
+    assert not any(f"comment_{item_id}" in at.session_state for item_id in autres)
@@ -0,0 +1,106 @@
+"""Stockage des audits : représentation compacte, rapports Excel, actions correctives et caches"""
+import os
+
+import pytest
+
+import app
+
+FOURNISSEUR = {
+    "Nom du fournisseur": "Ferme des Tests",
+    "Adresse": "1 rue des Essais",
+    "Date audit": "15/03/2025",
+    "Auditeur": "Auditeur test",
+    "Type site": "Site mixte"
+}
+
+def audit_complet(notation="A", **notations):
+    audit_data = {
+        item_id: {"notation": notation, "commentaire": f"Constat {item_id}"} for item_id in app.INDEX_CHECKLIST.items
+    }
+    for item_id, valeur in notations.items():
+        audit_data[item_id.replace("_", "-")]["notation"] = valeur
+    return audit_data
+
+@pytest.fixture
+def stockage(tmp_path):
+    stockage = app.StockageAudits(str(tmp_path / "audits.db"))
+    yield stockage
+    stockage.fermer()
+
+def test_audit_compact_en_dict_aller_retour():
+    audit_data = audit_complet()
+    premier, second = list(audit_data)[:2]
+    audit_data[premier] = {"notation": None, "commentaire": "à revoir"}
+    audit_data[second] = {"notation": "N/A", "commentaire": ""}
+    audit_data["HORS-001"] = {"notation": "B", "commentaire": "item d'une autre version"}
+
+    compact = app.AuditCompact(audit_data=audit_data)
+    assert compact.en_dict() == audit_data
+    assert app.AuditCompact(audit_data=compact.en_dict()).en_dict() == audit_data
+    assert compact.copie().en_dict() == audit_data
+
+def test_rapport_excel_aller_retour(tmp_path):
+    audit_data = audit_complet("B", SEC_001="C", SEC_002="N/A")
+    chemin = tmp_path / "rapport.xlsx"
+    app.ecrire_rapport_excel(app.construire_modele_rapport(FOURNISSEUR, audit_data), str(chemin))
+
+    fournisseur_info, relu = app.lire_rapport_excel(str(chemin))
+    assert {cle: fournisseur_info.get(cle) for cle in FOURNISSEUR} == FOURNISSEUR
+    assert {item_id: dict(resultat) for item_id, resultat in relu.items()} == audit_data
+
+def test_import_lot_ignore_les_doublons(tmp_path, stockage):
+    dossier = tmp_path / "rapports"
+    dossier.mkdir()
+    app.ecrire_rapport_excel(
+        app.construire_modele_rapport(FOURNISSEUR, audit_complet()), str(dossier / "audit.xlsx")
+    )
+
+    importes, ignores, erreurs = app.importer_rapports_lot(str(dossier), stockage, workers=1)
+    assert [os.path.basename(chemin) for chemin, _ in importes] == ["audit.xlsx"]
+    assert not ignores and not erreurs
+
+    importes, ignores, erreurs = app.importer_rapports_lot(str(dossier), stockage, workers=1)
+    assert not importes and not erreurs
+    assert [os.path.basename(chemin) for chemin, _ in ignores] == ["audit.xlsx"]
+    assert len(stockage.lister_audits(fournisseur=FOURNISSEUR["Nom du fournisseur"])) == 1
+
+def test_actions_conservees_quand_l_item_est_renote(stockage):
+    audit_id = stockage.enregistrer_audit(FOURNISSEUR, audit_complet(SEC_001="C"))
+    assert [action.item_id for action in stockage.actions_audit(audit_id)] == ["SEC-001"]
+    assert stockage.mettre_a_jour_actions(audit_id, {"SEC-001": {"responsable": "Qualité"}}) == 1
+
+    # Toujours non conforme : l'action suivie est gardée telle quelle
+    stockage.enregistrer_audit(FOURNISSEUR, audit_complet(SEC_001="B"), audit_id=audit_id)
+    assert [(a.item_id, a.responsable) for a in stockage.actions_audit(audit_id)] == [("SEC-001", "Qualité")]
+
+    # Conforme : l'action n'est plus lue, mais reparaît si l'item redevient non conforme
+    stockage.enregistrer_audit(FOURNISSEUR, audit_complet(), audit_id=audit_id)
+    assert stockage.actions_audit(audit_id) == ()
+    stockage.enregistrer_audit(FOURNISSEUR, audit_complet(SEC_001="C"), audit_id=audit_id)
+    assert [(a.item_id, a.responsable) for a in stockage.actions_audit(audit_id)] == [("SEC-001", "Qualité")]
+
+def test_ecouteurs_invalident_les_caches(stockage):
+    tableau = app.TableauDeBord(stockage)
+    planification = app.PlanificationAudits(stockage)
+    notifies = []
+    stockage.ajouter_ecouteur(notifies.append)
+
+    premier = stockage.enregistrer_audit(FOURNISSEUR, audit_complet())
+    assert tableau.agreger()["nb_audits"] == 1
+    assert [r.fournisseur for r in planification.prochains(5)] == [FOURNISSEUR["Nom du fournisseur"]]
+
+    autre = {**FOURNISSEUR, "Nom du fournisseur": "Autre fournisseur"}
+    second = stockage.enregistrer_audit(autre, audit_complet("C"))
+    agregats = tableau.agreger()
+    assert agregats["nb_audits"] == 2
+    assert list(agregats["fournisseurs_non_conformes"]["fournisseur"]) == ["Autre fournisseur"]
+    assert planification.prochains(1)[0].fournisseur == "Autre fournisseur"
+
+    stockage.mettre_a_jour_actions(second, {"SEC-001": {"responsable": "Qualité"}})
+    stockage.supprimer_audit(second)
+    assert tableau.agreger()["nb_audits"] == 1
+    assert [r.fournisseur for r in planification.prochains(5)] == [FOURNISSEUR["Nom du fournisseur"]]
+
+    assert notifies == [premier, second, second, second]
+    assert stockage.revision == 4
+    assert (stockage.revision_audit(premier), stockage.revision_audit(second)) == (1, 3)